@@ -0,0 +1,171 @@
+"""Benchmark XojoDoc query latency for the ways of opening the database.
+
+Runs the same lookups (searches, class details, members) against:
+- default:   a read-write connection opened for every lookup (the old behavior)
+- read-only: a read-only connection kept open, default SQLite I/O
+- mmap:      a read-only connection kept open, reading through a memory map
+
+"cold" is the first round of lookups on a new connection (empty SQLite page
+cache, schema not yet loaded); "warm" is the median of the following rounds.
+
+With --scaling, instead builds synthetic databases of growing size and times
+fetching the members of one class (properties, methods, one method by name),
+with the (class_id, name) member indexes and without any member index by
+class. With the indexes the time per class stays flat as the corpus grows.
+
+Usage:
+    python benchmark_queries.py [xojo.db] [--rounds N]
+    python benchmark_queries.py --scaling [1000,10000,50000]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from xojodoc.database import Database
+
+
+SEARCHES = ["graphics", "draw", "d*", "text width", "desktop.win", "timer"]
+
+
+def run_lookups(db: Database, class_names) -> None:
+    """Run one round of lookups."""
+    for query in SEARCHES:
+        with db:
+            db.search_classes(query, limit=10)
+    for name in class_names:
+        with db:
+            class_info = db.get_class_by_name(name)
+            db.get_class_properties(class_info['id'])
+            db.get_class_methods(class_info['id'])
+
+
+def benchmark(db_path: str, rounds: int, class_names, **options):
+    """Time the lookups for one mode.
+
+    Returns:
+        Tuple of (cold ms, warm ms) per round
+    """
+    db = Database(db_path, **options)
+    start = time.perf_counter()
+    if db.read_only:
+        # Held open; the `with` blocks in run_lookups() reuse it
+        db.connect()
+
+    run_lookups(db, class_names)
+    cold = time.perf_counter() - start
+
+    warm = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run_lookups(db, class_names)
+        warm.append(time.perf_counter() - start)
+
+    db.close()
+    return cold * 1000, statistics.median(warm) * 1000
+
+
+def build_corpus(db_path: str, classes: int, members: int = 10) -> None:
+    """Create a synthetic database with the given number of classes.
+
+    Each class gets `members` properties and `members` methods.
+    """
+    with Database(db_path) as db:
+        db.create_schema()
+        with db.transaction():
+            db.conn.executemany(
+                "INSERT INTO classes (id, name, module, description) VALUES (?, ?, ?, ?)",
+                ((i, f"Class{i}", f"module{i % 50}", "Synthetic class.") for i in range(1, classes + 1))
+            )
+            db.conn.executemany(
+                "INSERT INTO properties (class_id, name, type) VALUES (?, ?, 'Integer')",
+                ((i, f"Property{j}") for i in range(1, classes + 1) for j in range(members))
+            )
+            db.conn.executemany(
+                "INSERT INTO methods (class_id, name, parameters) VALUES (?, ?, '()')",
+                ((i, f"Method{j}") for i in range(1, classes + 1) for j in range(members))
+            )
+
+
+def time_member_fetch(db_path: str, classes: int, samples: int = 500) -> float:
+    """Time fetching the members of random classes.
+
+    Returns:
+        Median microseconds per class
+    """
+    times = []
+    with Database(db_path, read_only=True) as db:
+        for _ in range(samples):
+            class_id = random.randint(1, classes)
+            start = time.perf_counter()
+            db.get_class_properties(class_id)
+            db.get_class_methods(class_id)
+            db.conn.execute("""
+                SELECT name FROM methods WHERE class_id = ? AND name = ? COLLATE NOCASE
+            """, (class_id, "method5")).fetchone()
+            times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def benchmark_scaling(sizes) -> None:
+    """Print per-class member fetch time for growing corpus sizes."""
+    print(f"{'classes':>10}{'members':>10}{'indexed us':>12}{'no index us':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for classes in sizes:
+            db_path = str(Path(tmp) / f"scaling-{classes}.db")
+            build_corpus(db_path, classes)
+            indexed = time_member_fetch(db_path, classes)
+
+            with Database(db_path) as db:
+                db.conn.execute("DROP INDEX idx_properties_class_name")
+                db.conn.execute("DROP INDEX idx_methods_class_name")
+            unindexed = time_member_fetch(db_path, classes, samples=20)
+
+            print(f"{classes:>10}{classes * 20:>10}{indexed:>12.1f}{unindexed:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark XojoDoc query latency")
+    parser.add_argument("db_path", nargs="?", default="xojo.db", help="Path to database (default: xojo.db)")
+    parser.add_argument("--rounds", type=int, default=50, help="Warm rounds per mode (default: 50)")
+    parser.add_argument("--scaling", nargs="?", const="1000,10000,50000", metavar="SIZES",
+                        help="Time member fetch on synthetic corpora of these class counts "
+                             "(default: 1000,10000,50000)")
+    args = parser.parse_args()
+
+    if args.scaling:
+        benchmark_scaling([int(size) for size in args.scaling.split(",")])
+        return
+
+    if not Path(args.db_path).exists():
+        print(f"Database not found: {args.db_path}")
+        sys.exit(1)
+
+    with Database(args.db_path) as db:
+        class_names = [row[0] for row in db.conn.execute(
+            "SELECT name FROM classes ORDER BY random() LIMIT 20"
+        )]
+
+    modes = [
+        ("default", {}),
+        ("read-only", {"read_only": True, "memory_map": False}),
+        ("mmap", {"read_only": True}),
+    ]
+
+    lookups = len(SEARCHES) + len(class_names)
+    print(f"{lookups} lookups per round, {args.rounds} warm rounds\n")
+    print(f"{'mode':<12}{'cold ms':>10}{'warm ms':>10}{'per lookup':>12}")
+    for name, options in modes:
+        cold, warm = benchmark(args.db_path, args.rounds, class_names, **options)
+        print(f"{name:<12}{cold:>10.2f}{warm:>10.2f}{warm / lookups:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
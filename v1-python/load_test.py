@@ -0,0 +1,117 @@
+"""Load test for the XojoDoc HTTP API (xojodoc --http).
+
+Sends a mix of search, class and method requests from several concurrent
+clients, each on its own keep-alive connection, and reports throughput and
+latency percentiles. With --revalidate, clients repeat requests with the
+ETag they got back, as a caching client would, so most answers are 304s.
+
+Usage:
+    xojodoc --http --db-path xojo.db &
+    python load_test.py [--url http://127.0.0.1:8080] [--clients 16] [--requests 2000]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+
+SEARCHES = ["graphics", "draw", "d*", "text width", "desktop.win", "timer", "color", "string"]
+
+
+def build_paths(host: str, port: int, count: int):
+    """Build a random mix of request paths from the served documentation."""
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    classes = []
+    for query in SEARCHES:
+        conn.request("GET", f"/search?q={quote(query)}&limit=20")
+        classes += [result["name"] for result in json.loads(conn.getresponse().read())["results"]]
+
+    methods = []
+    for name in classes[:20]:
+        conn.request("GET", f"/class/{quote(name)}")
+        info = json.loads(conn.getresponse().read())
+        methods += [(name, method["name"]) for method in info["methods"][:3]]
+    conn.close()
+
+    if not classes:
+        sys.exit("The server returned no classes to test with")
+
+    paths = []
+    for _ in range(count):
+        kind = random.random()
+        if kind < 0.5:
+            paths.append(f"/search?q={quote(random.choice(SEARCHES))}&limit=20")
+        elif kind < 0.8 or not methods:
+            paths.append(f"/class/{quote(random.choice(classes))}")
+        else:
+            name, method = random.choice(methods)
+            paths.append(f"/class/{quote(name)}/method/{quote(method)}")
+    return paths
+
+
+def run_client(host: str, port: int, paths, revalidate: bool):
+    """Send requests on one connection.
+
+    Returns:
+        List of (status, latency in seconds)
+    """
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    results = []
+    for path in paths:
+        headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+        start = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        results.append((response.status, time.perf_counter() - start))
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the XojoDoc HTTP API")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Server URL (default: http://127.0.0.1:8080)")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent connections (default: 16)")
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests (default: 2000)")
+    parser.add_argument("--revalidate", action="store_true", help="Send If-None-Match with known ETags")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+
+    per_client = max(1, args.requests // args.clients)
+    paths = build_paths(host, port, per_client * args.clients)
+    chunks = [paths[i::args.clients] for i in range(args.clients)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = [r for chunk in pool.map(lambda c: run_client(host, port, c, args.revalidate), chunks)
+                   for r in chunk]
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{len(results)} requests, {args.clients} clients, {elapsed:.2f} s")
+    print(f"Throughput: {len(results) / elapsed:.0f} req/s")
+    print(f"Latency ms: p50 {percentile(0.50):.2f}  p95 {percentile(0.95):.2f}  "
+          f"p99 {percentile(0.99):.2f}  mean {statistics.mean(latencies) * 1000:.2f}")
+    print("Status: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
 """Database migration script to add incremental indexing support.
 
-Adds file_mtime and indexed_at columns to the classes table.
+Adds file_mtime, file_size, content_hash, indexed_at and is_deprecated
+columns to the classes table, keys the search index rows by class id, stores the display
+document of each class (class_docs) and indexes members by class and name.
+With --fts-layout, also converts the search index to the given layout (e.g.
+external, which does not store the searchable text twice).
 """
 
+import argparse
 import sqlite3
 import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from xojodoc.database import Database
 
 
 def migrate_database(db_path: str = "xojo.db"):
@@ -27,17 +38,68 @@ def migrate_database(db_path: str = "xojo.db"):
             cursor.execute("ALTER TABLE classes ADD COLUMN file_mtime REAL")
             needs_migration = True
             
+        if 'file_size' not in columns:
+            print("   Adding file_size column...")
+            cursor.execute("ALTER TABLE classes ADD COLUMN file_size INTEGER")
+            needs_migration = True
+            
+        if 'content_hash' not in columns:
+            print("   Adding content_hash column...")
+            cursor.execute("ALTER TABLE classes ADD COLUMN content_hash TEXT")
+            needs_migration = True
+            
         if 'indexed_at' not in columns:
             print("   Adding indexed_at column...")
             cursor.execute("ALTER TABLE classes ADD COLUMN indexed_at REAL")
             needs_migration = True
             
+        if 'is_deprecated' not in columns:
+            print("   Adding is_deprecated column...")
+            cursor.execute("ALTER TABLE classes ADD COLUMN is_deprecated INTEGER NOT NULL DEFAULT 0")
+            cursor.execute("UPDATE classes SET is_deprecated = module LIKE 'deprecated%'")
+            needs_migration = True
+            
+        # Older versions let FTS5 pick the search index rowids
+        cursor.execute("""
+            SELECT 1 FROM search_index s
+            LEFT JOIN classes c ON c.id = s.rowid
+            WHERE c.id IS NULL OR c.name != s.class_name OR c.module != s.module
+            LIMIT 1
+        """)
+        if cursor.fetchone():
+            print("   Keying search index by class id...")
+            conn.commit()
+            with Database(db_path) as db:
+                db.convert_search_index(db.get_fts_layout())
+            needs_migration = True
+            
+        # Tables and indexes that create_schema() adds to an existing database
+        schema_objects = [
+            # Display documents of each class (one read per class view)
+            ('class_docs', "Storing class documents..."),
+            # Member lookups by (class, name) instead of class only
+            ('idx_methods_class_name', "Adding member indexes by class and name..."),
+            # Index behind the deprecated filter of searches and class lists
+            ('idx_classes_deprecated_name', "Adding deprecated class index..."),
+        ]
+        missing = []
+        for name, message in schema_objects:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+            if not cursor.fetchone():
+                print(f"   {message}")
+                missing.append(name)
+        if missing:
+            conn.commit()
+            with Database(db_path) as db:
+                db.create_schema()
+            needs_migration = True
+            
         if needs_migration:
             conn.commit()
             print("✅ Migration complete!")
             print()
-            print("💡 Note: Existing entries have NULL timestamps.")
-            print("   Run indexer with --force to populate timestamps:")
+            print("💡 Note: Existing entries have no timestamps or content hashes.")
+            print("   Run indexer with --force to populate them:")
             print("   py -m src.xojodoc.indexer --force")
         else:
             print("✅ Database already up to date!")
@@ -50,7 +112,44 @@ def migrate_database(db_path: str = "xojo.db"):
         return False
 
 
+def migrate_search_index(db_path: str, layout: str) -> bool:
+    """Convert the search index to another layout and compact the database."""
+    
+    print(f"🔧 Converting search index to '{layout}' layout: {db_path}")
+    
+    try:
+        size_before = Path(db_path).stat().st_size
+        
+        with Database(db_path) as db:
+            db.create_schema()
+            if db.get_fts_layout() == layout:
+                print("✅ Search index already uses this layout!")
+                return True
+            
+            db.convert_search_index(layout)
+            print("   Compacting database...")
+            db.conn.execute("VACUUM")
+            
+        size_after = Path(db_path).stat().st_size
+        print(f"✅ Conversion complete! ({size_before // 1024} KB -> {size_after // 1024} KB)")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Conversion failed: {e}")
+        return False
+
+
 if __name__ == "__main__":
-    db_path = sys.argv[1] if len(sys.argv) > 1 else "xojo.db"
-    success = migrate_database(db_path)
+    parser = argparse.ArgumentParser(description="Migrate a XojoDoc database")
+    parser.add_argument("db_path", nargs="?", default="xojo.db", help="Path to database (default: xojo.db)")
+    parser.add_argument(
+        "--fts-layout",
+        choices=("full", "external"),
+        help="Convert the search index to this layout"
+    )
+    args = parser.parse_args()
+    
+    success = migrate_database(args.db_path)
+    if success and args.fts_layout:
+        success = migrate_search_index(args.db_path, args.fts_layout)
     sys.exit(0 if success else 1)
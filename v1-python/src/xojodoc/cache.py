@@ -0,0 +1,206 @@
+"""Query result cache for XojoDoc.
+
+A few lookups (Timer, DesktopWindow, String, ...) make up most of the
+traffic, so long-running readers (the query daemon, the HTTP API) keep their
+recent results in an LRU cache. The cache is bounded both by the number of
+entries and by their approximate size, and is emptied whenever the index
+generation changes (see Database.get_generation()). Readers pass the
+generation they read along, so a result computed from an older generation
+is never stored or served as current.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from xojodoc.database import Database
+
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def estimate_size(value: Any) -> int:
+    """Estimate the memory used by a result (nested dicts, lists and tuples).
+
+    Args:
+        value: Cached value
+
+    Returns:
+        Approximate size in bytes
+    """
+    if isinstance(value, (bytes, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results, invalidated by index generation."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Initialize cache.
+
+        Args:
+            max_entries: Maximum number of cached results
+            max_bytes: Maximum total (estimated) size of the cached results
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._data_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def set_generation(self, generation: int) -> None:
+        """Empty the cache if the index generation is newer than the cached results'.
+
+        Generations only grow. An older one, read by a connection that has
+        not seen the latest commit yet, is ignored rather than emptying the
+        newer results.
+
+        Args:
+            generation: Current index generation
+        """
+        with self._lock:
+            if self._generation is not None and generation <= self._generation:
+                return
+            self._clear()
+            self._generation = generation
+
+    def clear(self) -> None:
+        """Empty the cache."""
+        with self._lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        """Empty the cache; the lock must be held."""
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._sizes.clear()
+        self._bytes = 0
+
+    def validate(self, db: Database) -> None:
+        """Check that the cached results still match a database.
+
+        PRAGMA data_version changes whenever another connection commits.
+        Any such commit empties the cache, so edits that do not bump the
+        generation (migrate_database.py, manual changes) are seen too; the
+        generation is then read again.
+
+        Args:
+            db: Connected database (one connection per cache)
+        """
+        data_version = db.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        if self._data_version is not None:
+            self.clear()
+        self.set_generation(db.get_generation())
+        self._data_version = data_version
+
+    def _is_stale(self, generation: Optional[int]) -> bool:
+        """Check whether a result of the given generation is outdated; the lock must be held."""
+        return generation is not None and generation != self._generation
+
+    def get(self, key: Hashable, default: Any = None, generation: Optional[int] = None) -> Any:
+        """Get a cached result.
+
+        Args:
+            key: Cache key
+            default: Returned on a miss
+            generation: Index generation the caller reads; results are only
+                        returned if the cache holds that generation
+
+        Returns:
+            The cached result, or default
+        """
+        with self._lock:
+            if key in self._entries and not self._is_stale(generation):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None,
+            generation: Optional[int] = None) -> None:
+        """Cache a result, evicting the least recently used ones over the bounds.
+
+        Args:
+            key: Cache key
+            value: Result
+            size: Size in bytes (estimated with estimate_size() if not given)
+            generation: Index generation the result was computed from; it is
+                        not stored if the cache has moved to another one
+                        meanwhile
+        """
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if self._is_stale(generation):
+                return
+            if key in self._entries:
+                self._bytes -= self._sizes[key]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       generation: Optional[int] = None) -> Any:
+        """Get a cached result, computing and caching it on a miss.
+
+        Args:
+            key: Cache key
+            compute: Function returning the result
+            generation: Index generation the caller reads (see get() and put())
+
+        Returns:
+            The result
+        """
+        missing = object()
+        value = self.get(key, missing, generation)
+        if value is missing:
+            value = compute()
+            self.put(key, value, generation=generation)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics.
+
+        Returns:
+            Dict with hits, misses, hit_rate, evictions, invalidations,
+            entries, bytes and generation
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'generation': self._generation,
+            }
@@ -3,40 +3,124 @@
 Provides command-line interface for querying Xojo documentation.
 """
 
+import re
 import sys
 import click
 from pathlib import Path
-from typing import Optional, List, Tuple
-from rich.console import Console
-from rich.panel import Panel
-from rich.markdown import Markdown
-from rich.table import Table
-from rich.text import Text
+from typing import Any, Callable, Dict, Optional, List, Tuple
 
+from xojodoc.cache import QueryCache
+from xojodoc.completion import NameIndex
+from xojodoc.daemon import DaemonClient, DaemonError
 from xojodoc.database import Database
 
 
-console = Console()
+# rich (and everything else only needed for rendering) is imported on first
+# use, so that quick lookups such as `xojodoc --plain QUERY` start fast
+_console = None
+
+# Returned by XojoDocCLI._ask_daemon() when the database must be queried directly
+_NO_DAEMON = object()
+
+
+class PlainConsole:
+    """Minimal stand-in for rich's Console that prints plain text.
+    
+    Used for --plain output: markup tags are stripped, nothing from rich is
+    imported.
+    """
+    
+    _MARKUP = re.compile(r"\[/?(?:(?:bold|dim|red|green|yellow|cyan|magenta|blue) ?)+\]|\[/\]")
+    
+    def print(self, *objects: Any) -> None:
+        """Print objects separated by spaces, without markup."""
+        print(self._MARKUP.sub("", " ".join(str(obj) for obj in objects)))
+
+
+def get_console(plain: bool = False):
+    """Get the console used for output, creating it on first use.
+    
+    Args:
+        plain: Create a PlainConsole instead of a rich Console
+        
+    Returns:
+        The console; the first call decides which kind
+    """
+    global _console
+    if _console is None:
+        if plain:
+            _console = PlainConsole()
+        else:
+            from rich.console import Console
+            _console = Console()
+    return _console
 
 
 class XojoDocCLI:
     """Command-line interface for XojoDoc."""
     
-    def __init__(self, db_path: str = "xojo.db"):
+    def __init__(self, db_path: str = "xojo.db", plain: bool = False, use_daemon: bool = True):
         """Initialize CLI.
         
         Args:
             db_path: Path to SQLite database
+            plain: Print plain text instead of using rich
+            use_daemon: Send lookups to a running `xojodoc --serve` daemon
+                        for this database, if there is one
         """
-        self.db = Database(db_path)
+        self.plain = plain
+        self.console = get_console(plain)
+        self.db = Database(db_path, read_only=True)
         
         # Check if database exists
         if not Path(db_path).exists():
-            console.print("[red]Error: Database not found![/red]")
-            console.print(f"Expected location: {db_path}")
-            console.print("\nPlease run the indexer first:")
-            console.print("  xojodoc --reindex")
+            self.console.print("[red]Error: Database not found![/red]")
+            self.console.print(f"Expected location: {db_path}")
+            self.console.print("\nPlease run the indexer first:")
+            self.console.print("  xojodoc --reindex")
             sys.exit(1)
+        
+        # Results of direct lookups; matters for long-running users such as
+        # the query daemon
+        self.cache = QueryCache()
+        
+        self.daemon = DaemonClient.connect(db_path) if use_daemon else None
+        if not self.daemon:
+            # Keep one read-only connection for the whole run; the `with
+            # self.db` blocks below reuse it
+            self.db.connect()
+    
+    def _ask_daemon(self, op: str, **args) -> Any:
+        """Run a lookup on the daemon.
+        
+        Returns:
+            The result, or _NO_DAEMON if there is no daemon or it failed, in
+            which case the caller queries the database directly
+        """
+        if not self.daemon:
+            return _NO_DAEMON
+        try:
+            return self.daemon.request(op, **args)
+        except DaemonError:
+            self.daemon.close()
+            self.daemon = None
+            self.db.connect()
+            return _NO_DAEMON
+    
+    def _cached(self, key: Tuple, query: Callable[..., Any], *args: Any) -> Any:
+        """Run a database lookup through the result cache.
+        
+        Args:
+            key: Cache key of the lookup
+            query: Function running the lookup
+            *args: Arguments for query
+            
+        Returns:
+            The (possibly cached) result
+        """
+        with self.db:
+            self.cache.validate(self.db)
+            return self.cache.get_or_compute(key, lambda: query(*args))
     
     def search_classes(self, query: str, limit: int = 10) -> List[Tuple]:
         """Search for classes by name.
@@ -48,11 +132,19 @@ class XojoDocCLI:
         Returns:
             List of (id, name, module, description) tuples
         """
+        result = self._ask_daemon("search", query=query, limit=limit)
+        if result is not _NO_DAEMON:
+            return result
+        
+        return self._cached(("search", query, limit), self._search_classes, query, limit)
+    
+    def _search_classes(self, query: str, limit: int) -> List[Tuple]:
+        """Search the database (see search_classes())."""
         with self.db:
-            results = self.db.search_classes(query)
-            # Convert dict results to tuples and limit
+            results = self.db.search_classes(query, limit=limit)
+            # Convert dict results to tuples
             return [(r['id'], r['name'], r['module'], r['description']) 
-                    for r in results[:limit]]
+                    for r in results]
     
     def get_class_info(self, class_name: str) -> Optional[dict]:
         """Get detailed information about a class.
@@ -63,53 +155,23 @@ class XojoDocCLI:
         Returns:
             Dictionary with class info or None if not found
         """
+        result = self._ask_daemon("class", name=class_name)
+        if result is not _NO_DAEMON:
+            return result
+        
+        return self._cached(("class", class_name), self._get_class_info, class_name)
+    
+    def _get_class_info(self, class_name: str) -> Optional[dict]:
+        """Read a class from the database (see get_class_info())."""
         with self.db:
-            cursor = self.db.conn.cursor()
-            
-            # Try exact match first
-            cursor.execute("""
-                SELECT id, name, module, description, sample_code, 
-                       compatibility, notes, file_path
-                FROM classes 
-                WHERE name = ? COLLATE NOCASE
-            """, (class_name,))
-            
-            row = cursor.fetchone()
+            row = self.db.conn.execute("""
+                SELECT id FROM classes WHERE name = ? COLLATE NOCASE
+            """, (class_name,)).fetchone()
             if not row:
                 return None
             
-            class_id, name, module, desc, code, compat, notes, path = row
-            
-            # Get properties
-            cursor.execute("""
-                SELECT name, type, description, read_only, shared
-                FROM properties
-                WHERE class_id = ?
-                ORDER BY name
-            """, (class_id,))
-            properties = cursor.fetchall()
-            
-            # Get methods
-            cursor.execute("""
-                SELECT name, description, return_type, parameters, shared, sample_code
-                FROM methods
-                WHERE class_id = ?
-                ORDER BY name
-            """, (class_id,))
-            methods = cursor.fetchall()
-            
-            return {
-                'id': class_id,
-                'name': name,
-                'module': module,
-                'description': desc,
-                'sample_code': code,
-                'compatibility': compat,
-                'notes': notes,
-                'file_path': path,
-                'properties': properties,
-                'methods': methods
-            }
+            # Class with its properties and methods, ordered by name
+            return self.db.get_class_doc(row[0])
     
     def get_method_info(self, class_name: str, method_name: str) -> Optional[dict]:
         """Get detailed information about a method.
@@ -121,6 +183,15 @@ class XojoDocCLI:
         Returns:
             Dictionary with method info or None if not found
         """
+        result = self._ask_daemon("method", class_name=class_name, method_name=method_name)
+        if result is not _NO_DAEMON:
+            return result
+        
+        return self._cached(("method", class_name, method_name), self._get_method_info,
+                            class_name, method_name)
+    
+    def _get_method_info(self, class_name: str, method_name: str) -> Optional[dict]:
+        """Read a method from the database (see get_method_info())."""
         with self.db:
             cursor = self.db.conn.cursor()
             
@@ -160,6 +231,41 @@ class XojoDocCLI:
                 'shared': shared
             }
     
+    def print_panel(self, text: str, **style: Any) -> None:
+        """Print text in a rich Panel, or as is in plain mode.
+        
+        Args:
+            text: Panel content
+            **style: Panel options (style, border_style, expand, ...)
+        """
+        if self.plain:
+            self.console.print(text)
+            return
+        
+        from rich.panel import Panel
+        self.console.print(Panel(text, **style))
+    
+    def print_table(self, columns: List[Tuple[str, Dict[str, Any]]], rows: List[Tuple]) -> None:
+        """Print rows in a rich Table, or tab-separated in plain mode.
+        
+        Args:
+            columns: (header, column options) for each column
+            rows: Cell values of each row
+        """
+        if self.plain:
+            self.console.print("\t".join(header for header, _ in columns))
+            for row in rows:
+                self.console.print("\t".join(row))
+            return
+        
+        from rich.table import Table
+        table = Table(show_header=True, header_style="bold cyan")
+        for header, options in columns:
+            table.add_column(header, **options)
+        for row in rows:
+            table.add_row(*row)
+        self.console.print(table)
+    
     def display_class(self, class_info: dict, show_all: bool = False):
         """Display class information.
         
@@ -169,24 +275,24 @@ class XojoDocCLI:
         """
         # Header
         title = f"{class_info['module']}.{class_info['name']}"
-        console.print(Panel(title, style="bold blue", expand=False))
-        console.print()
+        self.print_panel(title, style="bold blue", expand=False)
+        self.console.print()
         
         # Description
         if class_info['description']:
-            console.print("[bold]Description:[/bold]")
-            console.print(class_info['description'])
-            console.print()
+            self.console.print("[bold]Description:[/bold]")
+            self.console.print(class_info['description'])
+            self.console.print()
         
         # Sample code
         if class_info['sample_code']:
-            console.print("[bold]Example:[/bold]")
-            console.print(Panel(class_info['sample_code'], border_style="green"))
-            console.print()
+            self.console.print("[bold]Example:[/bold]")
+            self.print_panel(class_info['sample_code'], border_style="green")
+            self.console.print()
         
         # Properties
         if class_info['properties']:
-            console.print(f"[bold]Properties ({len(class_info['properties'])}):[/bold]")
+            self.console.print(f"[bold]Properties ({len(class_info['properties'])}):[/bold]")
             
             props_to_show = class_info['properties'] if show_all else class_info['properties'][:5]
             
@@ -200,16 +306,12 @@ class XojoDocCLI:
                         flags.append("Shared")
                     flag_str = ", ".join(flags) if flags else "-"
                     
-                    console.print(f"\n[cyan bold]{name}[/cyan bold] [dim]({ptype or '?'})[/dim] [magenta]{flag_str}[/magenta]")
+                    self.console.print(f"\n[cyan bold]{name}[/cyan bold] [dim]({ptype or '?'})[/dim] [magenta]{flag_str}[/magenta]")
                     if desc:
-                        console.print(f"  {desc}")
+                        self.console.print(f"  {desc}")
             else:
                 # Table view without descriptions
-                prop_table = Table(show_header=True, header_style="bold cyan")
-                prop_table.add_column("Name", style="cyan")
-                prop_table.add_column("Type", style="yellow")
-                prop_table.add_column("Flags", style="magenta")
-                
+                rows = []
                 for name, ptype, desc, read_only, shared in props_to_show:
                     flags = []
                     if read_only:
@@ -217,18 +319,22 @@ class XojoDocCLI:
                     if shared:
                         flags.append("Shared")
                     flag_str = ", ".join(flags) if flags else "-"
-                    prop_table.add_row(name, ptype or "?", flag_str)
+                    rows.append((name, ptype or "?", flag_str))
                 
-                console.print(prop_table)
+                self.print_table([
+                    ("Name", {"style": "cyan"}),
+                    ("Type", {"style": "yellow"}),
+                    ("Flags", {"style": "magenta"}),
+                ], rows)
             
             if not show_all and len(class_info['properties']) > 5:
-                console.print(f"[dim]... and {len(class_info['properties']) - 5} more[/dim]")
+                self.console.print(f"[dim]... and {len(class_info['properties']) - 5} more[/dim]")
             
-            console.print()
+            self.console.print()
         
         # Methods
         if class_info['methods']:
-            console.print(f"[bold]Methods ({len(class_info['methods'])}):[/bold]")
+            self.console.print(f"[bold]Methods ({len(class_info['methods'])}):[/bold]")
             
             methods_to_show = class_info['methods'] if show_all else class_info['methods'][:5]
             
@@ -239,47 +345,47 @@ class XojoDocCLI:
                     ret_str = ret or "void"
                     params_str = params if params else "()"
                     
-                    console.print(f"\n[cyan bold]{name}[/cyan bold]{params_str} -> [green]{ret_str}[/green]{shared_str}")
+                    self.console.print(f"\n[cyan bold]{name}[/cyan bold]{params_str} -> [green]{ret_str}[/green]{shared_str}")
                     
                     if desc:
-                        console.print(f"  {desc}")
+                        self.console.print(f"  {desc}")
                     
                     if code:
-                        console.print("\n  [dim]Example:[/dim]")
+                        self.console.print("\n  [dim]Example:[/dim]")
                         # Indent code block
                         code_lines = code.split('\n')
                         for line in code_lines:
-                            console.print(f"    [yellow]{line}[/yellow]")
+                            self.console.print(f"    [yellow]{line}[/yellow]")
             else:
                 # Table view without descriptions
-                method_table = Table(show_header=True, header_style="bold cyan")
-                method_table.add_column("Name", style="cyan")
-                method_table.add_column("Parameters", style="yellow", overflow="fold")
-                method_table.add_column("Returns", style="green")
-                method_table.add_column("Shared", style="magenta")
-                
+                rows = []
                 for name, desc, ret, params, shared, code in methods_to_show:
                     shared_str = "Yes" if shared else ""
                     ret_str = ret or "void"
                     params_str = params if params else "()"
-                    method_table.add_row(name, params_str, ret_str, shared_str)
+                    rows.append((name, params_str, ret_str, shared_str))
                 
-                console.print(method_table)
+                self.print_table([
+                    ("Name", {"style": "cyan"}),
+                    ("Parameters", {"style": "yellow", "overflow": "fold"}),
+                    ("Returns", {"style": "green"}),
+                    ("Shared", {"style": "magenta"}),
+                ], rows)
             
             if not show_all and len(class_info['methods']) > 5:
-                console.print(f"[dim]... and {len(class_info['methods']) - 5} more[/dim]")
+                self.console.print(f"[dim]... and {len(class_info['methods']) - 5} more[/dim]")
             
-            console.print()
+            self.console.print()
         
         # Notes
         if class_info['notes']:
-            console.print("[bold]Notes:[/bold]")
-            console.print(class_info['notes'])
-            console.print()
+            self.console.print("[bold]Notes:[/bold]")
+            self.console.print(class_info['notes'])
+            self.console.print()
         
         # Compatibility
         if class_info['compatibility']:
-            console.print(f"[dim]Compatibility: {class_info['compatibility']}[/dim]")
+            self.console.print(f"[dim]Compatibility: {class_info['compatibility']}[/dim]")
     
     def display_method(self, method_info: dict):
         """Display method information.
@@ -289,8 +395,8 @@ class XojoDocCLI:
         """
         # Header
         title = f"{method_info['module']}.{method_info['class_name']}.{method_info['name']}"
-        console.print(Panel(title, style="bold blue", expand=False))
-        console.print()
+        self.print_panel(title, style="bold blue", expand=False)
+        self.console.print()
         
         # Signature (constructed from parameters and return type)
         params = method_info['parameters'] or "()"
@@ -299,37 +405,55 @@ class XojoDocCLI:
         if ret:
             signature += f" As {ret}"
         
-        console.print("[bold]Signature:[/bold]")
-        console.print(f"  {signature}")
-        console.print()
+        self.console.print("[bold]Signature:[/bold]")
+        self.console.print(f"  {signature}")
+        self.console.print()
         
         # Shared flag
         if method_info.get('shared'):
-            console.print("[yellow]Shared method[/yellow]")
-            console.print()
+            self.console.print("[yellow]Shared method[/yellow]")
+            self.console.print()
         
         # Description
         if method_info['description']:
-            console.print("[bold]Description:[/bold]")
-            console.print(method_info['description'])
-            console.print()
+            self.console.print("[bold]Description:[/bold]")
+            self.console.print(method_info['description'])
+            self.console.print()
         
         # Parameters details
         if method_info['parameters']:
-            console.print("[bold]Parameters:[/bold]")
-            console.print(method_info['parameters'])
-            console.print()
+            self.console.print("[bold]Parameters:[/bold]")
+            self.console.print(method_info['parameters'])
+            self.console.print()
         
         # Return type
         if method_info['return_type']:
-            console.print(f"[bold]Returns:[/bold] {method_info['return_type']}")
-            console.print()
+            self.console.print(f"[bold]Returns:[/bold] {method_info['return_type']}")
+            self.console.print()
         
         # Sample code
         if method_info['sample_code']:
-            console.print("[bold]Example:[/bold]")
-            console.print(Panel(method_info['sample_code'], border_style="green"))
-            console.print()
+            self.console.print("[bold]Example:[/bold]")
+            self.print_panel(method_info['sample_code'], border_style="green")
+            self.console.print()
+    
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Complete a class name, or a member name given as Class.Member.
+        
+        Args:
+            prefix: Start of the name
+            limit: Maximum number of names
+            
+        Returns:
+            Matching names, in alphabetical order
+        """
+        result = self._ask_daemon("complete", prefix=prefix, limit=limit)
+        if result is not _NO_DAEMON:
+            return result
+        
+        # Loaded once per index generation, then answered from memory
+        names = self._cached(("name_index",), NameIndex.load, self.db)
+        return names.complete(prefix, limit)
     
     def display_search_results(self, results: List[Tuple]):
         """Display search results.
@@ -338,18 +462,18 @@ class XojoDocCLI:
             results: List of (id, name, module, description) tuples
         """
         if not results:
-            console.print("[yellow]No results found.[/yellow]")
+            self.console.print("[yellow]No results found.[/yellow]")
             return
         
-        console.print(f"[bold]Found {len(results)} result(s):[/bold]\n")
+        self.console.print(f"[bold]Found {len(results)} result(s):[/bold]\n")
         
         for idx, (class_id, name, module, desc) in enumerate(results, 1):
-            console.print(f"[cyan]{idx}. {module}.{name}[/cyan]")
+            self.console.print(f"[cyan]{idx}. {module}.{name}[/cyan]")
             if desc:
                 # Truncate long descriptions
                 short_desc = desc[:100] + "..." if len(desc) > 100 else desc
-                console.print(f"   {short_desc}")
-            console.print()
+                self.console.print(f"   {short_desc}")
+            self.console.print()
 
 
 @click.command()
@@ -360,7 +484,16 @@ class XojoDocCLI:
 @click.option('--all', '-a', is_flag=True, help='Show all properties and methods')
 @click.option('--db-path', default='xojo.db', help='Path to database')
 @click.option('--reindex', is_flag=True, help='Rebuild the documentation database')
-def main(query, show_class, show_method, limit, all, db_path, reindex):
+@click.option('--jobs', '-j', default=1, metavar='N', help='Parser processes for --reindex (0 = one per CPU)')
+@click.option('--plain', is_flag=True, help='Plain text output, no colors (fastest startup)')
+@click.option('--serve', is_flag=True, help='Run a query daemon that later xojodoc calls use')
+@click.option('--http', 'http', is_flag=True, help='Serve the HTTP/JSON query API')
+@click.option('--host', default='127.0.0.1', help='Interface for --http')
+@click.option('--port', default=8080, help='Port for --http')
+@click.option('--complete', 'complete_prefix', metavar='PREFIX',
+              help='Print class names (or Class.Member names) starting with PREFIX')
+def main(query, show_class, show_method, limit, all, db_path, reindex, jobs, plain, serve,
+         http, host, port, complete_prefix):
     """XojoDoc - Command-line documentation browser for Xojo.
     
     USAGE:
@@ -370,6 +503,11 @@ def main(query, show_class, show_method, limit, all, db_path, reindex):
       xojodoc -c CLASS             Show class details
       xojodoc -c CLASS -m METHOD   Show method details
       xojodoc --reindex            Rebuild documentation database
+      xojodoc --reindex -j N       Rebuild using N parser processes
+      xojodoc --plain QUERY        Search, printing plain text (for scripts/editors)
+      xojodoc --serve              Keep the database warm for faster lookups
+      xojodoc --http --port 8080   Serve the database as an HTTP/JSON API
+      xojodoc --complete PREFIX    List names starting with PREFIX (for editors)
     
     EXAMPLES:
     
@@ -380,6 +518,8 @@ def main(query, show_class, show_method, limit, all, db_path, reindex):
       xojodoc -c Color -a          Show Color with all details
       xojodoc --reindex            Rebuild database
     """
+    console = get_console(plain)
+    
     # Handle reindex command
     if reindex:
         from xojodoc.indexer import Indexer
@@ -393,22 +533,52 @@ def main(query, show_class, show_method, limit, all, db_path, reindex):
         
         indexer = Indexer(
             html_root=config.get_html_root(),
-            db_path=config.get_database_path()
+            db_path=config.get_database_path(),
+            parser_backend=config.get_parser_backend(),
+            fts_layout=config.get_fts_layout()
         )
         
-        indexer.build_index(verbose=True, force=True)
+        indexer.build_index(verbose=True, force=True, jobs=jobs)
         
         console.print("\n[green]✓ Reindex complete![/green]")
         console.print(f"Database: {config.get_database_path()}")
         return
     
+    # Run the query daemon until interrupted
+    if serve:
+        from xojodoc.daemon import QueryDaemon
+        
+        try:
+            QueryDaemon(db_path).serve_forever()
+        except RuntimeError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            sys.exit(1)
+        return
+    
+    # Serve the HTTP API until interrupted
+    if http:
+        from xojodoc.http_server import QueryServer
+        
+        if not Path(db_path).exists():
+            console.print(f"[red]Error: Database not found: {db_path}[/red]")
+            sys.exit(1)
+        QueryServer(db_path).run(host, port)
+        return
+    
     # Initialize CLI
-    cli = XojoDocCLI(db_path)
+    cli = XojoDocCLI(db_path, plain=plain)
+    
+    # Name completion: one name per line, for shells and editors
+    if complete_prefix is not None:
+        for name in cli.complete(complete_prefix, limit):
+            click.echo(name)
+        return
     
     # No arguments at all -> launch TUI
     if not query and not show_class:
         from xojodoc.tui import main as tui_main
         console.print("[cyan]Launching interactive browser...[/cyan]")
+        cli.db.close()
         tui_main(cli.db.db_path)
         return
     
@@ -441,4 +611,7 @@ def main(query, show_class, show_method, limit, all, db_path, reindex):
 
 
 if __name__ == "__main__":
+    # Required for --jobs worker processes in the frozen executable
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
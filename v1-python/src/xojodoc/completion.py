@@ -0,0 +1,148 @@
+"""Name completion for XojoDoc.
+
+NameIndex holds every class name and every qualified member name
+("Timer.Reset") in sorted arrays, so completions are a binary search for the
+start of the prefix range and a short scan, without touching SQLite.
+The indexer stores it in the database (see NameIndex.save()), so loading it
+is a single read.
+"""
+
+import bisect
+import sys
+import zlib
+from typing import Iterable, List, Tuple
+
+from xojodoc.database import Database
+
+
+# meta table key of the serialized index
+NAME_INDEX_KEY = "name_index"
+
+# Kinds of names
+CLASS, PROPERTY, METHOD = "c", "p", "m"
+
+
+class NameIndex:
+    """Sorted class and member names with case-insensitive prefix search."""
+
+    def __init__(self, names: List[str], kinds: str):
+        """Initialize index.
+
+        Args:
+            names: Names, sorted by casefolded name, then name (see from_names())
+            kinds: Kind of each name (CLASS, PROPERTY or METHOD)
+        """
+        self.names = names
+        self.kinds = kinds
+        # Classes and members are searched separately: a prefix without a
+        # dot completes class names only, "Class.Mem" the members of Class
+        self.classes = [name for name, kind in zip(names, kinds) if kind == CLASS]
+        self.members = [name for name, kind in zip(names, kinds) if kind != CLASS]
+        self.class_keys = [name.casefold() for name in self.classes]
+        self.member_keys = [name.casefold() for name in self.members]
+
+    @classmethod
+    def from_names(cls, entries: Iterable[Tuple[str, str]]) -> "NameIndex":
+        """Build an index from (name, kind) pairs in any order, with duplicates.
+
+        Args:
+            entries: (name, kind) pairs
+
+        Returns:
+            NameIndex
+        """
+        entries = sorted(set(entries), key=lambda entry: (entry[0].casefold(), entry[0]))
+        return cls([name for name, _ in entries], "".join(kind for _, kind in entries))
+
+    @classmethod
+    def build(cls, db: Database) -> "NameIndex":
+        """Build the index of the classes and members in a database.
+
+        Args:
+            db: Connected database
+
+        Returns:
+            NameIndex
+        """
+        cursor = db.conn.execute(f"""
+            SELECT name, '{CLASS}' FROM classes
+            UNION ALL
+            SELECT c.name || '.' || p.name, '{PROPERTY}'
+            FROM properties p JOIN classes c ON c.id = p.class_id
+            UNION ALL
+            SELECT c.name || '.' || m.name, '{METHOD}'
+            FROM methods m JOIN classes c ON c.id = m.class_id
+        """)
+        return cls.from_names((row[0], row[1]) for row in cursor)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index: one kind-prefixed name per line, compressed."""
+        return zlib.compress("\n".join(kind + name for kind, name in zip(self.kinds, self.names)).encode())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "NameIndex":
+        """Load an index serialized with to_bytes()."""
+        text = zlib.decompress(data).decode()
+        lines = text.split("\n") if text else []
+        return cls([line[1:] for line in lines], "".join(line[:1] for line in lines))
+
+    def save(self, db: Database) -> None:
+        """Store the index in a database.
+
+        Args:
+            db: Connected, writable database
+        """
+        db.set_meta(NAME_INDEX_KEY, self.to_bytes())
+
+    @classmethod
+    def load(cls, db: Database) -> "NameIndex":
+        """Load the index stored in a database.
+
+        Databases indexed by older versions have no stored index; it is then
+        built from the tables.
+
+        Args:
+            db: Connected database
+
+        Returns:
+            NameIndex
+        """
+        data = db.get_meta(NAME_INDEX_KEY)
+        if data is None:
+            return cls.build(db)
+        return cls.from_bytes(data)
+
+    def complete(self, prefix: str, limit: int = 10, case_sensitive: bool = False) -> List[str]:
+        """Get the names starting with a prefix, in alphabetical order.
+
+        Args:
+            prefix: Start of a class name, or "Class.Mem" for members of Class
+            limit: Maximum number of names
+            case_sensitive: Match the case of the prefix too
+
+        Returns:
+            Up to limit names
+        """
+        if "." in prefix:
+            names, keys = self.members, self.member_keys
+        else:
+            names, keys = self.classes, self.class_keys
+
+        key = prefix.casefold()
+        results = []
+        for i in range(bisect.bisect_left(keys, key), len(keys)):
+            if not keys[i].startswith(key) or len(results) >= limit:
+                break
+            if case_sensitive and not names[i].startswith(prefix):
+                continue
+            results.append(names[i])
+        return results
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __sizeof__(self) -> int:
+        # The name strings are shared by names and classes/members
+        return (object.__sizeof__(self) + sys.getsizeof(self.kinds)
+                + sum(map(sys.getsizeof, self.names))
+                + sum(map(sys.getsizeof, self.class_keys)) + sum(map(sys.getsizeof, self.member_keys)))
@@ -26,6 +26,14 @@ html_root = C:\\Program Files\\Xojo\\Xojo 2025r2.1\\Xojo Resources\\Language Ref
 
 # Database file (created in same directory as this config)
 database = xojo.db
+
+[indexer]
+# HTML parser used to build the database: bs4 (BeautifulSoup) or lxml (faster)
+parser = bs4
+
+# Search index layout for new databases: full, or external (smaller database,
+# the searchable text is not stored twice)
+fts_layout = full
 """
 
 
@@ -35,6 +43,8 @@ class Config:
     # Default values
     DEFAULT_HTML_ROOT = r"C:\Program Files\Xojo\Xojo 2025r2.1\Xojo Resources\Language Reference\html"
     DEFAULT_DATABASE = "xojo.db"
+    DEFAULT_PARSER = "bs4"
+    DEFAULT_FTS_LAYOUT = "full"
     
     def __init__(self, config_file: Optional[str] = None):
         """Initialize configuration.
@@ -123,6 +133,8 @@ class Config:
         """Load configuration from file or use defaults."""
         self.html_root = self.DEFAULT_HTML_ROOT
         self.database = self.DEFAULT_DATABASE
+        self.parser = self.DEFAULT_PARSER
+        self.fts_layout = self.DEFAULT_FTS_LAYOUT
         
         if not self.config_file:
             return
@@ -135,6 +147,10 @@ class Config:
                 self.html_root = parser['paths'].get('html_root', self.DEFAULT_HTML_ROOT).strip()
                 self.database = parser['paths'].get('database', self.DEFAULT_DATABASE).strip()
                 
+            if 'indexer' in parser:
+                self.parser = parser['indexer'].get('parser', self.DEFAULT_PARSER).strip().lower()
+                self.fts_layout = parser['indexer'].get('fts_layout', self.DEFAULT_FTS_LAYOUT).strip().lower()
+                
         except Exception as e:
             print(f"Warning: Could not read {self.config_file}: {e}")
             print("Using defaults.")
@@ -147,10 +163,20 @@ class Config:
         """Get database path."""
         return self.database
     
+    def get_parser_backend(self) -> str:
+        """Get HTML parser backend used by the indexer."""
+        return self.parser
+    
+    def get_fts_layout(self) -> str:
+        """Get search index layout used for new databases."""
+        return self.fts_layout
+    
     def __repr__(self) -> str:
         """String representation."""
         return (f"Config(html_root={self.html_root}, "
-                f"database={self.database})")
+                f"database={self.database}, "
+                f"parser={self.parser}, "
+                f"fts_layout={self.fts_layout})")
 
 
 # Global config instance
@@ -172,3 +198,5 @@ if __name__ == "__main__":
     print(f"  Config file: {config.config_file or 'Not found (using defaults)'}")
     print(f"  HTML root:   {config.get_html_root()}")
     print(f"  Database:    {config.get_database_path()}")
+    print(f"  Parser:      {config.get_parser_backend()}")
+    print(f"  FTS layout:  {config.get_fts_layout()}")
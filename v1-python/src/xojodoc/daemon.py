@@ -0,0 +1,301 @@
+"""Resident query daemon for XojoDoc.
+
+`xojodoc --serve` keeps one warm read-only database connection and a cache
+of recent results (see xojodoc.cache), and serves lookups over a Unix domain
+socket, so that editor plugins and scripts do not pay for a database open per
+lookup.
+
+Protocol: one JSON object per line in each direction. Requests:
+
+    {"op": "ping"}
+    {"op": "search", "query": "graphics", "limit": 10}
+    {"op": "class", "name": "Graphics"}
+    {"op": "method", "class_name": "Graphics", "method_name": "DrawText"}
+    {"op": "complete", "prefix": "Graphics.Dr", "limit": 10}
+    {"op": "stats"}     (result cache hit/miss statistics)
+
+Responses are {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+Results have the same shape as the XojoDocCLI methods, with tuples as lists.
+
+The `xojodoc` CLI uses a running daemon for the same database automatically
+(see DaemonClient.connect()) and falls back to direct access otherwise.
+"""
+
+import hashlib
+import json
+import os
+import signal
+import socket
+import stat
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+# Unix domain sockets are not available everywhere (e.g. older Windows)
+DAEMON_SUPPORTED = hasattr(socket, "AF_UNIX")
+
+# Seconds the client waits for the daemon before falling back
+CLIENT_TIMEOUT = 5.0
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    """SIGTERM handler: stop like on Ctrl+C."""
+    raise KeyboardInterrupt
+
+
+class DaemonError(Exception):
+    """Raised when the daemon cannot be reached or fails to answer."""
+
+
+def _current_user() -> str:
+    """Get an identifier of the current user, for file names."""
+    return str(os.getuid()) if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+
+
+def socket_dir() -> Path:
+    """Get the per-user directory holding the daemon sockets.
+
+    $XDG_RUNTIME_DIR when set (private to the user by specification),
+    otherwise a xojodoc-<user> directory in the temporary directory, which
+    the daemon creates with mode 0700.
+
+    Returns:
+        Path of the directory
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isabs(runtime_dir):
+        return Path(runtime_dir)
+    return Path(tempfile.gettempdir()) / f"xojodoc-{_current_user()}"
+
+
+def socket_path(db_path: str) -> Path:
+    """Get the socket path of the daemon serving a database.
+
+    There is one daemon per user and database file.
+
+    Args:
+        db_path: Path to the SQLite database
+
+    Returns:
+        Path of the Unix domain socket
+    """
+    db_key = hashlib.blake2b(str(Path(db_path).resolve()).encode(), digest_size=8).hexdigest()
+    return socket_dir() / f"xojodoc-{db_key}.sock"
+
+
+def _is_private(path: Path) -> bool:
+    """Check that a path is not a symlink, is owned by the current user and
+    cannot be accessed by group or others.
+
+    Another local user could otherwise create the daemon socket (or the
+    directory holding it) first and answer the lookups.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if stat.S_ISLNK(st.st_mode):
+        return False
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        return False
+    return not st.st_mode & 0o077
+
+
+class DaemonClient:
+    """Connection to a running query daemon."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self._reader = sock.makefile("rb")
+
+    @classmethod
+    def connect(cls, db_path: str) -> Optional["DaemonClient"]:
+        """Connect to the daemon serving a database.
+
+        Args:
+            db_path: Path to the SQLite database
+
+        Returns:
+            DaemonClient, or None if no daemon is running
+        """
+        if not DAEMON_SUPPORTED:
+            return None
+
+        path = socket_path(db_path)
+        # Only talk to a daemon of the same user
+        if not (_is_private(path.parent) and _is_private(path)):
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CLIENT_TIMEOUT)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            # Not running, or a stale socket file of a daemon that died
+            sock.close()
+            return None
+        return cls(sock)
+
+    def request(self, op: str, **args: Any) -> Any:
+        """Send a request and wait for its result.
+
+        Args:
+            op: Operation (ping, search, class, method, complete, stats)
+            **args: Operation arguments
+
+        Returns:
+            The result of the operation
+
+        Raises:
+            DaemonError: If the daemon is gone or reports an error
+        """
+        try:
+            self.sock.sendall(json.dumps({"op": op, **args}).encode() + b"\n")
+            line = self._reader.readline()
+        except OSError as e:
+            raise DaemonError(f"Daemon connection failed: {e}") from e
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+
+        try:
+            response = json.loads(line)
+        except ValueError as e:
+            # A truncated or garbled reply: treat it like a broken connection
+            raise DaemonError(f"Malformed daemon reply: {e}") from e
+        if not isinstance(response, dict):
+            raise DaemonError("Malformed daemon reply")
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown daemon error"))
+        return response["result"]
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._reader.close()
+        self.sock.close()
+
+
+class QueryDaemon:
+    """Answers lookup requests from a warm database connection."""
+
+    def __init__(self, db_path: str):
+        """Initialize daemon.
+
+        Args:
+            db_path: Path to the SQLite database
+        """
+        from xojodoc.cli import XojoDocCLI
+
+        self.db_path = db_path
+        self.socket_path = socket_path(db_path)
+        self.cli = XojoDocCLI(db_path, plain=True, use_daemon=False)
+        # One connection (and result cache) is shared by all client threads
+        self._lock = threading.Lock()
+        self._server = None
+
+    def handle(self, request: Dict[str, Any]) -> Any:
+        """Run one request.
+
+        Args:
+            request: Decoded request object
+
+        Returns:
+            Result of the operation
+        """
+        op = request.get("op")
+        if op == "ping":
+            return "pong"
+        if op == "search":
+            return self.cli.search_classes(str(request["query"]), int(request.get("limit", 10)))
+        if op == "class":
+            return self.cli.get_class_info(str(request["name"]))
+        if op == "method":
+            return self.cli.get_method_info(str(request["class_name"]), str(request["method_name"]))
+        if op == "complete":
+            return self.cli.complete(str(request["prefix"]), int(request.get("limit", 10)))
+        if op == "stats":
+            return self.cli.cache.stats()
+        raise ValueError(f"Unknown operation: {op}")
+
+    def respond(self, line: bytes) -> bytes:
+        """Answer one request line.
+
+        Lookups go through the result cache of the CLI, which is emptied when
+        the indexer changes the database.
+
+        Args:
+            line: JSON request
+
+        Returns:
+            JSON response line
+        """
+        try:
+            with self._lock:
+                result = self.handle(json.loads(line))
+            # sqlite3.Row results are sent as lists
+            response = {"ok": True, "result": result}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        return json.dumps(response, default=list).encode() + b"\n"
+
+    def serve_forever(self, verbose: bool = True) -> None:
+        """Listen on the socket until interrupted (Ctrl+C).
+
+        Args:
+            verbose: Print progress information
+        """
+        import socketserver
+
+        if not DAEMON_SUPPORTED:
+            raise RuntimeError("The query daemon needs Unix domain sockets, "
+                               "which this platform does not support")
+
+        directory = self.socket_path.parent
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _is_private(directory):
+            raise RuntimeError(f"{directory} must be a directory owned by the current user "
+                               f"and not accessible by others")
+
+        client = DaemonClient.connect(self.db_path)
+        if client:
+            client.close()
+            raise RuntimeError(f"A daemon is already serving {self.db_path} at {self.socket_path}")
+        # Left behind by a daemon that did not shut down cleanly
+        self.socket_path.unlink(missing_ok=True)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        self.wfile.write(daemon.respond(line))
+
+        # Only the owner may connect
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+
+        if threading.current_thread() is threading.main_thread():
+            # Shut down cleanly (removing the socket) when killed, too
+            signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+
+        if verbose:
+            print(f"Serving {self.db_path} on {self.socket_path} (Ctrl+C to stop)...")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            if verbose:
+                print("\nStopped serving.")
+        finally:
+            self._server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        """Stop serve_forever() from another thread."""
+        if self._server:
+            self._server.shutdown()
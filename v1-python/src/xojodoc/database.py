@@ -3,9 +3,16 @@
 Handles SQLite database creation, schema management, and data storage.
 """
 
+import bisect
+import json
+import re
 import sqlite3
+import sys
+import unicodedata
+import zlib
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
 from dataclasses import dataclass
 
 
@@ -42,22 +49,217 @@ class XojoMethod:
     sample_code: Optional[str] = None
 
 
+# Layouts of the search_index FTS5 table:
+# - full: the table stores its own copy of the indexed text
+# - external: the text is read from the search_content view over the base
+#   tables when needed, so only the full-text index itself is stored
+FTS_LAYOUTS = ("full", "external")
+
+# bm25() weights of the search_index columns (class_name, module, description,
+# content), so that a class name hit outranks a module hit, which outranks a
+# hit in a description or member
+SEARCH_RANK_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+# Member columns stored in the class documents (see Database.get_class_doc()),
+# in the order the CLI and TUI unpack them
+PROPERTY_DOC_COLUMNS = ("name", "type", "description", "read_only", "shared")
+METHOD_DOC_COLUMNS = ("name", "description", "return_type", "parameters", "shared", "sample_code")
+
+
+def is_deprecated_module(module: str) -> bool:
+    """Check whether classes of a module are deprecated ("deprecated", "deprecated_...").
+    
+    Args:
+        module: Module name
+        
+    Returns:
+        True for deprecated modules
+    """
+    return module.lower().startswith('deprecated')
+
+
+def _ascii_lower(text: str) -> str:
+    """Lowercase ASCII letters only, like SQLite's LOWER() and NOCASE."""
+    return "".join(c.lower() if c.isascii() else c for c in text)
+
+
+# Characters replaced by spaces before a query is handed to FTS5
+_FTS_UNSAFE = re.compile(r'[^\w\s*]')
+
+# Words FTS5 reads as operators rather than terms
+_FTS_KEYWORDS = {"AND", "OR", "NOT", "NEAR"}
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip diacritics, like the FTS5 unicode61 tokenizer."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return "".join(c for c in unicodedata.normalize("NFD", text) if not unicodedata.combining(c))
+
+
+def search_terms(query: str) -> Optional[List[str]]:
+    """Get the terms that search_classes() matches as prefixes for a query.
+    
+    Args:
+        query: Free text query
+        
+    Returns:
+        Folded terms, or None for queries that are not plain prefix searches
+        (module.class lookups, * wildcards, FTS5 operators, underscores)
+    """
+    if '.' in query or '_' in query:
+        return None
+    terms = _FTS_UNSAFE.sub(' ', query).split()
+    if not terms or any('*' in term or term in _FTS_KEYWORDS for term in terms):
+        return None
+    return [_fold(term) for term in terms]
+
+
+def index_tokens(text: str) -> Tuple[str, ...]:
+    """Split indexed text into sorted, unique, folded tokens.
+    
+    Args:
+        text: Searchable text of a class
+        
+    Returns:
+        Tokens, for matches_terms()
+    """
+    return tuple(sorted(set(re.findall(r'[^\W_]+', _fold(text)))))
+
+
+def matches_terms(tokens: Tuple[str, ...], terms: List[str]) -> bool:
+    """Check that each term is a prefix of some token, like a prefix search.
+    
+    Args:
+        tokens: Sorted tokens from index_tokens()
+        terms: Terms from search_terms()
+        
+    Returns:
+        True if the text of the tokens matches all terms
+    """
+    for term in terms:
+        i = bisect.bisect_left(tokens, term)
+        if i == len(tokens) or not tokens[i].startswith(term):
+            return False
+    return True
+
+
+def _nocase_prefix_range(prefix: str) -> Tuple[str, Optional[str]]:
+    """Get the NOCASE bounds [low, high) of all strings starting with prefix.
+    
+    NOCASE compares ASCII letters as lowercase, so the upper bound is the
+    prefix with its last character replaced by the next character that can
+    occur after folding: after '@' that is '[', as 'A'-'Z' fold to 'a'-'z'.
+    
+    Args:
+        prefix: Non-empty prefix
+        
+    Returns:
+        Tuple of (low, high); high is None if no string sorts above the prefix
+    """
+    low = _ascii_lower(prefix)
+    # The last code point has no successor: bump the character before it
+    head = low.rstrip(chr(sys.maxunicode))
+    if not head:
+        return low, None
+    last = ord(head[-1])
+    if last == ord('@'):
+        following = '['
+    elif last == 0xD7FF:
+        # Surrogates cannot be stored in SQLite text
+        following = chr(0xE000)
+    else:
+        following = chr(last + 1)
+    return low, head[:-1] + following
+
+
+@dataclass
+class FileState:
+    """Stored state of an indexed documentation file, used for change detection."""
+    mtime: Optional[float] = None
+    size: Optional[int] = None
+    content_hash: Optional[str] = None
+
+
 class Database:
     """Manages the SQLite database for XojoDoc."""
 
-    def __init__(self, db_path: str = "xojo.db"):
+    # Page cache of read-only connections, in KiB (negative cache_size)
+    READ_ONLY_CACHE_KB = 16384
+    
+    # read-only connections memory-map the database file rounded up to a
+    # multiple of this, so they read pages straight from the OS page cache,
+    # shared by all processes, instead of copying them into their own cache
+    MMAP_ALIGN = 1024 * 1024
+    
+    # Prepared statements kept per connection; the query methods use fixed
+    # SQL texts, so a long-lived connection prepares each of them only once
+    CACHED_STATEMENTS = 256
+    
+    def __init__(self, db_path: str = "xojo.db", fts_layout: str = "full",
+                 read_only: bool = False, immutable: bool = False, memory_map: bool = True):
         """Initialize database connection.
         
         Args:
             db_path: Path to SQLite database file
+            fts_layout: Layout of the search index when the schema is created
+                        ("full" or "external", see FTS_LAYOUTS). Existing
+                        databases keep their layout until migrated.
+            read_only: Open the database read-only (mode=ro), for browsing.
+                       The connection may be shared between threads and is
+                       meant to be kept open for the life of the process.
+            immutable: With read_only, also tell SQLite that the file cannot
+                       change, which skips all locking. Only safe when no
+                       indexer can write to the database meanwhile.
+            memory_map: With read_only, read the database through a memory
+                        map (mmap_size) sized to the file
         """
+        if fts_layout not in FTS_LAYOUTS:
+            raise ValueError(f"Unknown FTS layout: {fts_layout}")
+        if immutable and not read_only:
+            raise ValueError("immutable requires read_only")
+            
         self.db_path = Path(db_path)
+        self.fts_layout = fts_layout
+        self.read_only = read_only
+        self.immutable = immutable
+        self.memory_map = memory_map
         self.conn: Optional[sqlite3.Connection] = None
+        self._transaction_depth = 0
+        self._fts_external: Optional[bool] = None
+        self._has_deprecated_flag: Optional[bool] = None
+        # One entry per active `with` block: whether it opened the connection
+        self._opened_by_with: List[bool] = []
         
     def connect(self) -> None:
-        """Connect to the database."""
-        self.conn = sqlite3.connect(self.db_path)
+        """Connect to the database.
+        
+        The connection runs in autocommit mode: every statement is committed
+        on its own unless it runs inside transaction().
+        """
+        if self.read_only:
+            uri = self.db_path.resolve().as_uri() + "?mode=ro"
+            if self.immutable:
+                uri += "&immutable=1"
+            self.conn = sqlite3.connect(uri, uri=True, isolation_level=None,
+                                        check_same_thread=False,
+                                        cached_statements=self.CACHED_STATEMENTS)
+            self.conn.execute(f"PRAGMA cache_size = -{self.READ_ONLY_CACHE_KB}")
+            if self.memory_map:
+                self.conn.execute(f"PRAGMA mmap_size = {self._mmap_size()}")
+        else:
+            self.conn = sqlite3.connect(self.db_path, isolation_level=None,
+                                        cached_statements=self.CACHED_STATEMENTS)
         self.conn.row_factory = sqlite3.Row
+        self._transaction_depth = 0
+        self._fts_external = None
+        self._has_deprecated_flag = None
+        
+    def _mmap_size(self) -> int:
+        """Get the mmap_size for the database file: its size rounded up to MMAP_ALIGN."""
+        size = self.db_path.stat().st_size
+        return -(-max(size, 1) // self.MMAP_ALIGN) * self.MMAP_ALIGN
         
     def close(self) -> None:
         """Close database connection."""
@@ -65,6 +267,71 @@ class Database:
             self.conn.close()
             self.conn = None
             
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group writes into a single transaction.
+        
+        Commits on success and rolls back if the block raises. Nested calls
+        use savepoints, so an inner block can fail and be rolled back without
+        discarding the work of the enclosing transaction.
+        
+        Example:
+            with db.transaction():
+                class_id = db.insert_class(xojo_class)
+                db.insert_properties(class_id, properties)
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        if self._transaction_depth == 0:
+            begin, commit, rollback = "BEGIN", "COMMIT", "ROLLBACK"
+        else:
+            name = f"sp{self._transaction_depth}"
+            begin = f"SAVEPOINT {name}"
+            commit = f"RELEASE {name}"
+            rollback = f"ROLLBACK TO {name}"
+            
+        self.conn.execute(begin)
+        self._transaction_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._transaction_depth -= 1
+            self.conn.execute(rollback)
+            if self._transaction_depth > 0:
+                # ROLLBACK TO keeps the savepoint open
+                self.conn.execute(commit)
+            raise
+        else:
+            self._transaction_depth -= 1
+            self.conn.execute(commit)
+            
+    @contextmanager
+    def bulk_load(self) -> Iterator[None]:
+        """Apply fast, non-durable settings while (re)building the index.
+        
+        The rollback journal is kept in memory, fsync is disabled and the page
+        cache is enlarged. The previous settings are restored on exit, so normal
+        use of the database stays durable. Must not be entered inside a
+        transaction.
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        journal_mode = self.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        synchronous = self.conn.execute("PRAGMA synchronous").fetchone()[0]
+        cache_size = self.conn.execute("PRAGMA cache_size").fetchone()[0]
+        
+        self.conn.execute("PRAGMA journal_mode = MEMORY")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("PRAGMA cache_size = -65536")  # 64 MB
+        try:
+            yield
+        finally:
+            self.conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+            self.conn.execute(f"PRAGMA synchronous = {int(synchronous)}")
+            self.conn.execute(f"PRAGMA cache_size = {int(cache_size)}")
+            
     def create_schema(self) -> None:
         """Create database schema."""
         if not self.conn:
@@ -84,11 +351,27 @@ class Database:
                 notes TEXT,
                 file_path TEXT,
                 file_mtime REAL,
+                file_size INTEGER,
+                content_hash TEXT,
                 indexed_at REAL,
+                is_deprecated INTEGER NOT NULL DEFAULT 0,
                 UNIQUE(module, name)
             )
         """)
         
+        # Databases created by older versions lack the change detection columns
+        cursor.execute("PRAGMA table_info(classes)")
+        columns = {row[1] for row in cursor.fetchall()}
+        for column, column_type in (('file_mtime', 'REAL'), ('file_size', 'INTEGER'),
+                                    ('content_hash', 'TEXT'), ('indexed_at', 'REAL')):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE classes ADD COLUMN {column} {column_type}")
+        if 'is_deprecated' not in columns:
+            # Same rule as is_deprecated_module() (LIKE ignores ASCII case)
+            cursor.execute("ALTER TABLE classes ADD COLUMN is_deprecated INTEGER NOT NULL DEFAULT 0")
+            cursor.execute("UPDATE classes SET is_deprecated = module LIKE 'deprecated%'")
+            self._has_deprecated_flag = True
+        
         # Properties table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS properties (
@@ -124,11 +407,28 @@ class Database:
             ON classes(name)
         """)
         
+        # Case-insensitive name lookups and prefix ranges
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_classes_name_nocase 
+            ON classes(name COLLATE NOCASE)
+        """)
+        
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_classes_module 
             ON classes(module)
         """)
         
+        # Listing and counting the current (non-deprecated) classes by name
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_classes_deprecated_name 
+            ON classes(is_deprecated, name)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_classes_file_path 
+            ON classes(file_path)
+        """)
+        
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_properties_name 
             ON properties(name)
@@ -139,24 +439,172 @@ class Database:
             ON methods(name)
         """)
         
-        # Full-text search virtual table
+        # Member lookups by class (display, member by name, FTS content,
+        # deletes); replace the class_id-only indexes of older versions
         cursor.execute("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            CREATE INDEX IF NOT EXISTS idx_properties_class_name 
+            ON properties(class_id, name COLLATE NOCASE)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_methods_class_name 
+            ON methods(class_id, name COLLATE NOCASE)
+        """)
+        
+        cursor.execute("DROP INDEX IF EXISTS idx_properties_class_id")
+        cursor.execute("DROP INDEX IF EXISTS idx_methods_class_id")
+        
+        # Database-wide values, such as the index generation
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        
+        # Each class with its members, ready for display (see get_class_doc())
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'class_docs'")
+        if not cursor.fetchone():
+            cursor.execute("""
+                CREATE TABLE class_docs (
+                    class_id INTEGER PRIMARY KEY,
+                    doc BLOB NOT NULL
+                )
+            """)
+            self.rebuild_class_docs()
+        
+        # Searchable text of each class, computed from the base tables
+        cursor.execute(self._SEARCH_CONTENT_VIEW)
+        
+        # Full-text search virtual table
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_index'")
+        if not cursor.fetchone():
+            self._create_search_index(self.fts_layout)
+        elif not self._search_index_keyed_by_id():
+            # Older versions let FTS5 pick the rowids; key them by class id
+            self.convert_search_index("full")
+        
+    # Text indexed for each class: class name, module and description,
+    # followed by the names and descriptions of all its properties and methods
+    _SEARCH_CONTENT_VIEW = """
+        CREATE VIEW IF NOT EXISTS search_content AS
+        SELECT
+            c.id AS id,
+            c.name AS class_name,
+            c.module AS module,
+            COALESCE(c.description, '') AS description,
+            c.name || ' ' || c.module || ' ' || COALESCE(c.description, '')
+            || COALESCE((
+                SELECT ' ' || group_concat(member, ' ') FROM (
+                    SELECT p.name || COALESCE(' ' || p.description, '') AS member
+                    FROM properties p WHERE p.class_id = c.id ORDER BY p.id
+                )
+            ), '')
+            || COALESCE((
+                SELECT ' ' || group_concat(member, ' ') FROM (
+                    SELECT m.name || COALESCE(' ' || m.description, '') AS member
+                    FROM methods m WHERE m.class_id = c.id ORDER BY m.id
+                )
+            ), '') AS content
+        FROM classes c
+    """
+    
+    def _create_search_index(self, layout: str) -> None:
+        """Create the search_index FTS5 table with the given layout."""
+        options = ""
+        if layout == "external":
+            options = ", content='search_content', content_rowid='id'"
+            
+        self.conn.execute(f"""
+            CREATE VIRTUAL TABLE search_index USING fts5(
                 class_name,
                 module,
                 description,
-                content
+                content{options}
             )
         """)
+        self._fts_external = layout == "external"
+        
+    def _is_fts_external(self) -> bool:
+        """Check whether the search index uses the external-content layout."""
+        if self._fts_external is None:
+            row = self.conn.execute(
+                "SELECT sql FROM sqlite_master WHERE name = 'search_index'"
+            ).fetchone()
+            self._fts_external = bool(row and "search_content" in row[0])
+        return self._fts_external
         
-        self.conn.commit()
+    def _current_classes(self, alias: str) -> str:
+        """Get the SQL condition selecting classes that are not deprecated.
         
-    def insert_class(self, xojo_class: XojoClass, file_mtime: Optional[float] = None) -> int:
+        Args:
+            alias: Alias of the classes table in the query
+        """
+        if self._has_deprecated_flag is None:
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(classes)")}
+            self._has_deprecated_flag = 'is_deprecated' in columns
+        if self._has_deprecated_flag:
+            return f"{alias}.is_deprecated = 0"
+        # Created by an older version, without the flag
+        return f"{alias}.module NOT LIKE 'deprecated%'"
+        
+    def _search_index_keyed_by_id(self) -> bool:
+        """Check that every search index row has the id of its class as rowid."""
+        if self._is_fts_external():
+            return True
+            
+        row = self.conn.execute("""
+            SELECT 1 FROM search_index s
+            LEFT JOIN classes c ON c.id = s.rowid
+            WHERE c.id IS NULL OR c.name != s.class_name OR c.module != s.module
+            LIMIT 1
+        """).fetchone()
+        return row is None
+        
+    def get_fts_layout(self) -> str:
+        """Get the layout of the search index in this database.
+        
+        Returns:
+            "full" or "external"
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        return "external" if self._is_fts_external() else "full"
+        
+    def convert_search_index(self, layout: str) -> None:
+        """Recreate the search index with another layout and repopulate it.
+        
+        Args:
+            layout: "full" or "external"
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+        if layout not in FTS_LAYOUTS:
+            raise ValueError(f"Unknown FTS layout: {layout}")
+            
+        with self.transaction():
+            self.conn.execute(self._SEARCH_CONTENT_VIEW)
+            self.conn.execute("DROP TABLE IF EXISTS search_index")
+            self._create_search_index(layout)
+            
+            if layout == "external":
+                self.conn.execute("INSERT INTO search_index(search_index) VALUES('rebuild')")
+            else:
+                self.conn.execute("""
+                    INSERT INTO search_index (rowid, class_name, module, description, content)
+                    SELECT id, class_name, module, description, content FROM search_content
+                """)
+        
+    def insert_class(self, xojo_class: XojoClass, file_mtime: Optional[float] = None,
+                     file_size: Optional[int] = None, content_hash: Optional[str] = None) -> int:
         """Insert a class into the database.
         
         Args:
             xojo_class: XojoClass object to insert
             file_mtime: File modification time (Unix timestamp)
+            file_size: File size in bytes
+            content_hash: Digest of the raw file contents
             
         Returns:
             ID of inserted class
@@ -167,10 +615,22 @@ class Database:
         import time
         
         cursor = self.conn.cursor()
+        
+        # REPLACE drops a conflicting row and the new row gets a new id, so
+        # the FTS entry keyed by the old id must go first
+        cursor.execute("""
+            SELECT id FROM classes WHERE module = ? AND name = ?
+        """, (xojo_class.module, xojo_class.name))
+        row = cursor.fetchone()
+        if row:
+            self._delete_search_entry(row[0])
+            cursor.execute("DELETE FROM class_docs WHERE class_id = ?", (row[0],))
+        
         cursor.execute("""
             INSERT OR REPLACE INTO classes 
-            (name, module, description, sample_code, compatibility, notes, file_path, file_mtime, indexed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (name, module, description, sample_code, compatibility, notes, file_path,
+             file_mtime, file_size, content_hash, indexed_at, is_deprecated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             xojo_class.name,
             xojo_class.module,
@@ -180,7 +640,10 @@ class Database:
             xojo_class.notes,
             xojo_class.file_path,
             file_mtime,
-            time.time()
+            file_size,
+            content_hash,
+            time.time(),
+            is_deprecated_module(xojo_class.module)
         ))
         
         class_id = cursor.lastrowid
@@ -188,7 +651,6 @@ class Database:
         # Note: FTS index will be updated separately after properties/methods are added
         # See update_search_index() method
         
-        self.conn.commit()
         return class_id
         
     def insert_property(self, class_id: int, prop: XojoProperty) -> int:
@@ -218,9 +680,27 @@ class Database:
             prop.description
         ))
         
-        self.conn.commit()
         return cursor.lastrowid
         
+    def insert_properties(self, class_id: int, properties: Iterable[XojoProperty]) -> None:
+        """Insert several properties of a class with a single statement.
+        
+        Args:
+            class_id: ID of the class the properties belong to
+            properties: XojoProperty objects to insert
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        self.conn.executemany("""
+            INSERT INTO properties 
+            (class_id, name, type, read_only, shared, description)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (class_id, prop.name, prop.type, prop.read_only, prop.shared, prop.description)
+            for prop in properties
+        ])
+        
     def insert_method(self, class_id: int, method: XojoMethod) -> int:
         """Insert a method into the database.
         
@@ -249,18 +729,41 @@ class Database:
             method.sample_code
         ))
         
-        self.conn.commit()
         return cursor.lastrowid
+        
+    def insert_methods(self, class_id: int, methods: Iterable[XojoMethod]) -> None:
+        """Insert several methods of a class with a single statement.
+        
+        Args:
+            class_id: ID of the class the methods belong to
+            methods: XojoMethod objects to insert
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        self.conn.executemany("""
+            INSERT INTO methods 
+            (class_id, name, parameters, return_type, shared, description, sample_code)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (class_id, method.name, method.parameters, method.return_type,
+             method.shared, method.description, method.sample_code)
+            for method in methods
+        ])
     
     def update_search_index(self, class_id: int):
         """Update FTS search index for a class including all its properties and methods.
         
         This should be called after inserting/updating a class and all its properties/methods.
-        It builds a searchable text that includes:
+        It indexes the searchable text from the search_content view:
         - Class name, module, description
         - All property names and descriptions
         - All method names and descriptions
         
+        The FTS row is keyed by the class id. With the external-content layout
+        the text is not stored, and the previous entry of the class must
+        already have been removed (see delete_class_by_path()).
+        
         Args:
             class_id: ID of the class to update in search index
         """
@@ -269,85 +772,112 @@ class Database:
             
         cursor = self.conn.cursor()
         
-        # Get class info
+        if not self._is_fts_external():
+            # Delete old FTS entry (if exists)
+            cursor.execute("DELETE FROM search_index WHERE rowid = ?", (class_id,))
+        
         cursor.execute("""
-            SELECT name, module, description
-            FROM classes
+            INSERT INTO search_index (rowid, class_name, module, description, content)
+            SELECT id, class_name, module, description, content
+            FROM search_content
             WHERE id = ?
         """, (class_id,))
         
-        row = cursor.fetchone()
+    def _delete_search_entry(self, class_id: int) -> None:
+        """Remove the FTS entry of a class whose base rows still exist."""
+        self.conn.execute("DELETE FROM search_index WHERE rowid = ?", (class_id,))
+        
+    def _build_class_doc(self, class_id: int) -> Optional[Dict[str, Any]]:
+        """Assemble the document of a class from the normalized tables."""
+        row = self.conn.execute("""
+            SELECT id, name, module, description, sample_code,
+                   compatibility, notes, file_path
+            FROM classes
+            WHERE id = ?
+        """, (class_id,)).fetchone()
         if not row:
-            return
+            return None
             
-        class_name, module, description = row
-        
-        # Get all properties
-        cursor.execute("""
-            SELECT name, description
-            FROM properties
-            WHERE class_id = ?
-        """, (class_id,))
-        
-        properties = cursor.fetchall()
-        
-        # Get all methods
-        cursor.execute("""
-            SELECT name, description
-            FROM methods
-            WHERE class_id = ?
-        """, (class_id,))
+        doc = dict(row)
+        doc['properties'] = [list(member) for member in self.conn.execute(f"""
+            SELECT {', '.join(PROPERTY_DOC_COLUMNS)} FROM properties WHERE class_id = ? ORDER BY name
+        """, (class_id,))]
+        doc['methods'] = [list(member) for member in self.conn.execute(f"""
+            SELECT {', '.join(METHOD_DOC_COLUMNS)} FROM methods WHERE class_id = ? ORDER BY name
+        """, (class_id,))]
+        return doc
+        
+    def update_class_doc(self, class_id: int) -> None:
+        """Store the display document of a class.
+        
+        Like update_search_index(), this should be called once the class and
+        all its properties and methods are inserted. The document is the class
+        row with its members ordered by name, as zlib-compressed JSON, so that
+        showing a class takes a single primary key lookup.
         
-        methods = cursor.fetchall()
-        
-        # Build searchable content
-        content_parts = [
-            class_name,
-            module,
-            description or ""
-        ]
-        
-        # Add property names and descriptions
-        for prop_name, prop_desc in properties:
-            content_parts.append(prop_name)
-            if prop_desc:
-                content_parts.append(prop_desc)
-        
-        # Add method names and descriptions
-        for method_name, method_desc in methods:
-            content_parts.append(method_name)
-            if method_desc:
-                content_parts.append(method_desc)
-        
-        content = " ".join(content_parts)
-        
-        # Delete old FTS entry (if exists)
-        cursor.execute("""
-            DELETE FROM search_index
-            WHERE rowid IN (
-                SELECT rowid FROM search_index
-                WHERE class_name = ? AND module = ?
-            )
-        """, (class_name, module))
+        Args:
+            class_id: ID of the class
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        doc = self._build_class_doc(class_id)
+        if doc is None:
+            return
+        self.conn.execute("""
+            INSERT OR REPLACE INTO class_docs (class_id, doc) VALUES (?, ?)
+        """, (class_id, zlib.compress(json.dumps(doc, separators=(",", ":")).encode())))
         
-        # Insert new FTS entry
-        cursor.execute("""
-            INSERT INTO search_index (class_name, module, description, content)
-            VALUES (?, ?, ?, ?)
-        """, (
-            class_name,
-            module,
-            description or "",
-            content
-        ))
+    def rebuild_class_docs(self) -> None:
+        """Recreate the display documents of all classes."""
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        with self.transaction():
+            self.conn.execute("DELETE FROM class_docs")
+            for (class_id,) in self.conn.execute("SELECT id FROM classes").fetchall():
+                self.update_class_doc(class_id)
+                
+    def get_class_doc(self, class_id: int) -> Optional[Dict[str, Any]]:
+        """Get a class with its properties and methods, for display.
         
-        self.conn.commit()
+        Reads the stored document of the class, and falls back to the
+        normalized tables for databases written by older versions.
         
-    def search_classes(self, query: str) -> List[Dict[str, Any]]:
+        Args:
+            class_id: Class ID
+            
+        Returns:
+            Dict of the class columns, with 'properties' and 'methods' lists
+            of PROPERTY_DOC_COLUMNS and METHOD_DOC_COLUMNS values ordered by
+            name, or None if not found
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        try:
+            row = self.conn.execute(
+                "SELECT doc FROM class_docs WHERE class_id = ?", (class_id,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # Created by an older version, without the class_docs table
+            row = None
+        if row:
+            return json.loads(zlib.decompress(row[0]))
+        return self._build_class_doc(class_id)
+            
+    def search_classes(self, query: str, limit: Optional[int] = None,
+                       offset: int = 0, include_deprecated: bool = True) -> List[Dict[str, Any]]:
         """Search classes using FTS5 with prefix matching.
         
+        Free text results are ranked by bm25() with SEARCH_RANK_WEIGHTS, best
+        match first; module.class results are ordered by name.
+        
         Args:
             query: Search query (supports module.class format or free text with prefix matching)
+            limit: Maximum results to return (None for all)
+            offset: Number of results to skip, for paging
+            include_deprecated: Also return classes of deprecated modules
             
         Returns:
             List of matching classes
@@ -362,6 +892,12 @@ class Database:
         if not query:
             return []
         
+        # SQLite treats a negative LIMIT as no limit
+        page = (-1 if limit is None else limit, offset)
+        
+        # Applied before the page is cut, so a page is always full
+        current_only = "" if include_deprecated else f"AND {self._current_classes('c')}"
+        
         # Check if query is in module.class format (e.g., "Desktop.Window")
         if '.' in query and query.count('.') == 1:
             parts = query.split('.')
@@ -369,25 +905,34 @@ class Database:
             class_part = parts[1].strip()
             
             if module_part and class_part:
-                # Direct search for module.class combination
-                cursor.execute("""
+                # Direct search for module.class combination: a case-insensitive
+                # class name prefix as a range on idx_classes_name_nocase, then
+                # the module substring on the matching rows only
+                low, high = _nocase_prefix_range(class_part)
+                bounds = (low,) if high is None else (low, high)
+                below_high = "" if high is None else "AND name < ? COLLATE NOCASE"
+                dotted = f"""
+                    FROM classes c
+                    WHERE name >= ? COLLATE NOCASE {below_high}
+                      AND instr(LOWER(module), ?) > 0 {current_only}
+                """
+                params = (*bounds, _ascii_lower(module_part))
+                cursor.execute(f"""
                     SELECT id, name, module, description
-                    FROM classes
-                    WHERE (module LIKE ? OR LOWER(module) LIKE ?)
-                      AND (name LIKE ? OR LOWER(name) LIKE ?)
+                    {dotted}
                     ORDER BY name, module
-                """, (f'%{module_part}%', f'%{module_part.lower()}%',
-                      f'{class_part}%', f'{class_part.lower()}%'))
+                    LIMIT ? OFFSET ?
+                """, (*params, *page))
                 
                 results = [dict(row) for row in cursor.fetchall()]
-                if results:
+                # Only fall through to the FTS5 search if there is no direct
+                # match at all: an empty page past the last match stays empty
+                if results or cursor.execute(f"SELECT EXISTS (SELECT 1 {dotted})", params).fetchone()[0]:
                     return results
-                # If no direct match, fall through to FTS5 search
         
         # Regular FTS5 search
-        import re
         # Remove or replace problematic characters for FTS5
-        clean_query = re.sub(r'[^\w\s*]', ' ', query)
+        clean_query = _FTS_UNSAFE.sub(' ', query)
         
         # Add prefix matching support if query doesn't already have *
         if '*' not in clean_query:
@@ -400,19 +945,83 @@ class Database:
             fts_query = clean_query
         
         try:
-            cursor.execute("""
-                SELECT DISTINCT c.id, c.name, c.module, c.description
+            # FTS rows are keyed by class id; the page is cut in SQL, so only
+            # the returned rows are materialized
+            rank = "bm25(" + ", ".join(map(str, SEARCH_RANK_WEIGHTS)) + ")"
+            cursor.execute(f"""
+                SELECT c.id, c.name, c.module, c.description
                 FROM search_index s
-                JOIN classes c ON c.name = s.class_name AND c.module = s.module
-                WHERE search_index MATCH ?
-                ORDER BY c.name, c.module
-            """, (fts_query,))
+                JOIN classes c ON c.id = s.rowid
+                WHERE search_index MATCH ? AND s.rank MATCH ? {current_only}
+                ORDER BY s.rank, c.name, c.module
+                LIMIT ? OFFSET ?
+            """, (fts_query, rank, *page))
             
             return [dict(row) for row in cursor.fetchall()]
         except Exception:
             # If FTS5 query fails, return empty results
             return []
         
+    def list_classes(self, include_deprecated: bool = True) -> List[Dict[str, Any]]:
+        """Get all classes, ordered by name.
+        
+        Args:
+            include_deprecated: Also return classes of deprecated modules
+            
+        Returns:
+            List of classes (id, name, module, description)
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        where = "" if include_deprecated else f"WHERE {self._current_classes('c')}"
+        cursor = self.conn.execute(f"""
+            SELECT id, name, module, description
+            FROM classes c
+            {where}
+            ORDER BY name
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+        
+    def count_classes(self, include_deprecated: bool = True) -> int:
+        """Count the classes.
+        
+        Args:
+            include_deprecated: Also count classes of deprecated modules
+            
+        Returns:
+            Number of classes
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        where = "" if include_deprecated else f"WHERE {self._current_classes('c')}"
+        return self.conn.execute(f"SELECT COUNT(*) FROM classes c {where}").fetchone()[0]
+        
+    def get_search_tokens(self, class_ids: Iterable[int]) -> Dict[int, Tuple[str, ...]]:
+        """Get the tokens of the indexed text of classes.
+        
+        With them, the results of a search can be narrowed to a longer query
+        in memory (see matches_terms()).
+        
+        Args:
+            class_ids: Class IDs
+            
+        Returns:
+            Dict of class ID -> tokens from index_tokens()
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        class_ids = list(class_ids)
+        if not class_ids:
+            return {}
+        cursor = self.conn.execute(f"""
+            SELECT rowid, content FROM search_index
+            WHERE rowid IN ({', '.join('?' * len(class_ids))})
+        """, class_ids)
+        return {row[0]: index_tokens(row[1]) for row in cursor.fetchall()}
+        
     def get_class_by_name(self, name: str, module: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Get a class by name.
         
@@ -478,40 +1087,136 @@ class Database:
         
         return [dict(row) for row in cursor.fetchall()]
         
+    def get_generation(self) -> int:
+        """Get the index generation.
+        
+        The generation is bumped whenever the indexer changes the indexed
+        documentation, so readers can tell whether anything they derived
+        from the database (e.g. cached responses) is still current.
+        
+        Returns:
+            Generation number (0 for databases that never recorded one)
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        except sqlite3.OperationalError:
+            # Created by an older version, without the meta table
+            return 0
+        return int(row[0]) if row else 0
+        
+    def bump_generation(self) -> int:
+        """Record that the indexed documentation changed.
+        
+        Returns:
+            The new generation number
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        generation = self.get_generation() + 1
+        self.conn.execute("""
+            INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)
+        """, (str(generation),))
+        return generation
+        
+    def get_meta(self, key: str) -> Any:
+        """Get a database-wide value from the meta table.
+        
+        Args:
+            key: Name of the value
+            
+        Returns:
+            The stored value, or None if not set
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            # Created by an older version, without the meta table
+            return None
+        return row[0] if row else None
+        
+    def set_meta(self, key: str, value: Any) -> None:
+        """Store a database-wide value in the meta table.
+        
+        Args:
+            key: Name of the value
+            value: Text, number or bytes
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+            
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        
     def __enter__(self):
-        """Context manager entry."""
-        self.connect()
+        """Context manager entry.
+        
+        Connects unless already connected, so `with` blocks can be nested
+        inside each other or used on a long-lived connection.
+        """
+        opened = self.conn is None
+        if opened:
+            self.connect()
+        self._opened_by_with.append(opened)
         return self
         
-    def needs_reindex(self, file_path: str, file_mtime: float) -> bool:
-        """Check if a file needs to be reindexed.
+    def get_file_state(self, file_path: str) -> Optional[FileState]:
+        """Get the stored change detection state of an indexed file.
         
         Args:
             file_path: Path to the file
-            file_mtime: Current file modification time
             
         Returns:
-            True if file needs reindexing
+            FileState, or None if the file is not indexed
         """
         if not self.conn:
             raise RuntimeError("Database not connected")
             
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT file_mtime FROM classes WHERE file_path = ?
+            SELECT file_mtime, file_size, content_hash FROM classes WHERE file_path = ?
         """, (file_path,))
         
         row = cursor.fetchone()
+        return FileState(*row) if row else None
         
-        # Need to index if not found or mtime changed
-        if not row:
-            return True
+    def load_manifest(self) -> Dict[str, FileState]:
+        """Load the stored state of every indexed file with a single query.
+        
+        Returns:
+            Dict of file_path -> FileState
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
             
-        stored_mtime = row[0]
-        if stored_mtime is None:
-            return True
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT file_path, file_mtime, file_size, content_hash
+            FROM classes
+            WHERE file_path IS NOT NULL
+        """)
+        
+        return {row[0]: FileState(row[1], row[2], row[3]) for row in cursor.fetchall()}
+        
+    def update_file_state(self, file_path: str, file_mtime: float, file_size: int) -> None:
+        """Record a new mtime/size for a file whose contents did not change.
+        
+        Args:
+            file_path: Path to the file
+            file_mtime: Current file modification time
+            file_size: Current file size in bytes
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
             
-        return file_mtime > stored_mtime
+        self.conn.execute("""
+            UPDATE classes SET file_mtime = ?, file_size = ? WHERE file_path = ?
+        """, (file_mtime, file_size, file_path))
         
     def delete_class_by_path(self, file_path: str) -> None:
         """Delete a class and its related data by file path.
@@ -531,15 +1236,19 @@ class Database:
         if row:
             class_id = row[0]
             
+            # Delete FTS entry first: with the external-content layout its
+            # indexed text is read back from the class and its members
+            self._delete_search_entry(class_id)
+            
             # Delete methods and properties (cascade should handle this, but being explicit)
             cursor.execute("DELETE FROM methods WHERE class_id = ?", (class_id,))
             cursor.execute("DELETE FROM properties WHERE class_id = ?", (class_id,))
+            cursor.execute("DELETE FROM class_docs WHERE class_id = ?", (class_id,))
             
             # Delete class
             cursor.execute("DELETE FROM classes WHERE id = ?", (class_id,))
-            
-            self.conn.commit()
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit."""
-        self.close()
+        """Context manager exit: closes the connection only if __enter__ opened it."""
+        if self._opened_by_with.pop():
+            self.close()
@@ -0,0 +1,306 @@
+"""HTTP/JSON query API for XojoDoc.
+
+`xojodoc --http` serves one database to a whole team:
+
+    GET /search?q=graphics&limit=20&offset=0
+    GET /class/{name}[?module=...]
+    GET /class/{name}/method/{method}
+    GET /stats          (response cache hit/miss statistics)
+
+Responses are JSON. Requests are read by an asyncio server; the SQLite reads
+run on a bounded pool of threads, each with its own read-only connection.
+Every response carries an ETag derived from the index generation (see
+Database.get_generation()), so clients can revalidate with If-None-Match and
+get a 304 until the documentation is re-indexed. Response bodies are kept in
+a shared LRU cache (see xojodoc.cache) that is emptied on the same signal.
+"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from xojodoc.cache import QueryCache
+from xojodoc.database import Database
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Database threads (one read-only connection each)
+DEFAULT_WORKERS = 4
+
+# Largest page a /search request may ask for
+MAX_SEARCH_LIMIT = 100
+
+# Upper bound for the request line and each header line
+MAX_LINE = 8192
+
+# Upper bounds for the number of headers and the (ignored) request body
+MAX_HEADERS = 100
+MAX_BODY = 64 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """Error answered with the given HTTP status and a JSON error body."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class QueryServer:
+    """Serves search, class and method lookups over HTTP."""
+
+    def __init__(self, db_path: str, workers: int = DEFAULT_WORKERS):
+        """Initialize server.
+
+        Args:
+            db_path: Path to the SQLite database
+            workers: Number of database threads
+        """
+        self.db_path = db_path
+        # JSON bodies of successful lookups, keyed by request target
+        self.cache = QueryCache()
+        self._local = threading.local()
+        self._connections: List[Database] = []
+        self._connections_lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xojodoc-db",
+                                       initializer=self._open_connection)
+        self._server: Optional[asyncio.AbstractServer] = None
+        # (host, port) once listening
+        self.address: Optional[Tuple[str, int]] = None
+
+    def _open_connection(self) -> None:
+        """Open the read-only connection of a pool thread."""
+        db = Database(self.db_path, read_only=True)
+        db.connect()
+        self._local.db = db
+        with self._connections_lock:
+            self._connections.append(db)
+
+    def respond(self, path: str, if_none_match: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """Answer a GET request. Runs on a pool thread.
+
+        Args:
+            path: Request target (path and query string)
+            if_none_match: If-None-Match header value
+
+        Returns:
+            Tuple of (status, headers, body)
+        """
+        db: Database = self._local.db
+        generation = db.get_generation()
+        self.cache.set_generation(generation)
+        if urlsplit(path).path == "/stats":
+            # Changes with every request, so never revalidated
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.cache.stats()).encode()
+
+        body = self.cache.get(path, generation=generation)
+        if body is None:
+            try:
+                body = json.dumps(self.route(db, path)).encode()
+            except HTTPError as e:
+                return e.status, {"Content-Type": "application/json"}, json.dumps({"error": str(e)}).encode()
+            self.cache.put(path, body, generation=generation)
+
+        # Checked once the lookup succeeded: If-None-Match (even *) only
+        # matches an existing representation, so missing classes stay 404
+        etag = f'"{generation}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if if_none_match and (if_none_match.strip() == "*" or
+                              etag in (tag.strip() for tag in if_none_match.split(","))):
+            return 304, headers, b""
+
+        headers["Content-Type"] = "application/json"
+        return 200, headers, body
+
+    def route(self, db: Database, path: str) -> Any:
+        """Run the lookup for a request target.
+
+        Args:
+            db: Connection of the current thread
+            path: Request target (path and query string)
+
+        Returns:
+            JSON-serializable result
+
+        Raises:
+            HTTPError: For unknown paths, bad parameters and missing classes
+        """
+        url = urlsplit(path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+
+        if parts == ["search"]:
+            query = params.get("q", "").strip()
+            if not query:
+                raise HTTPError(400, "Missing query parameter q")
+            try:
+                limit = int(params.get("limit", 20))
+                offset = max(int(params.get("offset", 0)), 0)
+            except ValueError:
+                raise HTTPError(400, "limit and offset must be integers")
+            # A negative LIMIT would mean no limit at all in SQLite
+            if limit < 1:
+                raise HTTPError(400, "limit must be at least 1")
+            limit = min(limit, MAX_SEARCH_LIMIT)
+            return {
+                "query": query,
+                "results": db.search_classes(query, limit=limit, offset=offset),
+            }
+
+        if len(parts) in (2, 4) and parts[0] == "class" and (len(parts) == 2 or parts[2] == "method"):
+            xojo_class = db.get_class_by_name(parts[1], params.get("module"))
+            if not xojo_class:
+                raise HTTPError(404, f"Class not found: {parts[1]}")
+            methods = db.get_class_methods(xojo_class["id"])
+
+            if len(parts) == 2:
+                xojo_class["properties"] = db.get_class_properties(xojo_class["id"])
+                xojo_class["methods"] = methods
+                return xojo_class
+
+            # All overloads of the method
+            overloads = [method for method in methods if method["name"].lower() == parts[3].lower()]
+            if not overloads:
+                raise HTTPError(404, f"Method not found: {parts[1]}.{parts[3]}")
+            return {"class": xojo_class["name"], "module": xojo_class["module"], "methods": overloads}
+
+        raise HTTPError(404, f"Unknown path: {url.path}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the requests of one client connection (HTTP/1.1 keep-alive)."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                if len(request_line) > MAX_LINE:
+                    await self._send(writer, 400, {}, b"", keep_alive=False)
+                    break
+
+                headers: Dict[str, str] = {}
+                header_count = 0
+                while True:
+                    line = await reader.readline()
+                    if len(line) > MAX_LINE:
+                        raise ConnectionError("Header line too long")
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    header_count += 1
+                    if header_count > MAX_HEADERS:
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if header_count > MAX_HEADERS:
+                    await self._send(writer, 431, {}, b"", keep_alive=False)
+                    break
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._send(writer, 400, {}, b"", keep_alive=False)
+                    break
+
+                # GET requests have no body, but do not choke on one
+                length = headers.get("content-length", "0") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    await self._send(writer, 400, {}, b"", keep_alive=False)
+                    break
+                if int(length) > MAX_BODY:
+                    await self._send(writer, 413, {}, b"", keep_alive=False)
+                    break
+                if int(length):
+                    await reader.readexactly(int(length))
+
+                keep_alive = (headers.get("connection", "").lower() != "close" and
+                              version == "HTTP/1.1")
+
+                if method not in ("GET", "HEAD"):
+                    status, response_headers, body = 405, {"Allow": "GET, HEAD"}, b""
+                else:
+                    try:
+                        status, response_headers, body = await loop.run_in_executor(
+                            self.pool, self.respond, target, headers.get("if-none-match")
+                        )
+                    except Exception as e:
+                        status, response_headers = 500, {"Content-Type": "application/json"}
+                        body = json.dumps({"error": str(e)}).encode()
+                    if method == "HEAD":
+                        response_headers["Content-Length"] = str(len(body))
+                        body = b""
+
+                await self._send(writer, status, response_headers, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Disconnected mid-request, or a malformed request
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, headers: Dict[str, str],
+                    body: bytes, keep_alive: bool = True) -> None:
+        """Write a response."""
+        headers.setdefault("Content-Length", str(len(body)))
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    verbose: bool = True) -> None:
+        """Accept connections until cancelled.
+
+        Args:
+            host: Interface to listen on
+            port: TCP port
+            verbose: Print progress information
+        """
+        self._server = await asyncio.start_server(self.handle_connection, host, port)
+        self.address = self._server.sockets[0].getsockname()[:2]
+        if verbose:
+            print(f"Serving {self.db_path} on http://{self.address[0]}:{self.address[1]} (Ctrl+C to stop)...")
+        async with self._server:
+            await self._server.serve_forever()
+
+    def run(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, verbose: bool = True) -> None:
+        """Serve until interrupted (Ctrl+C).
+
+        Args:
+            host: Interface to listen on
+            port: TCP port
+            verbose: Print progress information
+        """
+        try:
+            asyncio.run(self.serve(host, port, verbose))
+        except KeyboardInterrupt:
+            if verbose:
+                print("\nStopped serving.")
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop the database threads and close their connections."""
+        self.pool.shutdown(wait=True)
+        with self._connections_lock:
+            for db in self._connections:
+                db.close()
+            self._connections.clear()
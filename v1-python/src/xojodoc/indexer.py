@@ -4,11 +4,15 @@ Coordinates parsing and storage of Xojo documentation.
 Supports incremental indexing to only update changed files.
 """
 
+import hashlib
 import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Optional
-from xojodoc.parser import HTMLParser
-from xojodoc.database import Database
+from typing import Dict, Iterator, List, Optional, Tuple
+from xojodoc.completion import NameIndex
+from xojodoc.parser import HTMLParser, PARSER_BACKENDS, create_parser
+from xojodoc.database import Database, FileState, FTS_LAYOUTS
 from xojodoc.config import get_config
 
 # Legacy: kept for backwards compatibility
@@ -19,27 +23,64 @@ DEFAULT_HTML_ROOT = r"C:\Program Files\Xojo\Xojo 2025r2.1\Xojo Resources\Languag
 if not Path(DEFAULT_HTML_ROOT).exists():
     DEFAULT_HTML_ROOT = "html"
 
+# Number of classes written per database transaction
+DEFAULT_BATCH_SIZE = 200
+
+
+def file_digest(file_path: str) -> str:
+    """Compute the digest of a file's raw contents, used to detect real changes."""
+    with open(file_path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+# Parser owned by each worker process of a parallel build
+_worker_parser: Optional[HTMLParser] = None
+
+
+def _init_worker(html_root: str, backend: str) -> None:
+    """Create the parser used by a worker process."""
+    global _worker_parser
+    _worker_parser = create_parser(html_root, backend)
+
+
+def _parse_in_worker(file_path: str):
+    """Parse a file in a worker process.
+    
+    Returns plain dataclass records so the result can be pickled back
+    to the process that owns the database.
+    """
+    return _worker_parser.parse_document(file_path)
+
 
 class Indexer:
     """Indexes Xojo documentation into database."""
 
-    def __init__(self, html_root: str = "html", db_path: str = "xojo.db"):
+    def __init__(self, html_root: str = "html", db_path: str = "xojo.db",
+                 batch_size: int = DEFAULT_BATCH_SIZE, parser_backend: str = "bs4",
+                 fts_layout: str = "full"):
         """Initialize indexer.
         
         Args:
             html_root: Root directory containing HTML documentation
             db_path: Path to SQLite database
+            batch_size: Number of classes written per transaction
+            parser_backend: HTML parser backend ("bs4" or "lxml")
+            fts_layout: Search index layout used when creating a new database
         """
-        self.parser = HTMLParser(html_root)
+        self.parser_backend = parser_backend
+        self.parser = create_parser(html_root, parser_backend)
         self.db_path = db_path
-        self.db = Database(db_path)
+        self.db = Database(db_path, fts_layout=fts_layout)
+        self.batch_size = max(1, batch_size)
         
-    def build_index(self, verbose: bool = True, force: bool = False) -> None:
+    def build_index(self, verbose: bool = True, force: bool = False, jobs: int = 1) -> None:
         """Build complete documentation index.
         
         Args:
             verbose: Print progress information
-            force: Force reindex all files, ignoring modification times
+            force: Force reindex all files, ignoring stored file states
+            jobs: Number of worker processes used for parsing (0 = one per CPU).
+                  The database is always written by this process only.
         """
         with self.db:
             # Create schema
@@ -63,72 +104,269 @@ class Indexer:
                 'total': len(classes),
                 'indexed': 0,
                 'skipped': 0,
+                'removed': 0,
                 'errors': 0
             }
             
-            # Parse and store each class
-            for idx, (module, file_path) in enumerate(classes, 1):
-                class_name = Path(file_path).stem
+            # Compare the directory scan with the stored manifest
+            manifest = self.db.load_manifest()
+            with self.db.transaction():
+                added, changed, removed = self._diff_manifest(classes, manifest, force, stats, verbose)
+            pending = sorted(added + changed)
+            stats['skipped'] += len(classes) - len(pending) - stats['errors']
+            
+            if verbose and not force:
+                print(f"=> {len(added)} new, {len(changed)} changed, {len(removed)} removed")
                 
-                try:
-                    # Check if file needs reindexing
-                    file_mtime = os.path.getmtime(file_path)
-                    
-                    if not force and not self.db.needs_reindex(file_path, file_mtime):
-                        stats['skipped'] += 1
-                        if verbose and stats['skipped'] % 50 == 0:
-                            print(f">> Skipped {stats['skipped']} unchanged files...")
-                        continue
-                    
-                    if verbose:
-                        print(f"[{idx}/{len(classes)}] Indexing {module}.{class_name}...")
-                    
-                    # Parse class
-                    xojo_class = self.parser.parse_class_file(file_path)
-                    if not xojo_class:
+            # Drop classes whose file no longer exists
+            if removed:
+                with self.db.transaction():
+                    for file_path in removed:
+                        self.db.delete_class_by_path(file_path)
+                        stats['removed'] += 1
                         if verbose:
-                            print(f"  ⚠ Skipped (no data found)")
-                        stats['skipped'] += 1
-                        continue
-                    
-                    # Delete old data for clean update
-                    self.db.delete_class_by_path(file_path)
-                    
-                    # Insert class with mtime
-                    class_id = self.db.insert_class(xojo_class, file_mtime)
-                    
-                    # Parse and insert properties
-                    properties = self.parser.parse_properties(file_path)
-                    for prop in properties:
-                        self.db.insert_property(class_id, prop)
-                        
-                    # Parse and insert methods
-                    methods = self.parser.parse_methods(file_path)
-                    for method in methods:
-                        self.db.insert_method(class_id, method)
-                    
-                    # Update FTS search index with class + properties + methods
-                    self.db.update_search_index(class_id)
-                        
-                    stats['indexed'] += 1
-                    
-                    if verbose:
-                        print(f"  ✓ Indexed: {len(properties)} properties, {len(methods)} methods")
-                        
-                except Exception as e:
-                    stats['errors'] += 1
-                    if verbose:
-                        print(f"  ✗ Error: {e}")
-                    continue
+                            print(f"  - Removed: {file_path}")
+            
+            documents = self._parse_documents([file_path for _, _, file_path, _ in pending], jobs)
+            
+            # Store each parsed class, in discovery order, one transaction per batch
+            parsed = zip(pending, documents)
+            with self.db.bulk_load():
+                while True:
+                    batch = list(islice(parsed, self.batch_size))
+                    if not batch:
+                        break
+                    with self.db.transaction():
+                        for (idx, module, file_path, state), document in batch:
+                            class_name = Path(file_path).stem
+                            
+                            try:
+                                if verbose:
+                                    print(f"[{idx}/{len(classes)}] Indexing {module}.{class_name}...")
+                                
+                                if not document:
+                                    if verbose:
+                                        print(f"  ⚠ Skipped (no data found)")
+                                    stats['skipped'] += 1
+                                    continue
+                                    
+                                # Savepoint: a failing class does not discard the batch
+                                with self.db.transaction():
+                                    self._store_document(file_path, document, state)
+                                    
+                                stats['indexed'] += 1
+                                
+                                if verbose:
+                                    _, properties, methods = document
+                                    print(f"  ✓ Indexed: {len(properties)} properties, {len(methods)} methods")
+                                    
+                            except Exception as e:
+                                stats['errors'] += 1
+                                if verbose:
+                                    print(f"  ✗ Error: {e}")
+                                continue
                     
+            if stats['indexed'] or stats['removed']:
+                self._publish_changes()
+                
             if verbose:
                 print(f"\n=== Indexing complete! ===")
                 print(f"   Indexed: {stats['indexed']}")
                 print(f"   Skipped: {stats['skipped']}")
+                print(f"   Removed: {stats['removed']}")
                 print(f"   Errors: {stats['errors']}")
                 print(f"   Total: {stats['total']}")
                 print(f"   Database: {self.db.db_path}")
                 
+    def _diff_manifest(self, classes: List[Tuple[str, str]], manifest: Dict[str, FileState],
+                       force: bool, stats: Dict[str, int],
+                       verbose: bool = True) -> Tuple[List, List, List[str]]:
+        """Diff a directory scan against the stored manifest, in memory.
+        
+        Args:
+            classes: (module, file_path) tuples from discover_classes()
+            manifest: Stored file states from Database.load_manifest()
+            force: Treat every existing file as changed
+            stats: Statistics; 'errors' is incremented for unreadable files
+            verbose: Print errors
+            
+        Returns:
+            (added, changed, removed): added and changed are lists of
+            (idx, module, file_path, FileState) in discovery order, removed
+            is a sorted list of file paths that are indexed but gone
+        """
+        added = []
+        changed = []
+        
+        for idx, (module, file_path) in enumerate(classes, 1):
+            stored = manifest.get(file_path)
+            try:
+                state = self._check_file(file_path, None if force else stored)
+            except OSError as e:
+                stats['errors'] += 1
+                if verbose:
+                    print(f"  ✗ Error: {e}")
+                continue
+                
+            if not state:
+                continue
+            if stored is None:
+                added.append((idx, module, file_path, state))
+            else:
+                changed.append((idx, module, file_path, state))
+                
+        scanned = {file_path for _, file_path in classes}
+        removed = sorted(file_path for file_path in manifest if file_path not in scanned)
+        
+        return added, changed, removed
+        
+    def _check_file(self, file_path: str, stored: Optional[FileState]) -> Optional[FileState]:
+        """Check whether a file changed since it was indexed.
+        
+        The stored mtime and size are compared first; the contents are only
+        hashed when they differ. A file that was merely touched or copied
+        keeps its index entry, and its new mtime/size are recorded so the
+        next run takes the cheap path again.
+        
+        Args:
+            file_path: Path to the file
+            stored: State recorded at indexing time (None to always reindex)
+            
+        Returns:
+            Current FileState if the file must be (re)indexed, None if unchanged
+        """
+        stat = os.stat(file_path)
+        if stored and stored.content_hash and (stored.mtime, stored.size) == (stat.st_mtime, stat.st_size):
+            return None
+            
+        state = FileState(stat.st_mtime, stat.st_size, file_digest(file_path))
+        if stored and stored.content_hash == state.content_hash:
+            self.db.update_file_state(file_path, state.mtime, state.size)
+            return None
+            
+        return state
+        
+    def _store_document(self, file_path: str, document: Tuple, state: Optional[FileState] = None) -> int:
+        """Replace the stored data of a file with a freshly parsed document.
+        
+        Args:
+            file_path: Path of the parsed HTML file
+            document: (XojoClass, properties, methods) from parse_document()
+            state: File state recorded for change detection
+            
+        Returns:
+            ID of the inserted class
+        """
+        xojo_class, properties, methods = document
+        state = state or FileState()
+        
+        # Delete old data for clean update
+        self.db.delete_class_by_path(file_path)
+        
+        # Insert class with its file state, then its members in bulk
+        class_id = self.db.insert_class(xojo_class, state.mtime, state.size, state.content_hash)
+        self.db.insert_properties(class_id, properties)
+        self.db.insert_methods(class_id, methods)
+        
+        # Update FTS search index with class + properties + methods
+        self.db.update_search_index(class_id)
+        self.db.update_class_doc(class_id)
+        
+        return class_id
+        
+    def _publish_changes(self) -> None:
+        """Finish an update that changed the index.
+        
+        Stores the name index for completion and bumps the index generation,
+        which tells readers to drop what they derived from the old data.
+        """
+        with self.db.transaction():
+            NameIndex.build(self.db).save(self.db)
+            self.db.bump_generation()
+        
+    def _parse_documents(self, file_paths: List[str], jobs: int = 1) -> Iterator[Optional[Tuple]]:
+        """Parse files, yielding results in the same order as file_paths.
+        
+        With jobs > 1 the files are parsed by a pool of worker processes;
+        the results are still yielded in input order so the database
+        contents do not depend on scheduling.
+        
+        Args:
+            file_paths: Files to parse
+            jobs: Number of worker processes (0 = one per CPU)
+        """
+        if jobs <= 0:
+            jobs = os.cpu_count() or 1
+        jobs = min(jobs, len(file_paths))
+        
+        if jobs <= 1:
+            for file_path in file_paths:
+                yield self.parser.parse_document(file_path)
+            return
+            
+        # Hand out work in chunks to keep inter-process overhead low,
+        # while keeping enough chunks for a balanced pool
+        chunksize = max(1, len(file_paths) // (jobs * 4))
+        
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(str(self.parser.html_root), self.parser_backend)
+        ) as executor:
+            yield from executor.map(_parse_in_worker, file_paths, chunksize=chunksize)
+            
+    def sync_files(self, file_paths: List[str], verbose: bool = True) -> Dict[str, int]:
+        """Bring specific files up to date in the index, in one transaction.
+        
+        Uses the same change detection as an incremental build: files whose
+        contents did not change are skipped, files that no longer exist are
+        removed from the index.
+        
+        Args:
+            file_paths: Paths of created, modified or deleted HTML files
+            verbose: Print progress information
+            
+        Returns:
+            Statistics dict with 'indexed', 'skipped', 'removed' and 'errors'
+        """
+        stats = {'indexed': 0, 'skipped': 0, 'removed': 0, 'errors': 0}
+        
+        with self.db:
+            self.db.create_schema()
+            
+            with self.db.transaction():
+                for file_path in sorted(set(file_paths)):
+                    try:
+                        with self.db.transaction():
+                            if not os.path.exists(file_path):
+                                self.db.delete_class_by_path(file_path)
+                                stats['removed'] += 1
+                                if verbose:
+                                    print(f"  - Removed: {file_path}")
+                                continue
+                                
+                            state = self._check_file(file_path, self.db.get_file_state(file_path))
+                            document = self.parser.parse_document(file_path) if state else None
+                            if not document:
+                                stats['skipped'] += 1
+                                continue
+                                
+                            self._store_document(file_path, document, state)
+                            stats['indexed'] += 1
+                            if verbose:
+                                _, properties, methods = document
+                                print(f"  ✓ Indexed {file_path}: {len(properties)} properties, {len(methods)} methods")
+                                
+                    except Exception as e:
+                        stats['errors'] += 1
+                        if verbose:
+                            print(f"  ✗ Error: {file_path}: {e}")
+                            
+                if stats['indexed'] or stats['removed']:
+                    self._publish_changes()
+                    
+        return stats
+        
     def update_class(self, module: str, class_name: str, verbose: bool = True) -> bool:
         """Update a single class in the index.
         
@@ -153,28 +391,21 @@ class Indexer:
                 if verbose:
                     print(f"Updating {module}.{class_name}...")
                     
-                # Parse class
-                xojo_class = self.parser.parse_class_file(str(file_path))
-                if not xojo_class:
+                # Brings databases of older versions up to date (meta, class_docs)
+                self.db.create_schema()
+                    
+                # Parse class, properties and methods in a single pass
+                document = self.parser.parse_document(str(file_path))
+                if not document:
                     if verbose:
                         print(f"  ⚠ No data found")
                     return False
+                _, properties, methods = document
                     
-                # Insert/update class
-                class_id = self.db.insert_class(xojo_class)
-                
-                # Parse and insert properties
-                properties = self.parser.parse_properties(str(file_path))
-                for prop in properties:
-                    self.db.insert_property(class_id, prop)
-                    
-                # Parse and insert methods
-                methods = self.parser.parse_methods(str(file_path))
-                for method in methods:
-                    self.db.insert_method(class_id, method)
-                
-                # Update FTS search index with class + properties + methods
-                self.db.update_search_index(class_id)
+                # Insert/update class and its members atomically
+                with self.db.transaction():
+                    self._store_document(str(file_path), document, self._check_file(str(file_path), None))
+                    self._publish_changes()
                     
                 if verbose:
                     print(f"  ✓ Updated: {len(properties)} properties, {len(methods)} methods")
@@ -193,16 +424,17 @@ def main():
     
     parser = argparse.ArgumentParser(
         description="Build XojoDoc documentation index",
-        epilog=f"Default HTML root: {DEFAULT_HTML_ROOT}"
+        epilog=f"Default HTML root: {DEFAULT_HTML_ROOT} "
+               f"(with --watch: html_root and database from xojodoc.conf)"
     )
     parser.add_argument(
         "--html-root",
-        default=DEFAULT_HTML_ROOT,
+        default=None,
         help=f"Root directory containing HTML documentation (default: {DEFAULT_HTML_ROOT})"
     )
     parser.add_argument(
         "--db-path",
-        default="xojo.db",
+        default=None,
         help="Path to SQLite database (default: xojo.db)"
     )
     parser.add_argument(
@@ -213,13 +445,78 @@ def main():
     parser.add_argument(
         "--force",
         action="store_true",
-        help="Force reindex all files, ignoring modification times"
+        help="Force reindex all files, even if their contents did not change"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Number of classes written per transaction (default: {DEFAULT_BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--parser",
+        choices=PARSER_BACKENDS,
+        default=None,
+        help="HTML parser backend (default: [indexer] parser from xojodoc.conf, else bs4; lxml is faster)"
+    )
+    parser.add_argument(
+        "--fts-layout",
+        choices=FTS_LAYOUTS,
+        default=None,
+        help="Search index layout for a new database "
+             "(default: [indexer] fts_layout from xojodoc.conf, else full; external is smaller)"
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        help="Number of parallel parser processes (default: 1, 0 = one per CPU)"
+    )
+    
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and re-index HTML files as they are created, modified or deleted"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Seconds between directory polls in --watch mode (default: 1.0)"
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        help="Seconds without further changes before re-indexing in --watch mode (default: 2.0)"
     )
     
     args = parser.parse_args()
     
-    indexer = Indexer(html_root=args.html_root, db_path=args.db_path)
-    indexer.build_index(verbose=not args.quiet, force=args.force)
+    html_root = args.html_root
+    db_path = args.db_path
+    if args.watch:
+        config = get_config()
+        html_root = html_root or config.get_html_root()
+        db_path = db_path or config.get_database_path()
+    
+    parser_backend = args.parser or get_config().get_parser_backend()
+    fts_layout = args.fts_layout or get_config().get_fts_layout()
+    
+    indexer = Indexer(
+        html_root=html_root or DEFAULT_HTML_ROOT,
+        db_path=db_path or "xojo.db",
+        batch_size=args.batch_size,
+        parser_backend=parser_backend,
+        fts_layout=fts_layout
+    )
+    indexer.build_index(verbose=not args.quiet, force=args.force, jobs=args.jobs)
+    
+    if args.watch:
+        from xojodoc.watcher import DocWatcher
+        
+        watcher = DocWatcher(indexer, interval=args.interval, debounce=args.debounce)
+        watcher.run(verbose=not args.quiet)
 
 
 if __name__ == "__main__":
@@ -4,11 +4,16 @@ Extracts class information from HTML files generated by Sphinx.
 """
 
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
 from bs4 import BeautifulSoup, Tag
+from lxml import etree
 from xojodoc.database import XojoClass, XojoProperty, XojoMethod
 
 
+# Available parser backends (see create_parser)
+PARSER_BACKENDS = ("bs4", "lxml")
+
+
 class HTMLParser:
     """Parses Xojo documentation HTML files."""
 
@@ -51,6 +56,37 @@ class HTMLParser:
                 
         return classes
         
+    def parse_document(self, file_path: str) -> Optional[Tuple[XojoClass, List[XojoProperty], List[XojoMethod]]]:
+        """Parse a class HTML file into its class, properties and methods.
+        
+        The file is read and parsed into a tree only once, so this is the
+        preferred entry point when all three are needed (e.g. indexing).
+        
+        Args:
+            file_path: Path to HTML file
+            
+        Returns:
+            (XojoClass, properties, methods) tuple or None if parsing fails
+        """
+        try:
+            soup = self._load(file_path)
+        except Exception as e:
+            print(f"Error parsing {file_path}: {e}")
+            return None
+            
+        xojo_class = self._parse_class(soup, file_path)
+        if not xojo_class:
+            return None
+            
+        # Shared by properties and methods
+        anchors = self._index_anchors(soup)
+            
+        return (
+            xojo_class,
+            self._parse_properties(soup, file_path, anchors),
+            self._parse_methods(soup, file_path, anchors)
+        )
+        
     def parse_class_file(self, file_path: str) -> Optional[XojoClass]:
         """Parse a single class HTML file.
         
@@ -61,9 +97,55 @@ class HTMLParser:
             XojoClass object or None if parsing fails
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'lxml')
-                
+            soup = self._load(file_path)
+        except Exception as e:
+            print(f"Error parsing {file_path}: {e}")
+            return None
+            
+        return self._parse_class(soup, file_path)
+            
+    def parse_properties(self, file_path: str) -> List[XojoProperty]:
+        """Parse properties from a class HTML file.
+        
+        Args:
+            file_path: Path to HTML file
+            
+        Returns:
+            List of XojoProperty objects
+        """
+        try:
+            soup = self._load(file_path)
+        except Exception as e:
+            print(f"Error parsing properties from {file_path}: {e}")
+            return []
+            
+        return self._parse_properties(soup, file_path)
+        
+    def parse_methods(self, file_path: str) -> List[XojoMethod]:
+        """Parse methods from a class HTML file.
+        
+        Args:
+            file_path: Path to HTML file
+            
+        Returns:
+            List of XojoMethod objects
+        """
+        try:
+            soup = self._load(file_path)
+        except Exception as e:
+            print(f"Error parsing methods from {file_path}: {e}")
+            return []
+            
+        return self._parse_methods(soup, file_path)
+        
+    def _load(self, file_path: str) -> BeautifulSoup:
+        """Read an HTML file and build its tree."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return BeautifulSoup(f.read(), 'lxml')
+            
+    def _parse_class(self, soup: BeautifulSoup, file_path: str) -> Optional[XojoClass]:
+        """Extract class information from a parsed document."""
+        try:
             # Extract class name from h1
             h1 = soup.find('h1')
             if not h1:
@@ -107,20 +189,45 @@ class HTMLParser:
             print(f"Error parsing {file_path}: {e}")
             return None
             
-    def parse_properties(self, file_path: str) -> List[XojoProperty]:
-        """Parse properties from a class HTML file.
+    def _index_anchors(self, soup: BeautifulSoup) -> Dict[str, Optional[Tag]]:
+        """Map each element id to the blockquote that follows it.
+        
+        Member descriptions are a blockquote following an anchor element
+        (usually <hr id="...">) among its siblings. Resolving them in one walk
+        over the document keeps member extraction linear in document size,
+        instead of searching the whole tree again for every table row.
         
-        Args:
-            file_path: Path to HTML file
-            
         Returns:
-            List of XojoProperty objects
+            Dict of id -> following sibling blockquote (None if there is none).
+            Like soup.find(id=...), the first element with a given id wins.
         """
+        blockquotes: Dict[str, Optional[Tag]] = {}
+        # Anchors still waiting for a blockquote, keyed by their parent element
+        pending: Dict[int, List[str]] = {}
+        
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+                
+            if element.name == 'blockquote':
+                for anchor in pending.pop(id(element.parent), []):
+                    blockquotes[anchor] = element
+                    
+            anchor = element.get('id')
+            if anchor and anchor not in blockquotes:
+                blockquotes[anchor] = None
+                pending.setdefault(id(element.parent), []).append(anchor)
+                
+        return blockquotes
+        
+    def _parse_properties(self, soup: BeautifulSoup, file_path: str,
+                          anchors: Optional[Dict[str, Optional[Tag]]] = None) -> List[XojoProperty]:
+        """Extract properties from a parsed document."""
         properties = []
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'lxml')
+            if anchors is None:
+                anchors = self._index_anchors(soup)
                 
             # Find properties table
             properties_section = soup.find('section', id='properties')
@@ -159,7 +266,7 @@ class HTMLParser:
                 shared = '✓' in cells[3].get_text()
                 
                 # Extract detailed description
-                description = self._extract_property_description(soup, prop_anchor)
+                description = self._extract_property_description(anchors.get(prop_anchor))
                 
                 properties.append(XojoProperty(
                     name=prop_name,
@@ -174,20 +281,14 @@ class HTMLParser:
             
         return properties
         
-    def parse_methods(self, file_path: str) -> List[XojoMethod]:
-        """Parse methods from a class HTML file.
-        
-        Args:
-            file_path: Path to HTML file
-            
-        Returns:
-            List of XojoMethod objects
-        """
+    def _parse_methods(self, soup: BeautifulSoup, file_path: str,
+                       anchors: Optional[Dict[str, Optional[Tag]]] = None) -> List[XojoMethod]:
+        """Extract methods from a parsed document."""
         methods = []
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'lxml')
+            if anchors is None:
+                anchors = self._index_anchors(soup)
                 
             # Find methods table
             methods_section = soup.find('section', id='methods')
@@ -227,7 +328,7 @@ class HTMLParser:
                 shared = '✓' in cells[3].get_text()
                 
                 # Extract detailed description and sample code
-                description, sample_code = self._extract_method_description(soup, method_anchor)
+                description, sample_code = self._extract_method_description(anchors.get(method_anchor))
                 
                 methods.append(XojoMethod(
                     name=method_name,
@@ -286,23 +387,8 @@ class HTMLParser:
             
         return '\n\n'.join(text_parts) if text_parts else None
         
-    def _extract_property_description(self, soup: BeautifulSoup, anchor: str) -> Optional[str]:
-        """Extract detailed property description from blockquote after anchor."""
-        if not anchor:
-            return None
-            
-        # Find the element with this id (usually <hr>)
-        anchor_element = soup.find(id=anchor)
-        if not anchor_element:
-            return None
-            
-        # Find the blockquote that follows the anchor
-        blockquote = None
-        for sibling in anchor_element.next_siblings:
-            if hasattr(sibling, 'name') and sibling.name == 'blockquote':
-                blockquote = sibling
-                break
-                
+    def _extract_property_description(self, blockquote: Optional[Tag]) -> Optional[str]:
+        """Extract detailed property description from the blockquote after its anchor."""
         if not blockquote:
             return None
             
@@ -315,23 +401,8 @@ class HTMLParser:
                 
         return '\n\n'.join(paragraphs) if paragraphs else None
         
-    def _extract_method_description(self, soup: BeautifulSoup, anchor: str) -> Tuple[Optional[str], Optional[str]]:
-        """Extract detailed method description and sample code from blockquote after anchor."""
-        if not anchor:
-            return None, None
-            
-        # Find the element with this id (usually <hr>)
-        anchor_element = soup.find(id=anchor)
-        if not anchor_element:
-            return None, None
-            
-        # Find the blockquote that follows the anchor
-        blockquote = None
-        for sibling in anchor_element.next_siblings:
-            if hasattr(sibling, 'name') and sibling.name == 'blockquote':
-                blockquote = sibling
-                break
-                
+    def _extract_method_description(self, blockquote: Optional[Tag]) -> Tuple[Optional[str], Optional[str]]:
+        """Extract detailed method description and sample code from the blockquote after its anchor."""
         if not blockquote:
             return None, None
             
@@ -355,3 +426,274 @@ class HTMLParser:
         sample_code = '\n\n'.join(codes) if codes else None
         
         return description, sample_code
+
+
+# Text of all descendant text nodes, like BeautifulSoup's get_text():
+# comments are not text nodes, and script/style contents are skipped
+_TEXT = etree.XPath(
+    ".//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]"
+)
+
+# Code blocks (class token match, like find_all(class_='highlight-xojo'))
+_CODE_BLOCKS = etree.XPath(
+    ".//div[contains(concat(' ', normalize-space(@class), ' '), ' highlight-xojo ')]"
+)
+
+_NOTES_ELEMENTS = etree.XPath(".//*[self::p or self::h3 or self::h4]")
+
+
+def _text(element: etree._Element) -> str:
+    """Get the text content of an element."""
+    return ''.join(_TEXT(element))
+
+
+class LxmlHTMLParser(HTMLParser):
+    """Parses Xojo documentation HTML files with lxml directly.
+    
+    Produces the same records as HTMLParser, but queries the lxml tree
+    instead of building a BeautifulSoup object tree on top of it, which
+    is considerably faster for full rebuilds.
+    """
+    
+    def _load(self, file_path: str) -> Optional[etree._Element]:
+        """Read an HTML file and build its tree."""
+        # Decode strictly first so invalid files fail exactly like the bs4 backend
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = f.read().encode('utf-8')
+        return etree.HTML(data, etree.HTMLParser(encoding='utf-8'))
+        
+    def _parse_class(self, root: Optional[etree._Element], file_path: str) -> Optional[XojoClass]:
+        """Extract class information from a parsed document."""
+        try:
+            if root is None:
+                return None
+                
+            # Extract class name from h1
+            h1 = root.find('.//h1')
+            if h1 is None:
+                return None
+                
+            class_name = _text(h1).strip()
+            
+            # Extract module from file path
+            path = Path(file_path)
+            module = path.parent.name
+            
+            # Extract description
+            description_section = root.find('.//section[@id="description"]')
+            description = None
+            if description_section is not None:
+                # Get all paragraphs in description, excluding admonitions
+                paragraphs = description_section.findall('p')
+                if paragraphs:
+                    description = '\n'.join(_text(p).strip() for p in paragraphs)
+                    
+            return XojoClass(
+                name=class_name,
+                module=module,
+                description=description,
+                sample_code=self._extract_sample_code(root),
+                compatibility=self._extract_compatibility(root),
+                notes=self._extract_notes(root),
+                file_path=file_path
+            )
+            
+        except Exception as e:
+            print(f"Error parsing {file_path}: {e}")
+            return None
+            
+    def _index_anchors(self, root: Optional[etree._Element]) -> Dict[str, Optional[etree._Element]]:
+        """Map each element id to the blockquote that follows it.
+        
+        Same single walk as HTMLParser._index_anchors.
+        """
+        blockquotes: Dict[str, Optional[etree._Element]] = {}
+        pending: Dict[etree._Element, List[str]] = {}
+        
+        if root is None:
+            return blockquotes
+            
+        for element in root.iter(tag=etree.Element):
+            if element.tag == 'blockquote':
+                for anchor in pending.pop(element.getparent(), []):
+                    blockquotes[anchor] = element
+                    
+            anchor = element.get('id')
+            if anchor and anchor not in blockquotes:
+                blockquotes[anchor] = None
+                pending.setdefault(element.getparent(), []).append(anchor)
+                
+        return blockquotes
+        
+    def _member_rows(self, root: Optional[etree._Element], section_id: str) -> List[List[etree._Element]]:
+        """Get the cells of each row in the table of a members section."""
+        if root is None:
+            return []
+            
+        section = root.find(f'.//section[@id="{section_id}"]')
+        if section is None:
+            return []
+            
+        table = section.find('.//table')
+        if table is None:
+            return []
+            
+        tbody = table.find('.//tbody')
+        if tbody is None:
+            return []
+            
+        return [row.findall('.//td') for row in tbody.iterfind('.//tr')]
+        
+    def _parse_properties(self, root: Optional[etree._Element], file_path: str,
+                          anchors: Optional[Dict[str, Optional[etree._Element]]] = None) -> List[XojoProperty]:
+        """Extract properties from a parsed document."""
+        properties = []
+        
+        try:
+            if anchors is None:
+                anchors = self._index_anchors(root)
+                
+            for cells in self._member_rows(root, 'properties'):
+                if len(cells) < 4:
+                    continue
+                    
+                name_link = cells[0].find('.//a')
+                if name_link is None:
+                    continue
+                    
+                type_link = cells[1].find('.//a')
+                prop_type = _text(type_link if type_link is not None else cells[1]).strip()
+                
+                properties.append(XojoProperty(
+                    name=_text(name_link).strip(),
+                    type=prop_type,
+                    read_only='✓' in _text(cells[2]),
+                    shared='✓' in _text(cells[3]),
+                    description=self._extract_property_description(
+                        anchors.get(name_link.get('href', '').lstrip('#'))
+                    )
+                ))
+                
+        except Exception as e:
+            print(f"Error parsing properties from {file_path}: {e}")
+            
+        return properties
+        
+    def _parse_methods(self, root: Optional[etree._Element], file_path: str,
+                       anchors: Optional[Dict[str, Optional[etree._Element]]] = None) -> List[XojoMethod]:
+        """Extract methods from a parsed document."""
+        methods = []
+        
+        try:
+            if anchors is None:
+                anchors = self._index_anchors(root)
+                
+            for cells in self._member_rows(root, 'methods'):
+                if len(cells) < 4:
+                    continue
+                    
+                name_link = cells[0].find('.//a')
+                if name_link is None:
+                    continue
+                    
+                return_type_link = cells[2].find('.//a')
+                return_type = _text(return_type_link if return_type_link is not None else cells[2]).strip()
+                
+                description, sample_code = self._extract_method_description(
+                    anchors.get(name_link.get('href', '').lstrip('#'))
+                )
+                
+                methods.append(XojoMethod(
+                    name=_text(name_link).strip(),
+                    parameters=_text(cells[1]).strip() or None,
+                    return_type=return_type or None,
+                    shared='✓' in _text(cells[3]),
+                    description=description,
+                    sample_code=sample_code
+                ))
+                
+        except Exception as e:
+            print(f"Error parsing methods from {file_path}: {e}")
+            
+        return methods
+        
+    def _extract_code_blocks(self, element: etree._Element) -> Optional[str]:
+        """Join the code of all highlight-xojo blocks below an element."""
+        codes = []
+        for block in _CODE_BLOCKS(element):
+            pre = block.find('.//pre')
+            if pre is not None:
+                codes.append(_text(pre).strip())
+                
+        return '\n\n'.join(codes) if codes else None
+        
+    def _extract_paragraphs(self, element: etree._Element) -> Optional[str]:
+        """Join the non-empty paragraphs below an element."""
+        paragraphs = []
+        for p in element.iterfind('.//p'):
+            text = _text(p).strip()
+            if text:
+                paragraphs.append(text)
+                
+        return '\n\n'.join(paragraphs) if paragraphs else None
+        
+    def _extract_sample_code(self, root: etree._Element) -> Optional[str]:
+        """Extract sample code from sample-code section."""
+        sample_section = root.find('.//section[@id="sample-code"]')
+        if sample_section is None:
+            return None
+            
+        return self._extract_code_blocks(sample_section)
+        
+    def _extract_compatibility(self, root: etree._Element) -> Optional[str]:
+        """Extract compatibility information."""
+        compat_section = root.find('.//section[@id="compatibility"]')
+        if compat_section is None:
+            return None
+            
+        paragraph = compat_section.find('.//p')
+        if paragraph is not None:
+            return _text(paragraph).strip()
+            
+        return None
+        
+    def _extract_notes(self, root: etree._Element) -> Optional[str]:
+        """Extract notes section."""
+        notes_section = root.find('.//section[@id="notes"]')
+        if notes_section is None:
+            return None
+            
+        text_parts = [_text(elem).strip() for elem in _NOTES_ELEMENTS(notes_section)]
+        
+        return '\n\n'.join(text_parts) if text_parts else None
+        
+    def _extract_property_description(self, blockquote: Optional[etree._Element]) -> Optional[str]:
+        """Extract detailed property description from the blockquote after its anchor."""
+        if blockquote is None:
+            return None
+            
+        return self._extract_paragraphs(blockquote)
+        
+    def _extract_method_description(self, blockquote: Optional[etree._Element]) -> Tuple[Optional[str], Optional[str]]:
+        """Extract detailed method description and sample code from the blockquote after its anchor."""
+        if blockquote is None:
+            return None, None
+            
+        return self._extract_paragraphs(blockquote), self._extract_code_blocks(blockquote)
+
+
+def create_parser(html_root: str = "html", backend: str = "bs4") -> HTMLParser:
+    """Create an HTML parser for the given backend.
+    
+    Args:
+        html_root: Root directory containing HTML documentation
+        backend: "bs4" (BeautifulSoup) or "lxml" (faster, same results)
+        
+    Returns:
+        Parser instance
+    """
+    if backend == "bs4":
+        return HTMLParser(html_root)
+    if backend == "lxml":
+        return LxmlHTMLParser(html_root)
+    raise ValueError(f"Unknown parser backend: {backend} (expected one of {', '.join(PARSER_BACKENDS)})")
@@ -3,17 +3,58 @@
 Provides a man/less-style interface for browsing Xojo documentation.
 """
 
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from textual import work
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical, ScrollableContainer
-from textual.widgets import Header, Footer, Input, Static, Tree, ListView, ListItem, Label
+from textual.widgets import Header, Footer, Input, Static, Tree
 from textual.binding import Binding
+from textual.events import Click
+from textual.geometry import Size
+from textual.message import Message
 from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.suggester import Suggester
+from textual.worker import get_current_worker
+from rich.segment import Segment
 from rich.syntax import Syntax
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
-from xojodoc.database import Database
+from xojodoc.completion import NameIndex
+from xojodoc.database import Database, matches_terms, search_terms
+
+
+# Bounds of the search-as-you-type debounce, in seconds; in between it
+# follows the measured query latency (see XojoDocTUI.search_debounce)
+DEBOUNCE_MIN = 0.05
+DEBOUNCE_MAX = 0.5
+
+# Results asked for per search
+SEARCH_LIMIT = 100
+
+# SQLite VM instructions between checks whether a running search is stale
+SEARCH_CHECK_INTERVAL = 1000
+
+
+class CachedSearch(NamedTuple):
+    """Results of the last search, narrowed in memory while the query grows."""
+    terms: List[str]
+    results: List[dict]
+    # Tokens of the indexed text of each result (see Database.get_search_tokens())
+    tokens: Dict[int, Tuple[str, ...]]
+    # False if the results were cut at SEARCH_LIMIT
+    complete: bool
+    # Whether the results include deprecated classes
+    include_deprecated: bool
+    # Index generation the results were read from (see Database.get_generation())
+    index_generation: int
 
 
 class ClassInfo(Static):
@@ -146,12 +187,186 @@ class MethodInfo(Static):
         self.update("\n".join(content))
 
 
-class SearchResults(ListView):
-    """Widget to display search results."""
+class SearchResults(ScrollView, can_focus=True):
+    """Widget to display search results.
+    
+    The results are kept as plain dicts and drawn line by line for the rows
+    in view (Textual's Line API), so listing every class creates no widgets
+    per row and takes the same time whatever the size of the corpus.
+    """
+    
+    BINDINGS = [
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("pageup", "page_up", "Page Up", show=False),
+        Binding("pagedown", "page_down", "Page Down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+        Binding("enter", "select", "Select", show=False),
+    ]
+    
+    COMPONENT_CLASSES = {"search-results--highlight", "search-results--empty"}
+    
+    DEFAULT_CSS = """
+    SearchResults > .search-results--highlight {
+        background: $accent 40%;
+    }
+    
+    SearchResults:focus > .search-results--highlight {
+        background: $accent;
+    }
+    
+    SearchResults > .search-results--empty {
+        color: $text-muted;
+    }
+    """
+    
+    class Selected(Message):
+        """Posted when a result is chosen with Enter or a click."""
+        
+        def __init__(self, class_data: dict):
+            super().__init__()
+            self.class_data = class_data
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.results = []
+        self.results: List[dict] = []
+        self.labels: List[str] = []
+        self.highlighted: Optional[int] = None
+    
+    def set_results(self, results: List[dict]) -> None:
+        """Replace the listed results and highlight the first one.
+        
+        Args:
+            results: Rows with at least 'name' and 'module'
+        """
+        self.results = results
+        self.labels = [f"{result['module']}.{result['name']}" for result in results]
+        self.highlighted = 0 if results else None
+        width = max(map(len, self.labels), default=0)
+        self.virtual_size = Size(width, max(len(results), 1))
+        self.scroll_to(0, 0, animate=False)
+        self.refresh()
+    
+    def render_line(self, y: int) -> Strip:
+        """Draw one line of the visible part of the list."""
+        scroll_x, scroll_y = self.scroll_offset
+        index = scroll_y + y
+        width = self.scrollable_content_region.width
+        
+        if not self.results and index == 0:
+            style = self.get_component_rich_style("search-results--empty")
+            text = "No results found"
+        elif index < len(self.labels):
+            style = self.rich_style
+            if index == self.highlighted:
+                style += self.get_component_rich_style("search-results--highlight")
+            text = self.labels[index]
+        else:
+            return Strip.blank(width, self.rich_style)
+        
+        strip = Strip([Segment(text, style)]).adjust_cell_length(scroll_x + width, style)
+        return strip.crop(scroll_x, scroll_x + width)
+    
+    def move_highlight(self, index: int) -> None:
+        """Highlight a result and scroll it into view.
+        
+        Args:
+            index: Row number, clamped to the list
+        """
+        if not self.results:
+            return
+        
+        self.highlighted = max(0, min(index, len(self.results) - 1))
+        height = self.scrollable_content_region.height
+        top = self.scroll_offset.y
+        if self.highlighted < top:
+            self.scroll_to(y=self.highlighted, animate=False)
+        elif height and self.highlighted >= top + height:
+            self.scroll_to(y=self.highlighted - height + 1, animate=False)
+        self.refresh()
+    
+    def action_cursor_up(self) -> None:
+        self.move_highlight((self.highlighted or 0) - 1)
+    
+    def action_cursor_down(self) -> None:
+        self.move_highlight((self.highlighted or 0) + 1)
+    
+    def action_page_up(self) -> None:
+        self.move_highlight((self.highlighted or 0) - self.scrollable_content_region.height)
+    
+    def action_page_down(self) -> None:
+        self.move_highlight((self.highlighted or 0) + self.scrollable_content_region.height)
+    
+    def action_first(self) -> None:
+        self.move_highlight(0)
+    
+    def action_last(self) -> None:
+        self.move_highlight(len(self.results) - 1)
+    
+    def action_select(self) -> None:
+        """Post Selected for the highlighted result."""
+        if self.highlighted is not None:
+            self.post_message(self.Selected(self.results[self.highlighted]))
+    
+    def on_click(self, event: Click) -> None:
+        """Highlight and select the clicked result."""
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        index = self.scroll_offset.y + offset.y
+        if index < len(self.results):
+            self.move_highlight(index)
+            self.action_select()
+
+
+class NameSuggester(Suggester):
+    """Suggests class names, and Class.Member names, for the search box."""
+    
+    def __init__(self, db: Database):
+        """Initialize suggester.
+        
+        Args:
+            db: Database of the names, used from the event loop thread only
+        """
+        # Completions take microseconds; no need for the suggestion cache.
+        # Case sensitive, so the value arrives as typed: the words before
+        # the one being completed are kept as they are
+        super().__init__(use_cache=False, case_sensitive=True)
+        self.db = db
+        self.names: Optional[NameIndex] = None
+        # Index generation the names were loaded from
+        self.generation: Optional[int] = None
+    
+    def refresh(self) -> Optional[NameIndex]:
+        """Load the names again if the indexer changed the database since.
+        
+        Returns:
+            The current names, or None while the database is not open
+        """
+        if self.db.conn is None:
+            return None
+        generation = self.db.get_generation()
+        if generation != self.generation:
+            self.names = NameIndex.load(self.db)
+            self.generation = generation
+        return self.names
+    
+    async def get_suggestion(self, value: str) -> Optional[str]:
+        """Complete the last word of the search box."""
+        word = value.rpartition(" ")[2]
+        if not word:
+            return None
+        try:
+            names = self.refresh()
+        except sqlite3.Error:
+            return None
+        if names is None:
+            return None
+        completions = names.complete(word, limit=1)
+        if not completions:
+            return None
+        return value[:len(value) - len(word)] + completions[0]
 
 
 class XojoDocTUI(App):
@@ -209,11 +424,23 @@ class XojoDocTUI(App):
     
     def __init__(self, db_path: str = "xojo.db"):
         super().__init__()
-        self.db = Database(db_path)
+        # Read-only connection, opened on mount and kept until unmount
+        self.db = Database(db_path, read_only=True)
+        # Searches run on worker threads, one at a time, on their own
+        # connection, so a stale one can be aborted without touching self.db
+        self.search_db = Database(db_path, read_only=True)
+        self._search_lock = threading.Lock()
         self.current_class = None
         self.current_method = None
         self._search_timer = None  # Timer for debouncing search
+        # Incremented for each search; only the newest one may show its results
+        self._search_generation = 0
+        # Moving average of the query time, in seconds
+        self._search_latency = 0.0
+        # Last free text search, unfiltered (see _narrow_search())
+        self._last_search: Optional[CachedSearch] = None
         self.hide_deprecated = True  # Hide deprecated classes by default
+        self.suggester = NameSuggester(self.db)
     
     def compose(self) -> ComposeResult:
         """Create child widgets."""
@@ -224,9 +451,10 @@ class XojoDocTUI(App):
             with Vertical(id="sidebar"):
                 yield Input(
                     placeholder="Search classes...",
-                    id="search-box"
+                    id="search-box",
+                    suggester=self.suggester
                 )
-                yield ListView(id="results")
+                yield SearchResults(id="results")
             
             # Main content area
             with ScrollableContainer(id="content"):
@@ -236,15 +464,26 @@ class XojoDocTUI(App):
     
     def on_mount(self) -> None:
         """Called when app is mounted."""
+        try:
+            self.db.connect()
+        except sqlite3.Error as e:
+            # Missing or unreadable database: say so instead of failing later
+            message = f"Cannot open database {self.db.db_path}: {e}"
+            self.query_one("#main-content", Static).update(message)
+            self.notify(message, severity="error", timeout=10)
+            return
+        
+        # Names for search box completion, in one read
+        try:
+            self.suggester.refresh()
+        except sqlite3.Error:
+            pass
+        
         # Count total classes
         try:
             with self.db:
-                cursor = self.db.conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM classes")
-                total_classes = cursor.fetchone()[0]
-                
-                cursor.execute("SELECT COUNT(*) FROM classes WHERE module NOT LIKE 'deprecated%'")
-                non_deprecated = cursor.fetchone()[0]
+                total_classes = self.db.count_classes()
+                non_deprecated = self.db.count_classes(include_deprecated=False)
                 
                 # Update welcome message
                 content_widget = self.query_one("#main-content", Static)
@@ -264,6 +503,12 @@ class XojoDocTUI(App):
         # Initial search - show ALL classes
         self.perform_search("")
     
+    def on_unmount(self) -> None:
+        """Called when app is unmounted."""
+        self.db.close()
+        with self._search_lock:
+            self.search_db.close()
+    
     def on_input_changed(self, event: Input.Changed) -> None:
         """Handle search input changes with debouncing."""
         if event.input.id == "search-box":
@@ -271,10 +516,10 @@ class XojoDocTUI(App):
             if self._search_timer is not None:
                 self._search_timer.stop()
             
-            # Set new timer for 500ms debounce
+            # Wait for a pause in typing, longer when queries are slow
             query = event.value.strip()
             self._search_timer = self.set_timer(
-                0.5,  # 500ms delay
+                self.search_debounce,
                 lambda: self.perform_search(query)
             )
     
@@ -282,117 +527,154 @@ class XojoDocTUI(App):
         """Handle search submission."""
         if event.input.id == "search-box":
             # Focus on results list
-            results = self.query_one("#results", ListView)
+            results = self.query_one("#results", SearchResults)
             results.focus()
     
+    @property
+    def search_debounce(self) -> float:
+        """Delay between the last keystroke and the search, in seconds.
+        
+        Twice the typical query time, within DEBOUNCE_MIN and DEBOUNCE_MAX:
+        fast databases search almost as you type, slow ones are not sent a
+        query per keystroke.
+        """
+        return min(max(2 * self._search_latency, DEBOUNCE_MIN), DEBOUNCE_MAX)
+    
     def perform_search(self, query: str):
-        """Perform search and update results."""
-        results_widget = self.query_one("#results", ListView)
-        results_widget.clear()
+        """Start a search in the background; its results replace the list.
         
-        try:
-            with self.db:
-                # Strip whitespace and check if query is meaningful
-                query = query.strip()
-                
-                if query:
-                    # FTS5 search
-                    results = self.db.search_classes(query)
-                    # Limit search results to 100
-                    results = results[:100]
-                else:
-                    # Show ALL classes when no query (sorted alphabetically)
-                    cursor = self.db.conn.cursor()
-                    cursor.execute("""
-                        SELECT id, name, module, description
-                        FROM classes
-                        ORDER BY name
-                    """)
-                    results = [dict(row) for row in cursor.fetchall()]
-                
-                # Filter deprecated classes if hide_deprecated is enabled
-                if self.hide_deprecated:
-                    results = [r for r in results if not r['module'].startswith('deprecated')]
-                
-                # Add results to list
-                for result in results:
-                    class_name = result['name']
-                    module = result['module']
-                    label = f"{module}.{class_name}"
-                    
-                    item = ListItem(Label(label))
-                    item.class_data = result
-                    results_widget.append(item)
-                
-                if not results:
-                    results_widget.append(ListItem(Label("[dim]No results found[/dim]")))
-                
-                # Show count in notification
-                if query:
-                    self.notify(f"Found {len(results)} result(s)", timeout=2)
-                else:
-                    deprecated_note = " (deprecated hidden)" if self.hide_deprecated else ""
-                    self.notify(f"Showing all {len(results)} classes{deprecated_note}", timeout=2)
-                    
-        except Exception as e:
-            self.notify(f"Search error: {e}", severity="error")
+        A new search cancels the previous one, so the results of a stale
+        query are never shown.
+        """
+        self._search_generation += 1
+        self._search_worker(query.strip(), self.hide_deprecated, self._search_generation)
     
-    def on_list_view_selected(self, event: ListView.Selected) -> None:
+    def _narrow_search(self, terms: List[str], include_deprecated: bool,
+                       index_generation: int) -> Optional[CachedSearch]:
+        """Narrow the last search in memory if the query only grew.
+        
+        Each term of a longer query ("tim" -> "time", "time" -> "time re")
+        matches a subset of what the corresponding shorter term matched, so
+        its results are those of the last search that still match. They keep
+        the ranking of the last search.
+        
+        Args:
+            terms: Terms of the new query, from search_terms()
+            include_deprecated: Whether the new search includes deprecated classes
+            index_generation: Current index generation
+            
+        Returns:
+            The narrowed search, or None if it has to run in SQL (query
+            shortened or edited, last results cut at SEARCH_LIMIT, deprecated
+            classes toggled, database re-indexed meanwhile)
+        """
+        previous = self._last_search
+        if (previous is None or not previous.complete
+                or previous.include_deprecated != include_deprecated
+                or previous.index_generation != index_generation
+                or len(terms) < len(previous.terms)
+                or not all(new.startswith(old) for old, new in zip(previous.terms, terms))):
+            return None
+        
+        results = [r for r in previous.results if matches_terms(previous.tokens[r['id']], terms)]
+        return CachedSearch(terms, results, previous.tokens, True, include_deprecated, index_generation)
+    
+    def _run_search(self, query: str, hide_deprecated: bool) -> Tuple[List[dict], Optional[CachedSearch]]:
+        """Get the results of a search. Runs on a worker thread.
+        
+        Returns:
+            Tuple of (results, search to narrow next time or None)
+        """
+        db = self.search_db
+        include_deprecated = not hide_deprecated
+        terms = search_terms(query) if query else None
+        # The last results are stale once the indexer or watcher changed the database
+        index_generation = db.get_generation()
+        search = self._narrow_search(terms, include_deprecated, index_generation) if terms else None
+        
+        if search:
+            return search.results, search
+        
+        # Deprecated classes are filtered in SQL, before the limit applies
+        if not query:
+            # Show ALL classes when no query (sorted alphabetically)
+            return db.list_classes(include_deprecated), None
+        
+        # FTS5 search, best matches first, limited to SEARCH_LIMIT results
+        results = db.search_classes(query, limit=SEARCH_LIMIT, include_deprecated=include_deprecated)
+        if terms:
+            tokens = db.get_search_tokens(r['id'] for r in results)
+            search = CachedSearch(terms, results, tokens, len(results) < SEARCH_LIMIT,
+                                  include_deprecated, index_generation)
+        return results, search
+    
+    @work(thread=True, exclusive=True, group="search")
+    def _search_worker(self, query: str, hide_deprecated: bool, generation: int) -> None:
+        """Run a search off the event loop and hand its results back.
+        
+        Once a newer search starts, the SQLite progress handler aborts the
+        query of this one, so stale searches stop instead of competing with
+        the new one.
+        """
+        worker = get_current_worker()
+        with self._search_lock:
+            if generation != self._search_generation:
+                return
+            start = time.perf_counter()
+            try:
+                if self.search_db.conn is None:
+                    self.search_db.connect()
+                self.search_db.conn.set_progress_handler(
+                    lambda: generation != self._search_generation, SEARCH_CHECK_INTERVAL)
+                try:
+                    results, search = self._run_search(query, hide_deprecated)
+                finally:
+                    self.search_db.conn.set_progress_handler(None, 0)
+            except Exception as e:
+                # Aborted by the progress handler: a newer search is running
+                if not worker.is_cancelled and generation == self._search_generation:
+                    self.call_from_thread(self.notify, f"Search error: {e}", severity="error")
+                return
+        elapsed = time.perf_counter() - start
+        
+        if not worker.is_cancelled:
+            self.call_from_thread(self._show_results, query, results, generation, elapsed, search)
+    
+    def _show_results(self, query: str, results: List[dict], generation: int, elapsed: float,
+                      search: Optional[CachedSearch] = None) -> None:
+        """Display the results of a search, unless a newer search started."""
+        self._search_latency = 0.7 * self._search_latency + 0.3 * elapsed
+        if generation != self._search_generation:
+            return
+        
+        self._last_search = search
+        results_widget = self.query_one("#results", SearchResults)
+        results_widget.set_results(results)
+        
+        # Show count in notification
+        if query:
+            self.notify(f"Found {len(results)} result(s)", timeout=2)
+        else:
+            deprecated_note = " (deprecated hidden)" if self.hide_deprecated else ""
+            self.notify(f"Showing all {len(results)} classes{deprecated_note}", timeout=2)
+    
+    def on_search_results_selected(self, event: SearchResults.Selected) -> None:
         """Handle class selection from results."""
-        if event.list_view.id == "results":
-            item = event.item
-            if hasattr(item, 'class_data'):
-                self.show_class(item.class_data)
+        self.show_class(event.class_data)
     
     def show_class(self, class_data: dict):
         """Display class details in main content area."""
         try:
             with self.db:
-                cursor = self.db.conn.cursor()
-                
-                # Get full class info
-                cursor.execute("""
-                    SELECT id, name, module, description, sample_code,
-                           compatibility, notes, file_path
-                    FROM classes
-                    WHERE id = ?
-                """, (class_data['id'],))
-                
-                row = cursor.fetchone()
-                if not row:
+                # Class with its properties and methods, in one read
+                full_data = self.db.get_class_doc(class_data['id'])
+                if not full_data:
                     return
                 
-                class_id, name, module, desc, code, compat, notes, path = row
-                
-                # Get properties
-                cursor.execute("""
-                    SELECT name, type, description, read_only, shared
-                    FROM properties
-                    WHERE class_id = ?
-                    ORDER BY name
-                """, (class_id,))
-                properties = cursor.fetchall()
-                
-                # Get methods
-                cursor.execute("""
-                    SELECT name, description, return_type, parameters, shared, sample_code
-                    FROM methods
-                    WHERE class_id = ?
-                    ORDER BY name
-                """, (class_id,))
-                methods = cursor.fetchall()
-                
-                full_data = {
-                    'id': class_id,
-                    'name': name,
-                    'module': module,
-                    'description': desc,
-                    'sample_code': code,
-                    'compatibility': compat,
-                    'notes': notes,
-                    'properties': properties,
-                    'methods': methods
-                }
+                name, module = full_data['name'], full_data['module']
+                desc, code = full_data['description'], full_data['sample_code']
+                compat, notes = full_data['compatibility'], full_data['notes']
+                properties, methods = full_data['properties'], full_data['methods']
                 
                 # Update content widget
                 content_widget = self.query_one("#main-content", Static)
@@ -489,6 +771,8 @@ class XojoDocTUI(App):
 
   /         Focus search box
   ↑ ↓       Navigate search results
+  PgUp PgDn Page through search results
+  Home End  First / last search result
   Enter     View selected class
   Escape    Clear search
   d         Toggle deprecated classes
@@ -509,6 +793,7 @@ class XojoDocTUI(App):
   • Searches are case-insensitive
   • Press 'd' to show/hide deprecated classes
   • Empty search shows all classes (alphabetically)
+  • Press → to accept the suggested class name (Class. suggests members)
 """
         content_widget.update(help_text)
 
@@ -0,0 +1,109 @@
+"""Watch mode for the XojoDoc indexer.
+
+Keeps the documentation database up to date while the HTML documentation
+changes. The api/ directory is polled, so no extra service or dependency is
+needed; only the affected files are re-indexed.
+"""
+
+import os
+import time
+from typing import Dict, Set, Tuple
+
+from xojodoc.indexer import Indexer
+
+
+class DocWatcher:
+    """Re-indexes documentation files as they are created, modified or deleted."""
+
+    def __init__(self, indexer: Indexer, interval: float = 1.0, debounce: float = 2.0):
+        """Initialize watcher.
+
+        Args:
+            indexer: Indexer whose HTML root and database are kept in sync
+            interval: Seconds between directory polls
+            debounce: Seconds without further changes before re-indexing.
+                      Changes seen until then are applied together in one
+                      transaction.
+        """
+        self.indexer = indexer
+        self.interval = interval
+        self.debounce = debounce
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Get the (mtime, size) of every class HTML file.
+
+        Returns:
+            Dict of file_path -> (mtime in ns, size in bytes)
+        """
+        files = {}
+        for _, file_path in self.indexer.parser.discover_classes():
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                # Deleted between discovery and stat; seen as removed
+                continue
+            files[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    @staticmethod
+    def diff(old: Dict[str, Tuple[int, int]], new: Dict[str, Tuple[int, int]]) -> Set[str]:
+        """Get the paths that were created, modified or deleted between two snapshots."""
+        changed = {path for path, stat in new.items() if old.get(path) != stat}
+        changed.update(path for path in old if path not in new)
+        return changed
+
+    def run(self, verbose: bool = True) -> None:
+        """Watch until interrupted (Ctrl+C).
+
+        Args:
+            verbose: Print progress information
+        """
+        if verbose:
+            print(f"\nWatching {self.indexer.parser.api_root} (Ctrl+C to stop)...")
+
+        last = self.snapshot()
+        pending: Set[str] = set()
+        last_change = 0.0
+
+        try:
+            while True:
+                time.sleep(self.interval)
+
+                try:
+                    current = self.snapshot()
+                except OSError as e:
+                    # e.g. the documentation is being replaced; try again later
+                    if verbose:
+                        print(f"  ✗ Error: {e}")
+                    continue
+
+                changed = self.diff(last, current)
+                last = current
+                if changed:
+                    pending |= changed
+                    last_change = time.monotonic()
+                    continue
+
+                # Wait until the tree has been quiet for the debounce period
+                if not pending or time.monotonic() - last_change < self.debounce:
+                    continue
+
+                if verbose:
+                    print(f"\n{len(pending)} file(s) changed, updating index...")
+                try:
+                    stats = self.indexer.sync_files(sorted(pending), verbose=verbose)
+                except Exception as e:
+                    # Keep the changes and retry after the next quiet period
+                    if verbose:
+                        print(f"  ✗ Error: {e}")
+                    last_change = time.monotonic()
+                    continue
+                pending.clear()
+
+                if verbose:
+                    print(f"   Indexed: {stats['indexed']}, Removed: {stats['removed']}, "
+                          f"Unchanged: {stats['skipped']}, Errors: {stats['errors']}")
+
+        except KeyboardInterrupt:
+            if verbose:
+                print("\nStopped watching.")
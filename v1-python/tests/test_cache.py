@@ -0,0 +1,120 @@
+"""
+Tests for the query result cache.
+"""
+
+import pytest
+from xojodoc.cache import QueryCache, estimate_size
+from xojodoc.database import Database
+
+
+class TestQueryCache:
+    """Test suite for QueryCache."""
+
+    def test_lru_by_entries(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = QueryCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_lru_by_bytes(self):
+        """Test that the total size stays under max_bytes."""
+        cache = QueryCache(max_bytes=250)
+        for key in "abc":
+            cache.put(key, b"x" * 100, size=100)
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] == 200
+        # Larger than the whole cache: not stored
+        cache.put("big", b"x" * 1000)
+        assert cache.get("big") is None
+
+    def test_generation(self):
+        """Test that a new generation empties the cache."""
+        cache = QueryCache()
+        cache.set_generation(1)
+        cache.put("a", 1)
+        cache.set_generation(1)
+        assert cache.get("a") == 1
+        cache.set_generation(2)
+        assert cache.get("a") is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_generation_never_goes_back(self):
+        """Test that a reader still on an older generation does not empty the cache."""
+        cache = QueryCache()
+        cache.set_generation(2)
+        cache.put("a", 1)
+        cache.set_generation(1)
+        assert cache.get("a") == 1
+        assert cache.stats()["generation"] == 2
+
+    def test_stale_results_not_stored(self):
+        """Test that results of another generation are neither stored nor served."""
+        cache = QueryCache()
+        cache.set_generation(2)
+        cache.put("old", 1, generation=1)
+        assert cache.get("old") is None
+        cache.put("a", 1, generation=2)
+        assert cache.get("a", generation=2) == 1
+        assert cache.get("a", generation=1) is None
+        assert cache.get_or_compute("b", lambda: 2, generation=1) == 2
+        assert cache.get("b") is None
+
+    def test_get_or_compute(self):
+        """Test that results are computed once, including None."""
+        cache = QueryCache()
+        calls = []
+        for _ in range(3):
+            assert cache.get_or_compute("missing", lambda: calls.append(1)) is None
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_estimate_size(self):
+        """Test that nested results count their contents."""
+        assert estimate_size({"methods": [("Reset", "()")]}) > estimate_size({})
+
+
+class TestValidate:
+    """Test suite for invalidation from the database."""
+
+    def test_writes_from_other_connections(self, tmp_path):
+        """Test that a generation bump by the indexer empties the cache."""
+        db_path = str(tmp_path / "xojo.db")
+        with Database(db_path) as db:
+            db.create_schema()
+
+        cache = QueryCache()
+        with Database(db_path, read_only=True) as reader:
+            cache.validate(reader)
+            cache.put("a", 1)
+            cache.validate(reader)
+            assert cache.get("a") == 1
+
+            with Database(db_path) as writer:
+                writer.bump_generation()
+            cache.validate(reader)
+            assert cache.get("a") is None
+            assert cache.stats()["generation"] == 1
+
+    def test_writes_without_generation_bump(self, tmp_path):
+        """Test that any commit by another connection empties the cache."""
+        db_path = str(tmp_path / "xojo.db")
+        with Database(db_path) as db:
+            db.create_schema()
+
+        cache = QueryCache()
+        with Database(db_path, read_only=True) as reader:
+            cache.validate(reader)
+            cache.put("a", 1)
+
+            with Database(db_path) as writer:
+                writer.conn.execute("INSERT INTO classes (name, module) VALUES ('Timer', 'core')")
+            cache.validate(reader)
+            assert cache.get("a") is None
+            assert cache.stats()["generation"] == 0
@@ -0,0 +1,84 @@
+"""
+Tests for the XojoDoc command-line interface.
+
+The search and class lookup paths must stay cheap to start: editor
+integrations run `xojodoc --plain QUERY` on every keystroke.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from pathlib import Path
+from xojodoc.database import Database, XojoClass
+
+
+SRC_ROOT = Path(__file__).parent.parent / "src"
+
+# Packages that only the TUI, the rich output or the indexer need
+HEAVY_PACKAGES = {"rich", "textual", "bs4", "lxml", "pygments", "markdown_it"}
+
+
+def run_importtime(*args):
+    """Run `python -X importtime ARGS`.
+
+    Returns:
+        Tuple of (completed process, set of imported top-level packages)
+    """
+    env = dict(os.environ, PYTHONPATH=str(SRC_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True, text=True, env=env
+    )
+    packages = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            module = line.rsplit("|", 1)[1].strip()
+            packages.add(module.split(".")[0])
+    return result, packages
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / "xojo.db")
+    with Database(db_path) as db:
+        db.create_schema()
+        class_id = db.insert_class(XojoClass(name="Timer", module="core",
+                                             description="Runs code after a [bold]delay[/bold]."))
+        db.update_search_index(class_id)
+    return db_path
+
+
+class TestImportTime:
+    """Import-time regression tests based on `python -X importtime`."""
+
+    def test_module_import(self):
+        """Test that importing the CLI module loads none of the heavy packages."""
+        result, packages = run_importtime("-c", "import xojodoc.cli")
+        assert result.returncode == 0, result.stderr
+        assert "click" in packages
+        assert not packages & HEAVY_PACKAGES
+
+    def test_plain_search(self, db_path):
+        """Test that a plain search prints results without importing rich."""
+        result, packages = run_importtime("-m", "xojodoc.cli", "--plain", "--db-path", db_path, "timer")
+        assert result.returncode == 0, result.stderr
+        assert "1. core.Timer" in result.stdout
+        assert not packages & HEAVY_PACKAGES
+
+    def test_plain_class(self, db_path):
+        """Test that a plain class lookup strips markup and does not import rich."""
+        result, packages = run_importtime("-m", "xojodoc.cli", "--plain", "--db-path", db_path, "-c", "Timer")
+        assert result.returncode == 0, result.stderr
+        assert "core.Timer" in result.stdout
+        assert "[bold]" not in result.stdout
+        assert not packages & HEAVY_PACKAGES
+
+    def test_rich_search(self, db_path):
+        """Test that rich is still used without --plain."""
+        result, packages = run_importtime("-m", "xojodoc.cli", "--db-path", db_path, "timer")
+        assert result.returncode == 0, result.stderr
+        assert "core.Timer" in result.stdout
+        assert "rich" in packages
+        assert not packages & {"textual", "bs4", "lxml"}
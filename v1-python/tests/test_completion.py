@@ -0,0 +1,66 @@
+"""
+Tests for name completion.
+"""
+
+import pytest
+from xojodoc.completion import CLASS, METHOD, NAME_INDEX_KEY, PROPERTY, NameIndex
+from xojodoc.database import Database, XojoClass, XojoMethod, XojoProperty
+
+
+@pytest.fixture
+def db(tmp_path):
+    with Database(str(tmp_path / "xojo.db")) as db:
+        db.create_schema()
+        for name, module in (("Timer", "core"), ("Timer", "deprecated"), ("TextArea", "desktop"),
+                             ("TCPSocket", "networking")):
+            class_id = db.insert_class(XojoClass(name=name, module=module, description=""))
+            db.insert_properties(class_id, [XojoProperty(name="Period", type="Integer")])
+            db.insert_methods(class_id, [XojoMethod(name="Reset", parameters="()"),
+                                         XojoMethod(name="Reset", parameters="(delay As Integer)")])
+        yield db
+
+
+class TestNameIndex:
+    """Test suite for NameIndex."""
+
+    def test_complete_classes(self):
+        """Test case-insensitive class completion in alphabetical order."""
+        index = NameIndex.from_names([("Timer", CLASS), ("TCPSocket", CLASS), ("TextArea", CLASS),
+                                      ("Timer", CLASS), ("Timer.Reset", METHOD)])
+        assert index.complete("t") == ["TCPSocket", "TextArea", "Timer"]
+        assert index.complete("TI") == ["Timer"]
+        assert index.complete("ti", case_sensitive=True) == []
+        assert index.complete("t", limit=2) == ["TCPSocket", "TextArea"]
+        assert index.complete("x") == []
+
+    def test_complete_members(self):
+        """Test that Class.Prefix completes the members of Class."""
+        index = NameIndex.from_names([("Timer", CLASS), ("Timer.Period", PROPERTY),
+                                      ("Timer.Reset", METHOD), ("TimerX.Run", METHOD)])
+        assert index.complete("timer.") == ["Timer.Period", "Timer.Reset"]
+        assert index.complete("Timer.r") == ["Timer.Reset"]
+
+    def test_round_trip(self):
+        """Test serialization."""
+        index = NameIndex.from_names([("Timer", CLASS), ("Timer.Reset", METHOD)])
+        loaded = NameIndex.from_bytes(index.to_bytes())
+        assert loaded.names == index.names and loaded.kinds == index.kinds
+        assert len(NameIndex.from_bytes(NameIndex([], "").to_bytes())) == 0
+
+
+class TestStoredIndex:
+    """Test suite for the index stored in the database."""
+
+    def test_build(self, db):
+        """Test that every class and member name is indexed once."""
+        index = NameIndex.build(db)
+        assert index.complete("t") == ["TCPSocket", "TextArea", "Timer"]
+        assert index.complete("Timer.") == ["Timer.Period", "Timer.Reset"]
+
+    def test_save_and_load(self, db):
+        """Test that a stored index is loaded rather than rebuilt."""
+        assert db.get_meta(NAME_INDEX_KEY) is None
+        assert len(NameIndex.load(db)) == 9
+
+        NameIndex.from_names([("Stored", CLASS)]).save(db)
+        assert NameIndex.load(db).names == ["Stored"]
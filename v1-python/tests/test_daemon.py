@@ -0,0 +1,181 @@
+"""
+Tests for the resident query daemon (xojodoc --serve).
+"""
+
+import os
+import socket
+import stat
+import threading
+import time
+
+import pytest
+from xojodoc.cli import XojoDocCLI
+from xojodoc.daemon import DAEMON_SUPPORTED, DaemonClient, DaemonError, QueryDaemon, socket_dir, socket_path
+from xojodoc.database import Database, XojoClass, XojoMethod
+
+
+pytestmark = pytest.mark.skipif(not DAEMON_SUPPORTED, reason="needs Unix domain sockets")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / "xojo.db")
+    with Database(db_path) as db:
+        db.create_schema()
+        class_id = db.insert_class(XojoClass(name="Timer", module="core",
+                                             description="Runs code after a delay.",
+                                             file_path="api/core/timer.html"))
+        db.insert_methods(class_id, [XojoMethod(name="Reset", description="Restarts the timer.")])
+        db.update_search_index(class_id)
+    return db_path
+
+
+@pytest.fixture
+def daemon(db_path):
+    """A daemon serving db_path from a background thread."""
+    daemon = QueryDaemon(db_path)
+    thread = threading.Thread(target=daemon.serve_forever, kwargs={"verbose": False})
+    thread.start()
+    for _ in range(100):
+        client = DaemonClient.connect(db_path)
+        if client:
+            client.close()
+            break
+        time.sleep(0.05)
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+
+
+class TestDaemon:
+    """Test suite for the daemon protocol."""
+
+    def test_requests(self, daemon, db_path):
+        """Test each operation over the socket."""
+        client = DaemonClient.connect(db_path)
+        assert client.request("ping") == "pong"
+        assert client.request("search", query="timer", limit=5)[0][1:3] == ["Timer", "core"]
+        assert client.request("class", name="timer")["methods"][0][0] == "Reset"
+        assert client.request("method", class_name="Timer", method_name="Reset")["class_name"] == "Timer"
+        assert client.request("class", name="Missing") is None
+        assert client.request("complete", prefix="ti") == ["Timer"]
+        assert client.request("complete", prefix="timer.") == ["Timer.Reset"]
+        with pytest.raises(DaemonError):
+            client.request("unknown")
+        client.close()
+
+    def test_cache_invalidated_by_writes(self, daemon, db_path):
+        """Test that answers cached before the database changed are not reused."""
+        client = DaemonClient.connect(db_path)
+        assert client.request("search", query="delay", limit=5) != []
+        with Database(db_path) as db:
+            db.delete_class_by_path("api/core/timer.html")
+        assert client.request("search", query="delay", limit=5) == []
+        client.close()
+
+    def test_cache_invalidated_by_reindex(self, daemon, db_path):
+        """Test that a generation bump by the indexer empties the cache once."""
+        client = DaemonClient.connect(db_path)
+        assert client.request("search", query="delay", limit=5) != []
+        # Like the indexer: change the data, then bump the index generation
+        with Database(db_path) as db, db.transaction():
+            db.delete_class_by_path("api/core/timer.html")
+            db.bump_generation()
+        assert client.request("search", query="delay", limit=5) == []
+        assert client.request("stats")["invalidations"] == 1
+        client.close()
+
+    def test_single_instance(self, daemon, db_path):
+        """Test that a second daemon for the same database refuses to start."""
+        with pytest.raises(RuntimeError):
+            QueryDaemon(db_path).serve_forever(verbose=False)
+
+    def test_cli_uses_daemon(self, daemon, db_path):
+        """Test that the CLI sends lookups to the daemon, without opening the database."""
+        cli = XojoDocCLI(db_path, plain=True)
+        assert cli.daemon is not None
+        assert cli.db.conn is None
+        assert cli.search_classes("timer")[0][1] == "Timer"
+        assert cli.get_class_info("Timer")["module"] == "core"
+
+
+class TestSocketPermissions:
+    """Only the user running the daemon may reach it."""
+
+    def test_private_directory(self, daemon, db_path):
+        """Test that the socket lives in a directory of the current user only."""
+        path = socket_path(db_path)
+        for st in (os.stat(path.parent), os.stat(path)):
+            assert st.st_uid == os.getuid()
+            assert not st.st_mode & 0o077
+        assert stat.S_ISSOCK(os.stat(path).st_mode)
+
+    def test_runtime_dir(self, tmp_path, monkeypatch):
+        """Test that $XDG_RUNTIME_DIR is used when set."""
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        assert socket_dir() == tmp_path
+        assert socket_path("xojo.db").parent == tmp_path
+
+    def test_client_rejects_shared_socket(self, daemon, db_path):
+        """Test that the client ignores a socket others can access."""
+        path = socket_path(db_path)
+        os.chmod(path, 0o666)
+        try:
+            assert DaemonClient.connect(db_path) is None
+        finally:
+            os.chmod(path, 0o600)
+        client = DaemonClient.connect(db_path)
+        assert client is not None
+        client.close()
+
+    def test_daemon_rejects_shared_directory(self, db_path, tmp_path, monkeypatch):
+        """Test that the daemon does not listen in a directory others can write to."""
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        os.chmod(shared, 0o777)
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(shared))
+        with pytest.raises(RuntimeError):
+            QueryDaemon(db_path).serve_forever(verbose=False)
+        assert not socket_path(db_path).exists()
+
+
+class TestFallback:
+    """The CLI works the same without a daemon."""
+
+    def test_no_daemon(self, db_path):
+        """Test direct database access when no daemon is running."""
+        assert DaemonClient.connect(db_path) is None
+        cli = XojoDocCLI(db_path, plain=True)
+        assert cli.daemon is None
+        assert cli.search_classes("timer")[0][1] == "Timer"
+        assert cli.complete("TIM") == ["Timer"]
+
+    def test_daemon_gone(self, daemon, db_path):
+        """Test that the CLI falls back when the daemon connection breaks between lookups."""
+        cli = XojoDocCLI(db_path, plain=True)
+        assert cli.get_method_info("Timer", "Reset")["name"] == "Reset"
+        cli.daemon.sock.shutdown(socket.SHUT_RDWR)
+        assert cli.get_method_info("Timer", "Reset")["name"] == "Reset"
+        assert cli.daemon is None
+
+    @pytest.mark.parametrize("reply", [b"{broken\n", b'{"ok": true, "res', b"[]\n"])
+    def test_malformed_reply(self, db_path, reply):
+        """Test that the CLI falls back when the daemon sends a reply it cannot read."""
+        daemon_socks = []
+
+        def fake_daemon():
+            client_sock, daemon_sock = socket.socketpair()
+            daemon_sock.sendall(reply)
+            daemon_sock.shutdown(socket.SHUT_WR)
+            daemon_socks.append(daemon_sock)
+            return DaemonClient(client_sock)
+
+        with pytest.raises(DaemonError, match="Malformed"):
+            fake_daemon().request("ping")
+
+        cli = XojoDocCLI(db_path, plain=True)
+        cli.daemon = fake_daemon()
+        assert cli.get_method_info("Timer", "Reset")["name"] == "Reset"
+        assert cli.daemon is None
+        for daemon_sock in daemon_socks:
+            daemon_sock.close()
@@ -0,0 +1,403 @@
+"""
+Tests for the XojoDoc database: search, class documents and connection handling.
+"""
+
+import pytest
+import sqlite3
+from pathlib import Path
+from xojodoc.database import (Database, FTS_LAYOUTS, XojoClass, XojoMethod, XojoProperty,
+                              _nocase_prefix_range, index_tokens, matches_terms, search_terms)
+
+
+def add_class(db, name, module, description, properties=(), methods=()):
+    """Insert a class with its members and index it for search."""
+    class_id = db.insert_class(XojoClass(name=name, module=module, description=description,
+                                         file_path=f"api/{module}/{name.lower()}.html"))
+    db.insert_properties(class_id, [XojoProperty(name=prop, type="Integer") for prop in properties])
+    db.insert_methods(class_id, [XojoMethod(name=method) for method in methods])
+    db.update_search_index(class_id)
+    return class_id
+
+
+@pytest.fixture(params=FTS_LAYOUTS)
+def db(request, tmp_path):
+    """A small database, once for each search index layout."""
+    with Database(str(tmp_path / "xojo.db"), fts_layout=request.param) as db:
+        db.create_schema()
+        add_class(db, "Canvas", "desktop", "A control to draw graphics on.")
+        add_class(db, "Graphics", "graphics", "Draws text, lines and pictures.",
+                  properties=["Height", "Width"], methods=["DrawText", "DrawLine"])
+        add_class(db, "Picture", "graphics", "An image held in memory.",
+                  methods=["Graphics"])
+        add_class(db, "Timer", "deprecated", "Runs code after a delay.")
+        yield db
+
+
+class TestSearchClasses:
+    """Test suite for Database.search_classes()."""
+
+    def test_name_hits_rank_first(self, db):
+        """Test that a class name hit outranks module, member and description hits."""
+        names = [r['name'] for r in db.search_classes("graphics")]
+        assert names[0] == "Graphics"
+        assert set(names) == {"Graphics", "Picture", "Canvas"}
+
+    def test_limit_and_offset(self, db):
+        """Test that limit and offset page through the ranked results."""
+        ranked = [r['name'] for r in db.search_classes("graphics")]
+        assert [r['name'] for r in db.search_classes("graphics", limit=1)] == ranked[:1]
+        assert [r['name'] for r in db.search_classes("graphics", limit=2, offset=1)] == ranked[1:3]
+        assert db.search_classes("graphics", limit=2, offset=3) == []
+
+    def test_prefix_match(self, db):
+        """Test that terms match as prefixes."""
+        assert [r['name'] for r in db.search_classes("tim")] == ["Timer"]
+
+    def test_module_class(self, db):
+        """Test the module.class query form."""
+        results = db.search_classes("graphics.pic")
+        assert [(r['module'], r['name']) for r in results] == [("graphics", "Picture")]
+
+    def test_module_class_paging(self, db):
+        """Test that pages past the last module.class match are empty, not FTS results."""
+        add_class(db, "PicHolder", "misc", "Holds graphics.")
+        assert [r['name'] for r in db.search_classes("graphics.pic")] == ["Picture"]
+        assert [r['name'] for r in db.search_classes("graphics.pic", limit=1)] == ["Picture"]
+        assert db.search_classes("graphics.pic", limit=1, offset=1) == []
+        assert db.search_classes("graphics.pic", limit=10, offset=1) == []
+        # No direct match: free text search, paged as usual
+        ranked = [r['name'] for r in db.search_classes("graphics.hold")]
+        assert "PicHolder" in ranked
+        assert [r['name'] for r in db.search_classes("graphics.hold", limit=1, offset=1)] == ranked[1:2]
+
+    def test_module_class_case_insensitive(self, db):
+        """Test that module.class matches the module anywhere and the name as a prefix, ignoring case."""
+        results = db.search_classes("APHICS.GRA")
+        assert [(r['module'], r['name']) for r in results] == [("graphics", "Graphics")]
+
+    def test_module_class_uses_index(self, db):
+        """Test that the module.class lookup is an index range search, not a table scan."""
+        statements = []
+        db.conn.set_trace_callback(statements.append)
+        db.search_classes("Desktop.Can")
+        db.conn.set_trace_callback(None)
+
+        query = next(sql for sql in statements if "FROM classes" in sql)
+        plan = [row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + query)]
+        assert any("USING INDEX idx_classes_name_nocase" in step for step in plan)
+        assert not any(step.startswith("SCAN") for step in plan)
+
+    def test_module_class_prefix_bounds(self, db):
+        """Test that the prefix range holds no names between '@' and 'a' or past the last code point."""
+        for name in ("X@1", "x@2", "X[", "x`", "Xa", "x\U0010ffff", "x\U0010ffff\U0010ffff"):
+            add_class(db, name, "misc", "")
+        assert [r['name'] for r in db.search_classes("misc.x@")] == ["X@1", "x@2"]
+        assert [r['name'] for r in db.search_classes("misc.x\U0010ffff")] == [
+            "x\U0010ffff", "x\U0010ffff\U0010ffff"]
+
+    def test_nocase_prefix_range(self):
+        """Test the bounds of the NOCASE prefix range."""
+        assert _nocase_prefix_range("Win") == ("win", "wio")
+        assert _nocase_prefix_range("x@") == ("x@", "x[")
+        assert _nocase_prefix_range("x\U0010ffff") == ("x\U0010ffff", "y")
+        assert _nocase_prefix_range("\ud7ff") == ("\ud7ff", "\ue000")
+        assert _nocase_prefix_range("\U0010ffff") == ("\U0010ffff", None)
+
+    def test_reindexed_class(self, db):
+        """Test that re-indexing a class replaces its search entry."""
+        db.delete_class_by_path("api/desktop/canvas.html")
+        add_class(db, "Canvas", "desktop", "A control for custom painting.")
+        assert [r['name'] for r in db.search_classes("painting")] == ["Canvas"]
+        assert "Canvas" not in [r['name'] for r in db.search_classes("graphics")]
+
+    def test_empty_query(self, db):
+        """Test that a blank query returns nothing."""
+        assert db.search_classes("   ") == []
+
+
+class TestNarrowing:
+    """Test suite for matching search terms in memory."""
+
+    def test_search_terms(self):
+        """Test which queries are plain prefix searches."""
+        assert search_terms("Draw  Text-Width") == ["draw", "text", "width"]
+        assert search_terms("Café") == ["cafe"]
+        for query in ("desktop.win", "d*", "text OR width", "draw_text", "   "):
+            assert search_terms(query) is None
+
+    def test_matches_like_fts(self, db):
+        """Test that narrowing a search in memory gives the SQL results."""
+        tokens = db.get_search_tokens(r['id'] for r in db.search_classes("d"))
+        for query in ("dr", "draw", "drawt", "draw text", "desc", "d x"):
+            expected = {r['id'] for r in db.search_classes(query)}
+            narrowed = {class_id for class_id, class_tokens in tokens.items()
+                        if matches_terms(class_tokens, search_terms(query))}
+            assert narrowed == expected
+
+    def test_index_tokens(self):
+        """Test tokenizing like the unicode61 tokenizer."""
+        assert index_tokens("Draw_Text draws TEXT, née") == ("draw", "draws", "nee", "text")
+
+
+class TestDeprecated:
+    """Test suite for the deprecated flag."""
+
+    def test_search_filter(self, db):
+        """Test that deprecated classes can be left out of searches."""
+        assert [r['name'] for r in db.search_classes("delay")] == ["Timer"]
+        assert db.search_classes("delay", include_deprecated=False) == []
+        assert db.search_classes("deprecated.tim", include_deprecated=False) == []
+
+    def test_list_and_count(self, db):
+        """Test listing and counting the current classes."""
+        assert db.count_classes() == 4
+        assert db.count_classes(include_deprecated=False) == 3
+        assert [r['name'] for r in db.list_classes(include_deprecated=False)] == ["Canvas", "Graphics", "Picture"]
+
+    def test_flag_added_to_old_databases(self, tmp_path):
+        """Test that create_schema() adds and fills the flag for older databases."""
+        db_path = str(tmp_path / "old.db")
+        with Database(db_path) as db:
+            db.conn.execute("CREATE TABLE classes (id INTEGER PRIMARY KEY, name TEXT, module TEXT, "
+                            "description TEXT, sample_code TEXT, compatibility TEXT, notes TEXT, "
+                            "file_path TEXT, UNIQUE(module, name))")
+            db.conn.executemany("INSERT INTO classes (name, module) VALUES (?, ?)",
+                                [("Timer", "Deprecated_Core"), ("Canvas", "desktop")])
+            assert db.count_classes(include_deprecated=False) == 1
+        with Database(db_path) as db:
+            db.create_schema()
+            assert db.conn.execute(
+                "SELECT name FROM classes WHERE is_deprecated = 1"
+            ).fetchall()[0][0] == "Timer"
+
+    def test_migration_adds_index(self, db):
+        """Test that migrate_database.py adds the flag and the index it is searched by."""
+        from migrate_database import migrate_database
+
+        db.conn.execute("DROP INDEX idx_classes_deprecated_name")
+        db.conn.execute("ALTER TABLE classes DROP COLUMN is_deprecated")
+        assert migrate_database(str(db.db_path))
+        db.close()
+        db.connect()
+        plan = [row[3] for row in db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id, name FROM classes c WHERE c.is_deprecated = 0 ORDER BY name")]
+        assert any("idx_classes_deprecated_name" in step for step in plan)
+        assert db.count_classes(include_deprecated=False) == 3
+
+
+class TestMemberIndexes:
+    """Test suite for member lookups by class."""
+
+    @pytest.mark.parametrize("query", [
+        "SELECT * FROM properties WHERE class_id = 1 ORDER BY name",
+        "SELECT * FROM methods WHERE class_id = 1 ORDER BY name",
+        "SELECT name FROM methods WHERE class_id = 1 AND name = 'drawtext' COLLATE NOCASE",
+    ])
+    def test_uses_class_name_index(self, db, query):
+        """Test that members are searched by class, not scanned."""
+        plan = [row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + query)]
+        assert any("_class_name (class_id=?" in step for step in plan)
+        assert not any(step.startswith("SCAN") for step in plan)
+
+    def test_migration_adds_schema_objects(self, db, capsys):
+        """Test that migrate_database.py adds every missing table and index in one pass."""
+        from migrate_database import migrate_database
+
+        missing = ["class_docs", "idx_methods_class_name", "idx_classes_deprecated_name"]
+        db.conn.execute("DROP TABLE class_docs")
+        db.conn.execute("DROP INDEX idx_methods_class_name")
+        db.conn.execute("DROP INDEX idx_classes_deprecated_name")
+        db.conn.commit()
+        assert migrate_database(str(db.db_path))
+        assert "Migration complete" in capsys.readouterr().out
+        names = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master")}
+        assert set(missing) <= names
+
+        assert migrate_database(str(db.db_path))
+        assert "already up to date" in capsys.readouterr().out
+
+    def test_replaces_class_id_indexes(self, db):
+        """Test that create_schema() drops the indexes of older versions."""
+        db.conn.execute("CREATE INDEX idx_methods_class_id ON methods(class_id)")
+        db.create_schema()
+        names = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_methods_class_name" in names and "idx_methods_class_id" not in names
+
+
+class TestClassDocs:
+    """Test suite for the stored class documents."""
+
+    def test_matches_normalized_tables(self, db):
+        """Test that the stored document has the members ordered by name."""
+        class_id = db.get_class_by_name("Graphics")["id"]
+        built = db.get_class_doc(class_id)
+        db.update_class_doc(class_id)
+        stored = db.get_class_doc(class_id)
+        assert stored == built
+        assert [m[0] for m in stored["methods"]] == ["DrawLine", "DrawText"]
+        assert stored["properties"][0][:2] == ["Height", "Integer"]
+
+    def test_deleted_with_class(self, db):
+        """Test that deleting or replacing a class drops its document."""
+        db.rebuild_class_docs()
+        assert db.conn.execute("SELECT COUNT(*) FROM class_docs").fetchone()[0] == 4
+        db.delete_class_by_path("api/desktop/canvas.html")
+        add_class(db, "Timer", "deprecated", "Replaced.")
+        assert db.conn.execute("SELECT COUNT(*) FROM class_docs").fetchone()[0] == 2
+
+    def test_backfilled_for_old_databases(self, db):
+        """Test that create_schema() stores documents for existing classes."""
+        db.conn.execute("DROP TABLE class_docs")
+        class_id = db.get_class_by_name("Picture")["id"]
+        assert db.get_class_doc(class_id)["methods"][0][0] == "Graphics"
+        db.create_schema()
+        assert db.conn.execute("SELECT COUNT(*) FROM class_docs").fetchone()[0] == 4
+        assert db.get_class_doc(-1) is None
+
+
+class TestConvertSearchIndex:
+    """Test suite for converting the search index between layouts."""
+
+    QUERIES = ["graphics", "tim", "draw", "memory", "graphics.pic", "height width"]
+
+    def snapshot(self, db):
+        """Get the search rows (by rowid) and the results of a few searches."""
+        rows = [tuple(row) for row in db.conn.execute(
+            "SELECT rowid, class_name, module, description, content FROM search_index ORDER BY rowid")]
+        results = {query: [(r['id'], r['name']) for r in db.search_classes(query)] for query in self.QUERIES}
+        return rows, results
+
+    def test_round_trip(self, db):
+        """Test that converting to the other layout and back keeps rowids and results."""
+        layout = db.get_fts_layout()
+        other = next(name for name in FTS_LAYOUTS if name != layout)
+        before = self.snapshot(db)
+        assert before[0] and all(before[1].values())
+
+        db.convert_search_index(other)
+        assert db.get_fts_layout() == other
+        assert self.snapshot(db) == before
+
+        db.convert_search_index(layout)
+        assert db.get_fts_layout() == layout
+        assert self.snapshot(db) == before
+
+    def test_updates_after_conversion(self, db):
+        """Test that a converted index is kept up to date by later writes."""
+        other = next(name for name in FTS_LAYOUTS if name != db.get_fts_layout())
+        db.convert_search_index(other)
+
+        db.delete_class_by_path("api/desktop/canvas.html")
+        class_id = add_class(db, "Socket", "networking", "A TCP connection.")
+        assert [r['id'] for r in db.search_classes("socket")] == [class_id]
+        assert db.search_classes("canvas") == []
+        # Raises if the index does not match its content
+        db.conn.execute("INSERT INTO search_index(search_index, rank) VALUES('integrity-check', 1)")
+
+    def test_unknown_layout(self, db):
+        """Test that an unknown layout is rejected."""
+        with pytest.raises(ValueError):
+            db.convert_search_index("contentless")
+
+
+class TestTransaction:
+    """Test suite for Database.transaction()."""
+
+    def names(self, db):
+        return sorted(row[0] for row in db.conn.execute("SELECT name FROM classes"))
+
+    def test_commit(self, db):
+        """Test that a transaction commits its writes together."""
+        with db.transaction():
+            add_class(db, "Socket", "networking", "A TCP connection.")
+            assert db.conn.in_transaction
+        assert not db.conn.in_transaction
+        assert "Socket" in self.names(db)
+
+    def test_rollback(self, db):
+        """Test that a failing transaction discards all of its writes."""
+        before = self.names(db)
+        with pytest.raises(ValueError):
+            with db.transaction():
+                add_class(db, "Socket", "networking", "A TCP connection.")
+                db.delete_class_by_path("api/desktop/canvas.html")
+                raise ValueError("failed")
+        assert not db.conn.in_transaction
+        assert self.names(db) == before
+
+    def test_nested_rollback_keeps_outer_work(self, db):
+        """Test that a failing nested block only rolls back to its savepoint."""
+        with db.transaction():
+            add_class(db, "Socket", "networking", "A TCP connection.")
+            with pytest.raises(ValueError):
+                with db.transaction():
+                    add_class(db, "Window", "desktop", "A window.")
+                    raise ValueError("failed")
+            assert db.conn.in_transaction
+            # Savepoint names can be reused after the rollback
+            with db.transaction():
+                add_class(db, "Menu", "desktop", "A menu.")
+        names = self.names(db)
+        assert "Socket" in names and "Menu" in names
+        assert "Window" not in names
+
+    def test_outer_rollback_discards_nested_work(self, db):
+        """Test that released savepoints are rolled back with the outer transaction."""
+        before = self.names(db)
+        with pytest.raises(ValueError):
+            with db.transaction():
+                with db.transaction():
+                    add_class(db, "Window", "desktop", "A window.")
+                raise ValueError("failed")
+        assert self.names(db) == before
+
+
+class TestConnection:
+    """Test suite for connection handling."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        db_path = str(tmp_path / "xojo.db")
+        with Database(db_path) as db:
+            db.create_schema()
+            add_class(db, "Timer", "core", "Runs code after a delay.")
+        return db_path
+
+    def test_with_closes_only_what_it_opened(self, db_path):
+        """Test that `with` reuses an open connection and leaves it open."""
+        db = Database(db_path)
+        with db:
+            conn = db.conn
+            with db:
+                assert db.conn is conn
+            assert db.conn is conn
+        assert db.conn is None
+
+        db.connect()
+        with db:
+            assert db.conn is not None
+        assert db.conn is not None
+        db.close()
+
+    def test_read_only(self, db_path):
+        """Test that a read-only connection can search but not write."""
+        with Database(db_path, read_only=True) as db:
+            assert [r['name'] for r in db.search_classes("timer")] == ["Timer"]
+            with pytest.raises(sqlite3.OperationalError):
+                db.conn.execute("DELETE FROM classes")
+
+    def test_read_only_immutable(self, db_path):
+        """Test the immutable flag."""
+        with Database(db_path, read_only=True, immutable=True) as db:
+            assert db.get_class_by_name("Timer")["module"] == "core"
+        with pytest.raises(ValueError):
+            Database(db_path, immutable=True)
+
+    def test_read_only_memory_map(self, db_path):
+        """Test that read-only connections memory-map the whole file."""
+        with Database(db_path, read_only=True) as db:
+            mmap_size = db.conn.execute("PRAGMA mmap_size").fetchone()[0]
+            assert mmap_size >= Path(db_path).stat().st_size
+            assert mmap_size % Database.MMAP_ALIGN == 0
+        with Database(db_path, read_only=True, memory_map=False) as db:
+            assert db.conn.execute("PRAGMA mmap_size").fetchone()[0] == 0
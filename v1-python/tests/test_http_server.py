@@ -0,0 +1,186 @@
+"""
+Tests for the HTTP/JSON query API (xojodoc --http).
+"""
+
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+from xojodoc.database import Database, XojoClass, XojoMethod, XojoProperty
+from xojodoc.http_server import MAX_BODY, MAX_HEADERS, MAX_SEARCH_LIMIT, QueryServer
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / "xojo.db")
+    with Database(db_path) as db:
+        db.create_schema()
+        class_id = db.insert_class(XojoClass(name="Timer", module="core",
+                                             description="Runs code after a delay.",
+                                             file_path="api/core/timer.html"))
+        db.insert_properties(class_id, [XojoProperty(name="Period", type="Integer")])
+        db.insert_methods(class_id, [XojoMethod(name="Reset", parameters="()"),
+                                     XojoMethod(name="Reset", parameters="(delay As Integer)")])
+        db.update_search_index(class_id)
+    return db_path
+
+
+@pytest.fixture
+def server(db_path):
+    """A server on a free port, running its event loop in a background thread."""
+    server = QueryServer(db_path, workers=2)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    serving = asyncio.run_coroutine_threadsafe(server.serve("127.0.0.1", 0, verbose=False), loop)
+    while server.address is None:
+        time.sleep(0.01)
+    yield server
+    serving.cancel()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+
+
+def get(server, path, headers=None):
+    """Send a GET request; returns (status, headers, decoded JSON or None)."""
+    conn = http.client.HTTPConnection(*server.address, timeout=10)
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response.status, response, json.loads(body) if body else None
+
+
+class TestEndpoints:
+    """Test suite for the API endpoints."""
+
+    def test_search(self, server):
+        """Test /search."""
+        status, _, body = get(server, "/search?q=tim&limit=5")
+        assert status == 200
+        assert [r["name"] for r in body["results"]] == ["Timer"]
+
+    def test_search_module_class_paging(self, server):
+        """Test that paging a module.class search past its matches gives no results."""
+        assert [r["name"] for r in get(server, "/search?q=core.tim")[2]["results"]] == ["Timer"]
+        status, _, body = get(server, "/search?q=core.tim&offset=1")
+        assert status == 200 and body["results"] == []
+
+    def test_search_errors(self, server):
+        """Test that bad search parameters are rejected."""
+        assert get(server, "/search")[0] == 400
+        assert get(server, "/search?q=x&limit=ten")[0] == 400
+
+    def test_search_limit_bounds(self, server, db_path):
+        """Test that limit must be positive and is capped at MAX_SEARCH_LIMIT."""
+        with Database(db_path) as db:
+            for i in range(MAX_SEARCH_LIMIT + 5):
+                class_id = db.insert_class(XojoClass(name=f"Dog{i:03d}", module="pets", description=""))
+                db.update_search_index(class_id)
+            db.bump_generation()
+        assert get(server, "/search?q=dog&limit=-1")[0] == 400
+        assert get(server, "/search?q=dog&limit=0")[0] == 400
+        status, _, body = get(server, "/search?q=dog&limit=1000")
+        assert status == 200
+        assert len(body["results"]) == MAX_SEARCH_LIMIT
+
+    def test_class(self, server):
+        """Test /class/{name} with its members."""
+        status, _, body = get(server, "/class/Timer")
+        assert status == 200
+        assert body["module"] == "core"
+        assert [p["name"] for p in body["properties"]] == ["Period"]
+        assert len(body["methods"]) == 2
+
+    def test_method(self, server):
+        """Test that /class/{name}/method/{m} returns all overloads."""
+        status, _, body = get(server, "/class/Timer/method/reset")
+        assert status == 200
+        assert [m["parameters"] for m in body["methods"]] == ["()", "(delay As Integer)"]
+
+    def test_not_found(self, server):
+        """Test 404 answers."""
+        assert get(server, "/class/Missing")[0] == 404
+        assert get(server, "/class/Timer/method/Missing")[0] == 404
+        assert get(server, "/unknown")[0] == 404
+
+    def test_bad_content_length(self, server):
+        """Test that a malformed Content-Length gets a 400 instead of a dropped connection."""
+        for length in (b"-5", b"ten", b"1_0"):
+            with socket.create_connection(server.address, timeout=10) as sock:
+                sock.sendall(b"GET /class/Timer HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+                assert sock.recv(1024).startswith(b"HTTP/1.1 400 ")
+
+    def test_too_many_headers(self, server):
+        """Test that a request with more than MAX_HEADERS headers gets a 431."""
+        headers = b"".join(b"X-Header-%d: 1\r\n" % i for i in range(MAX_HEADERS + 1))
+        with socket.create_connection(server.address, timeout=10) as sock:
+            sock.sendall(b"GET /class/Timer HTTP/1.1\r\n" + headers + b"\r\n")
+            assert sock.recv(1024).startswith(b"HTTP/1.1 431 ")
+
+    def test_body_too_large(self, server):
+        """Test that a Content-Length over MAX_BODY gets a 413 without reading the body."""
+        with socket.create_connection(server.address, timeout=10) as sock:
+            sock.sendall(b"GET /class/Timer HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY + 1))
+            assert sock.recv(1024).startswith(b"HTTP/1.1 413 ")
+        assert get(server, "/class/Timer")[0] == 200
+
+    def test_keep_alive(self, server):
+        """Test several requests on one connection."""
+        conn = http.client.HTTPConnection(*server.address, timeout=10)
+        for _ in range(3):
+            conn.request("GET", "/class/Timer")
+            assert conn.getresponse().read()
+        conn.close()
+
+
+class TestETag:
+    """Test suite for ETag revalidation."""
+
+    def test_not_modified(self, server):
+        """Test that a matching If-None-Match gets a 304."""
+        _, response, _ = get(server, "/class/Timer")
+        etag = response.getheader("ETag")
+        status, _, body = get(server, "/class/Timer", {"If-None-Match": etag})
+        assert status == 304 and body is None
+
+    def test_star_needs_existing_representation(self, server):
+        """Test that If-None-Match: * matches existing classes only."""
+        assert get(server, "/class/Timer", {"If-None-Match": "*"})[0] == 304
+        assert get(server, "/class/Missing", {"If-None-Match": "*"})[0] == 404
+        assert get(server, "/class/Timer/method/Missing", {"If-None-Match": "*"})[0] == 404
+
+    def test_new_generation(self, server, db_path):
+        """Test that the ETag changes once the index generation is bumped."""
+        _, response, _ = get(server, "/search?q=timer")
+        etag = response.getheader("ETag")
+        with Database(db_path) as db:
+            db.bump_generation()
+        status, response, _ = get(server, "/search?q=timer", {"If-None-Match": etag})
+        assert status == 200
+        assert response.getheader("ETag") != etag
+
+
+class TestResponseCache:
+    """Test suite for the shared response cache."""
+
+    def test_stats(self, server):
+        """Test that repeated lookups are answered from the cache."""
+        get(server, "/class/Timer")
+        get(server, "/class/Timer")
+        status, _, stats = get(server, "/stats")
+        assert status == 200
+        assert stats["hits"] == 1 and stats["misses"] == 1
+
+    def test_invalidated_by_reindex(self, server, db_path):
+        """Test that cached bodies are not served once the index changed."""
+        assert get(server, "/search?q=delay")[2]["results"]
+        with Database(db_path) as db:
+            db.delete_class_by_path("api/core/timer.html")
+            db.bump_generation()
+        assert get(server, "/search?q=delay")[2]["results"] == []
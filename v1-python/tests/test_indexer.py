@@ -0,0 +1,210 @@
+"""
+Tests for the indexer: parallel parsing, change detection and file sync.
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+from pathlib import Path
+from xojodoc import indexer as indexer_module
+from xojodoc.config import Config
+from xojodoc.database import Database, FileState
+from xojodoc.indexer import Indexer, file_digest
+from xojodoc.parser import HTMLParser, LxmlHTMLParser
+
+
+FIXTURES_ROOT = Path(__file__).parent / "fixtures" / "html"
+
+
+@pytest.fixture
+def html_root(tmp_path):
+    """A writable copy of the fixture documentation."""
+    root = tmp_path / "html"
+    shutil.copytree(FIXTURES_ROOT, root)
+    return root
+
+
+def dump(db_path):
+    """Get the class, member and search rows of a database."""
+    with Database(str(db_path)) as db:
+        return {
+            'classes': db.conn.execute(
+                "SELECT id, name, module, description, sample_code, compatibility, notes, file_path "
+                "FROM classes ORDER BY id").fetchall(),
+            'properties': db.conn.execute("SELECT * FROM properties ORDER BY id").fetchall(),
+            'methods': db.conn.execute("SELECT * FROM methods ORDER BY id").fetchall(),
+            'search': db.conn.execute("SELECT rowid, * FROM search_index ORDER BY rowid").fetchall(),
+        }
+
+
+class TestParallelBuild:
+    """Test suite for Indexer.build_index(jobs=...)."""
+
+    def test_parallel_matches_serial(self, html_root, tmp_path):
+        """Test that parsing in worker processes stores exactly the serial result."""
+        Indexer(str(html_root), str(tmp_path / "serial.db")).build_index(verbose=False, jobs=1)
+        Indexer(str(html_root), str(tmp_path / "parallel.db")).build_index(verbose=False, jobs=2)
+
+        serial = dump(tmp_path / "serial.db")
+        assert serial['classes'] and serial['methods'] and serial['search']
+        assert dump(tmp_path / "parallel.db") == serial
+
+    def test_parse_documents_keeps_order(self, html_root, tmp_path):
+        """Test that parallel parsing yields documents in input order."""
+        indexer = Indexer(str(html_root), str(tmp_path / "xojo.db"))
+        file_paths = sorted(file_path for _, file_path in indexer.parser.discover_classes())
+
+        serial = list(indexer._parse_documents(file_paths, jobs=1))
+        assert list(indexer._parse_documents(file_paths, jobs=2)) == serial
+        assert [document[0].name for document in serial if document]
+
+
+class TestChangeDetection:
+    """Test suite for detecting changed files by content digest."""
+
+    @pytest.fixture
+    def indexer(self, html_root, tmp_path):
+        indexer = Indexer(str(html_root), str(tmp_path / "xojo.db"))
+        indexer.build_index(verbose=False)
+        return indexer
+
+    def state(self, indexer, file_path):
+        """Get the (class id, mtime, content hash) stored for a file."""
+        with Database(indexer.db_path) as db:
+            return db.conn.execute(
+                "SELECT id, file_mtime, content_hash FROM classes WHERE file_path = ?", (str(file_path),)
+            ).fetchone()
+
+    def test_file_digest(self, tmp_path):
+        """Test that the digest depends on the contents only."""
+        a, b = tmp_path / "a.html", tmp_path / "b.html"
+        a.write_text("<html></html>")
+        b.write_text("<html></html>")
+        assert file_digest(str(a)) == file_digest(str(b))
+        b.write_text("<html> </html>")
+        assert file_digest(str(a)) != file_digest(str(b))
+
+    def test_touched_file_not_reindexed(self, indexer, html_root):
+        """Test that a new mtime with the same contents only refreshes the stored state."""
+        file_path = html_root / "api" / "graphics" / "graphics.html"
+        class_id, mtime, content_hash = self.state(indexer, file_path)
+        os.utime(file_path, (mtime + 100, mtime + 100))
+
+        indexer.build_index(verbose=False)
+        assert tuple(self.state(indexer, file_path)) == (class_id, mtime + 100, content_hash)
+
+    def test_changed_file_reindexed(self, indexer, html_root):
+        """Test that changed contents replace the stored class."""
+        file_path = html_root / "api" / "graphics" / "graphics.html"
+        class_id, mtime, content_hash = self.state(indexer, file_path)
+        file_path.write_text(file_path.read_text().replace("</body>", "<p>Changed.</p></body>"))
+        os.utime(file_path, (mtime, mtime))
+
+        # Same mtime, different size: hashed and re-indexed
+        indexer.build_index(verbose=False)
+        new_id, _, new_hash = self.state(indexer, file_path)
+        assert new_id != class_id
+        assert new_hash == file_digest(str(file_path)) != content_hash
+
+
+class TestManifestDiff:
+    """Test suite for diffing the directory scan against the stored manifest."""
+
+    def test_diff(self, html_root, tmp_path):
+        """Test that new, changed and removed files are told apart."""
+        indexer = Indexer(str(html_root), str(tmp_path / "xojo.db"))
+        indexer.build_index(verbose=False)
+        with indexer.db:
+            manifest = indexer.db.load_manifest()
+        classes = indexer.parser.discover_classes()
+        kept = str(html_root / "api" / "deprecated" / "timer.html")
+        edited = str(html_root / "api" / "graphics" / "graphics.html")
+        gone = str(html_root / "api" / "gone" / "gone.html")
+        # noheading.html has no class data, so it is never in the manifest
+        empty = str(html_root / "api" / "graphics" / "noheading.html")
+        manifest[gone] = FileState(1.0, 1, "0" * 32)
+        del manifest[kept]
+        Path(edited).write_text(Path(edited).read_text() + "\n")
+
+        stats = {'errors': 0}
+        with indexer.db:
+            added, changed, removed = indexer._diff_manifest(classes, manifest, False, stats, verbose=False)
+        assert sorted(file_path for _, _, file_path, _ in added) == sorted([kept, empty])
+        assert [file_path for _, _, file_path, _ in changed] == [edited]
+        assert changed[0][3].content_hash == file_digest(edited)
+        assert removed == [gone]
+        assert stats['errors'] == 0
+
+    def test_force(self, html_root, tmp_path):
+        """Test that force treats every indexed file as changed."""
+        indexer = Indexer(str(html_root), str(tmp_path / "xojo.db"))
+        indexer.build_index(verbose=False)
+        classes = indexer.parser.discover_classes()
+        with indexer.db:
+            manifest = indexer.db.load_manifest()
+            added, changed, removed = indexer._diff_manifest(classes, manifest, True, {'errors': 0},
+                                                             verbose=False)
+        assert removed == []
+        assert sorted(file_path for _, _, file_path, _ in changed) == sorted(manifest)
+        assert len(added) + len(changed) == len(classes)
+
+    def test_removed_file_deleted(self, html_root, tmp_path):
+        """Test that a rebuild deletes the classes of removed files."""
+        indexer = Indexer(str(html_root), str(tmp_path / "xojo.db"))
+        indexer.build_index(verbose=False)
+        file_path = html_root / "api" / "deprecated" / "timer.html"
+        with Database(indexer.db_path) as db:
+            class_id = db.conn.execute("SELECT id FROM classes WHERE file_path = ?",
+                                       (str(file_path),)).fetchone()[0]
+            assert db.search_classes("timer")
+        file_path.unlink()
+
+        indexer.build_index(verbose=False)
+        with Database(indexer.db_path) as db:
+            assert str(file_path) not in db.load_manifest()
+            assert db.get_class_properties(class_id) == db.get_class_methods(class_id) == []
+            assert db.search_classes("timer") == []
+            assert db.get_class_doc(class_id) is None
+
+
+class TestMain:
+    """Test suite for the xojodoc-index command line."""
+
+    @pytest.fixture
+    def run(self, html_root, tmp_path, monkeypatch):
+        """Run main() with arguments and an [indexer] config section; returns the Indexer."""
+        def run(args, **indexer_settings):
+            config_file = tmp_path / "xojodoc.conf"
+            config_file.write_text("[paths]\nhtml_root = {}\ndatabase = {}\n\n[indexer]\n{}".format(
+                html_root, tmp_path / "xojo.db",
+                "".join(f"{key} = {value}\n" for key, value in indexer_settings.items())))
+            monkeypatch.setattr(indexer_module, "get_config", lambda: Config(str(config_file)))
+            built = []
+            monkeypatch.setattr(Indexer, "build_index", lambda self, **kwargs: built.append(self))
+            monkeypatch.setattr(sys, "argv", ["xojodoc-index", "--html-root", str(html_root),
+                                              "--db-path", str(tmp_path / "xojo.db"), *args])
+            indexer_module.main()
+            return built[0]
+        return run
+
+    def test_parser_from_config(self, run):
+        """Test that [indexer] parser is used unless --parser is given."""
+        assert type(run([], parser="lxml").parser) is LxmlHTMLParser
+        assert type(run(["--parser", "bs4"], parser="lxml").parser) is HTMLParser
+        assert type(run([]).parser) is HTMLParser
+
+    def test_fts_layout_from_config(self, run):
+        """Test that [indexer] fts_layout is used unless --fts-layout is given."""
+        assert run([], fts_layout="external").db.fts_layout == "external"
+        assert run(["--fts-layout", "full"], fts_layout="external").db.fts_layout == "full"
+        assert run([]).db.fts_layout == "full"
+
+    def test_watch_uses_config(self, run, monkeypatch):
+        """Test that --watch builds with the configured layout before watching."""
+        from xojodoc.watcher import DocWatcher
+        watched = []
+        monkeypatch.setattr(DocWatcher, "run", lambda self, verbose=True: watched.append(self))
+        assert run(["--watch"], fts_layout="external").db.fts_layout == "external"
+        assert len(watched) == 1
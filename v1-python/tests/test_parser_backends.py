@@ -0,0 +1,111 @@
+"""
+Parity tests for the HTML parser backends.
+
+The lxml backend must produce exactly the same records as the
+BeautifulSoup backend for every documentation page.
+"""
+
+import pytest
+from pathlib import Path
+from xojodoc.parser import HTMLParser, LxmlHTMLParser, PARSER_BACKENDS, create_parser
+
+
+FIXTURES_ROOT = Path(__file__).parent / "fixtures" / "html"
+
+
+def fixture_pages():
+    """All fixture class pages, in a stable order."""
+    parser = HTMLParser(str(FIXTURES_ROOT))
+    return sorted(file_path for _, file_path in parser.discover_classes())
+
+
+class TestCreateParser:
+    """Test suite for parser backend selection."""
+
+    def test_backends(self):
+        """Test that each known backend creates the right parser."""
+        assert type(create_parser(str(FIXTURES_ROOT), "bs4")) is HTMLParser
+        assert type(create_parser(str(FIXTURES_ROOT), "lxml")) is LxmlHTMLParser
+        assert set(PARSER_BACKENDS) == {"bs4", "lxml"}
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend is rejected."""
+        with pytest.raises(ValueError):
+            create_parser(str(FIXTURES_ROOT), "html5lib")
+
+
+class TestBackendParity:
+    """Both backends must return identical records."""
+
+    @pytest.fixture
+    def bs4_parser(self):
+        return create_parser(str(FIXTURES_ROOT), "bs4")
+
+    @pytest.fixture
+    def lxml_parser(self):
+        return create_parser(str(FIXTURES_ROOT), "lxml")
+
+    def test_discover_classes(self, bs4_parser, lxml_parser):
+        """Test that both backends discover the same files."""
+        assert sorted(bs4_parser.discover_classes()) == sorted(lxml_parser.discover_classes())
+
+    @pytest.mark.parametrize("file_path", fixture_pages(), ids=lambda p: Path(p).stem)
+    def test_parse_document(self, bs4_parser, lxml_parser, file_path):
+        """Test that parse_document() matches for every fixture page."""
+        assert lxml_parser.parse_document(file_path) == bs4_parser.parse_document(file_path)
+
+    @pytest.mark.parametrize("file_path", fixture_pages(), ids=lambda p: Path(p).stem)
+    def test_parse_parts(self, bs4_parser, lxml_parser, file_path):
+        """Test that the per-part parse methods match for every fixture page."""
+        assert lxml_parser.parse_class_file(file_path) == bs4_parser.parse_class_file(file_path)
+        assert lxml_parser.parse_properties(file_path) == bs4_parser.parse_properties(file_path)
+        assert lxml_parser.parse_methods(file_path) == bs4_parser.parse_methods(file_path)
+
+    def test_missing_file(self, bs4_parser, lxml_parser):
+        """Test that both backends fail the same way on a missing file."""
+        missing = str(FIXTURES_ROOT / "api" / "missing.html")
+        assert bs4_parser.parse_document(missing) is None
+        assert lxml_parser.parse_document(missing) is None
+
+
+@pytest.mark.parametrize("backend", PARSER_BACKENDS)
+class TestGraphicsPage:
+    """Spot checks on the Graphics fixture, for each backend."""
+
+    @pytest.fixture
+    def document(self, backend):
+        parser = create_parser(str(FIXTURES_ROOT), backend)
+        return parser.parse_document(str(FIXTURES_ROOT / "api" / "graphics" / "graphics.html"))
+
+    def test_class(self, document):
+        """Test class fields, ignoring admonitions, comments and scripts."""
+        xojo_class, _, _ = document
+        assert xojo_class.name.startswith("Graphics")
+        assert xojo_class.module == "graphics"
+        assert xojo_class.description == (
+            "Graphics class objects are used for drawing text, lines, rectangles, ovals, and pictures.\n"
+            "Use the DesktopCanvas Paint event & friends."
+        )
+        assert xojo_class.compatibility == "All project types on all supported operating systems."
+        assert xojo_class.sample_code.startswith("g.DrawingColor = Color.Red")
+
+    def test_properties(self, document):
+        """Test property rows and their anchored descriptions."""
+        _, properties, _ = document
+        by_name = {prop.name: prop for prop in properties}
+        assert list(by_name) == ["AntiAliased", "Height", "ScaleX", "Missing"]
+        assert by_name["Height"].read_only and not by_name["Height"].shared
+        assert by_name["ScaleX"].shared
+        assert by_name["ScaleX"].description == "Horizontal scale factor."
+        assert by_name["Missing"].description is None
+
+    def test_methods(self, document):
+        """Test method rows, descriptions and sample code."""
+        _, _, methods = document
+        by_name = {method.name: method for method in methods}
+        assert by_name["TextWidth"].return_type == "Double"
+        assert by_name["TextWidth"].description == "Returns the width of the text."
+        assert by_name["FromData"].parameters is None and by_name["FromData"].shared
+        assert by_name["DrawText"].sample_code == (
+            'g.DrawText("Hello World", 10, 20)\n\ng.DrawText("Bye", 0, 0)'
+        )
@@ -0,0 +1,254 @@
+"""
+Tests for the interactive TUI.
+"""
+
+import asyncio
+
+import pytest
+from textual.widgets import Input
+from textual.worker import WorkerCancelled
+from xojodoc.completion import NameIndex
+from xojodoc.database import Database, XojoClass
+from xojodoc.tui import DEBOUNCE_MAX, DEBOUNCE_MIN, SearchResults, XojoDocTUI
+
+
+CLASSES = 1500
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / "xojo.db")
+    with Database(db_path) as db:
+        db.create_schema()
+        db.conn.executemany(
+            "INSERT INTO classes (name, module, description, is_deprecated) VALUES (?, ?, ?, ?)",
+            [(f"Class{i:04d}", "deprecated" if i % 10 == 0 else "desktop", "A class.", i % 10 == 0)
+             for i in range(CLASSES)]
+        )
+        db.rebuild_class_docs()
+        db.convert_search_index("full")
+    return db_path
+
+
+async def settle(app, pilot):
+    """Wait for running searches and the messages they post."""
+    for worker in list(app.workers):
+        try:
+            await worker.wait()
+        except WorkerCancelled:
+            pass
+    await pilot.pause()
+
+
+def run_app(db_path, test):
+    """Run the TUI headless and call test(app, pilot) once it is mounted."""
+    async def run():
+        app = XojoDocTUI(db_path)
+        async with app.run_test(size=(100, 30)) as pilot:
+            await settle(app, pilot)
+            await test(app, pilot)
+    asyncio.run(run())
+
+
+class TestStartup:
+    """Test suite for opening the database."""
+
+    def test_missing_database(self, tmp_path):
+        """Test that a database that cannot be opened is reported."""
+        async def test(app, pilot):
+            messages = [notification.message for notification in app._notifications]
+            assert any("Cannot open database" in message and "missing.db" in message
+                       for message in messages)
+        run_app(str(tmp_path / "missing.db"), test)
+
+
+class TestSearchResults:
+    """Test suite for the virtualized result list."""
+
+    def test_all_classes_without_row_widgets(self, db_path):
+        """Test that listing every class does not create a widget per row."""
+        async def test(app, pilot):
+            results = app.query_one("#results", SearchResults)
+            assert len(results.results) == CLASSES - CLASSES // 10
+            assert results.virtual_size.height == len(results.results)
+            assert len(app.query("*")) < 50
+        run_app(db_path, test)
+
+    def test_keyboard_selection(self, db_path):
+        """Test moving the highlight and opening a class."""
+        async def test(app, pilot):
+            results = app.query_one("#results", SearchResults)
+            results.focus()
+            await pilot.press("down", "down", "enter")
+            await pilot.pause()
+            assert app.current_class["name"] == "Class0003"
+
+            await pilot.press("end")
+            assert results.highlighted == len(results.results) - 1
+            assert results.scroll_offset.y > 0
+        run_app(db_path, test)
+
+
+class TestSearchWorkers:
+    """Test suite for background searches."""
+
+    def test_newest_search_wins(self, db_path):
+        """Test that results of a superseded search are not shown."""
+        async def test(app, pilot):
+            app.perform_search("class0001")
+            app.perform_search("class0002")
+            await settle(app, pilot)
+            results = app.query_one("#results", SearchResults)
+            assert [r["name"] for r in results.results] == ["Class0002"]
+
+            app._show_results("stale", [], app._search_generation - 1, 0.0)
+            assert [r["name"] for r in results.results] == ["Class0002"]
+        run_app(db_path, test)
+
+    def test_adaptive_debounce(self, db_path):
+        """Test that the debounce follows the query latency within its bounds."""
+        async def test(app, pilot):
+            app._search_latency = 0.0
+            assert app.search_debounce == DEBOUNCE_MIN
+            app._search_latency = 0.1
+            assert app.search_debounce == pytest.approx(0.2)
+            app._search_latency = 10.0
+            assert app.search_debounce == DEBOUNCE_MAX
+        run_app(db_path, test)
+
+
+class TestStaleSearch:
+    """Test suite for aborting searches that a newer one replaced."""
+
+    def test_query_aborted(self, db_path):
+        """Test that the SQL of a stale search is interrupted and its results dropped."""
+        async def test(app, pilot):
+            returned = []
+            search_classes = app.search_db.search_classes
+
+            def search_replaced(*args, **kwargs):
+                # A newer search starts while this one is in SQLite
+                app._search_generation += 1
+                returned.append(search_classes(*args, **kwargs))
+                return returned[-1]
+
+            app.search_db.search_classes = search_replaced
+            results = app.query_one("#results", SearchResults)
+            shown = results.results
+            app.perform_search("class")
+            await settle(app, pilot)
+            # search_classes() answers an interrupted FTS query with no rows
+            assert returned == [[]]
+            assert results.results is shown
+            assert not any("Search error" in n.message for n in app._notifications)
+
+            # The connection still serves the next search
+            app.search_db.search_classes = search_classes
+            app.perform_search("class")
+            await settle(app, pilot)
+            assert len(results.results) == 100
+        run_app(db_path, test)
+
+
+class TestNarrowing:
+    """Test suite for narrowing searches in memory as the query grows."""
+
+    def test_longer_query_skips_sql(self, db_path):
+        """Test that extending the query filters the last results in memory."""
+        async def test(app, pilot):
+            calls = []
+            search_classes = app.search_db.search_classes
+            app.search_db.search_classes = lambda *args, **kwargs: calls.append(args) or search_classes(*args, **kwargs)
+            results = app.query_one("#results", SearchResults)
+
+            for query in ("class001", "class0012", "class0012 a"):
+                app.perform_search(query)
+                await settle(app, pilot)
+            assert [r["name"] for r in results.results] == ["Class0012"]
+            assert len(calls) == 1
+
+            # Shortened: back to SQL
+            app.perform_search("class0")
+            await settle(app, pilot)
+            assert len(calls) == 2
+            # Cut at the limit: not narrowed
+            assert not app._last_search.complete
+            app.perform_search("class001")
+            await settle(app, pilot)
+            assert len(calls) == 3
+            assert len(results.results) == 9
+        run_app(db_path, test)
+
+    def test_dropped_after_reindex(self, db_path):
+        """Test that results read before the database changed are not narrowed."""
+        async def test(app, pilot):
+            results = app.query_one("#results", SearchResults)
+            app.perform_search("class001")
+            await settle(app, pilot)
+            assert app._last_search.complete
+
+            with Database(db_path) as db, db.transaction():
+                db.conn.execute("DELETE FROM classes WHERE name = 'Class0012'")
+                db.conn.execute("DELETE FROM search_index WHERE class_name = 'Class0012'")
+                db.bump_generation()
+            app.perform_search("class0012")
+            await settle(app, pilot)
+            assert results.results == []
+        run_app(db_path, test)
+
+
+class TestSuggester:
+    """Test suite for search box completion."""
+
+    def test_completes_last_word(self, db_path):
+        """Test that the suggestion completes the word being typed."""
+        async def test(app, pilot):
+            suggester = app.suggester
+            assert await suggester.get_suggestion("class001") == "Class0010"
+            assert await suggester.get_suggestion("desktop widget") is None
+            assert await suggester.get_suggestion("x class0042") == "x Class0042"
+            assert await suggester.get_suggestion("x ") is None
+        run_app(db_path, test)
+
+    def test_keeps_typed_words(self, db_path):
+        """Test that accepting a suggestion only changes the word being completed."""
+        async def test(app, pilot):
+            search_box = app.query_one("#search-box", Input)
+            search_box.focus()
+            await pilot.press(*"Desktop CLASS001")
+            await pilot.pause()
+            await pilot.press("right")
+            assert search_box.value == "Desktop Class0010"
+        run_app(db_path, test)
+
+    def test_reloaded_after_reindex(self, db_path):
+        """Test that names added by the indexer are suggested without a restart."""
+        async def test(app, pilot):
+            suggester = app.suggester
+            assert await suggester.get_suggestion("zeta") is None
+            with Database(db_path) as db, db.transaction():
+                db.insert_class(XojoClass(name="ZetaSocket", module="networking", description=""))
+                NameIndex.build(db).save(db)
+                db.bump_generation()
+            assert await suggester.get_suggestion("x zeta") == "x ZetaSocket"
+        run_app(db_path, test)
+
+
+class TestDeprecated:
+    """Test suite for hiding deprecated classes."""
+
+    def test_filtered_before_limit(self, db_path):
+        """Test that hiding deprecated classes still fills the result list."""
+        async def test(app, pilot):
+            results = app.query_one("#results", SearchResults)
+            app.query_one("#search-box", Input).value = "class"
+            await pilot.pause(DEBOUNCE_MAX)
+            await settle(app, pilot)
+            assert len(results.results) == 100
+            assert not any(r["module"] == "deprecated" for r in results.results)
+
+            # Not narrowed from the results without deprecated classes
+            app.action_toggle_deprecated()
+            await settle(app, pilot)
+            assert any(r["module"] == "deprecated" for r in results.results)
+        run_app(db_path, test)
@@ -0,0 +1,112 @@
+"""
+Tests for watch mode: snapshots, file sync and the polling loop.
+"""
+
+import shutil
+
+import pytest
+from pathlib import Path
+from xojodoc import watcher
+from xojodoc.database import Database
+from xojodoc.indexer import Indexer
+from xojodoc.watcher import DocWatcher
+
+
+FIXTURES_ROOT = Path(__file__).parent / "fixtures" / "html"
+
+
+@pytest.fixture
+def indexer(tmp_path):
+    """An indexer over a writable copy of the fixture documentation, built once."""
+    html_root = tmp_path / "html"
+    shutil.copytree(FIXTURES_ROOT, html_root)
+    indexer = Indexer(str(html_root), str(tmp_path / "xojo.db"))
+    indexer.build_index(verbose=False)
+    return indexer
+
+
+def api_file(indexer, module, name):
+    return indexer.parser.api_root / module / f"{name}.html"
+
+
+def indexed_paths(indexer):
+    with Database(indexer.db_path) as db:
+        return set(db.load_manifest())
+
+
+def make_changes(indexer):
+    """Add, change and remove one file each; return their paths."""
+    added = api_file(indexer, "networking", "graphics")
+    added.parent.mkdir()
+    shutil.copy(api_file(indexer, "graphics", "graphics"), added)
+    changed = api_file(indexer, "data_types", "boolean")
+    changed.write_text(changed.read_text().replace("</body>", "<p>Changed.</p></body>"))
+    removed = api_file(indexer, "deprecated", "timer")
+    removed.unlink()
+    return str(added), str(changed), str(removed)
+
+
+class TestSnapshot:
+    """Test suite for DocWatcher.snapshot() and diff()."""
+
+    def test_diff(self, indexer):
+        """Test that created, modified and deleted files are reported."""
+        doc_watcher = DocWatcher(indexer)
+        before = doc_watcher.snapshot()
+        assert DocWatcher.diff(before, doc_watcher.snapshot()) == set()
+
+        added, changed, removed = make_changes(indexer)
+        assert DocWatcher.diff(before, doc_watcher.snapshot()) == {added, changed, removed}
+
+
+class TestSyncFiles:
+    """Test suite for Indexer.sync_files()."""
+
+    def test_add_change_remove(self, indexer):
+        """Test that each kind of change is applied to the index."""
+        with Database(indexer.db_path) as db:
+            generation = db.get_generation()
+        added, changed, removed = make_changes(indexer)
+        unchanged = str(api_file(indexer, "graphics", "graphics"))
+
+        stats = indexer.sync_files([added, changed, removed, unchanged], verbose=False)
+        assert stats == {'indexed': 2, 'skipped': 1, 'removed': 1, 'errors': 0}
+
+        paths = indexed_paths(indexer)
+        assert added in paths and changed in paths and removed not in paths
+        with Database(indexer.db_path) as db:
+            assert [r['module'] for r in db.search_classes("networking")] == ["networking"]
+            assert db.get_generation() > generation
+
+    def test_nothing_changed(self, indexer):
+        """Test that syncing unchanged files leaves the generation alone."""
+        with Database(indexer.db_path) as db:
+            generation = db.get_generation()
+        stats = indexer.sync_files([str(api_file(indexer, "graphics", "graphics"))], verbose=False)
+        assert stats == {'indexed': 0, 'skipped': 1, 'removed': 0, 'errors': 0}
+        with Database(indexer.db_path) as db:
+            assert db.get_generation() == generation
+
+
+class TestRun:
+    """Test suite for the DocWatcher.run() polling loop."""
+
+    def test_changes_synced_after_quiet_period(self, indexer, monkeypatch):
+        """Test that changes are picked up and applied once the tree is quiet."""
+        added = []
+        polls = []
+
+        def sleep(seconds):
+            # One poll per sleep: change the tree on the first, stop once synced
+            polls.append(seconds)
+            if len(polls) == 1:
+                added.extend(make_changes(indexer))
+            elif len(polls) > 10 or (added and added[0] in indexed_paths(indexer)):
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr(watcher.time, "sleep", sleep)
+        DocWatcher(indexer, interval=0.5, debounce=0).run(verbose=False)
+
+        paths = indexed_paths(indexer)
+        assert added[0] in paths and added[1] in paths and added[2] not in paths
+        assert polls[0] == 0.5
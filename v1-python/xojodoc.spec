@@ -29,6 +29,11 @@ a = Analysis(
         'xojodoc.indexer',
         'xojodoc.tui',
         'xojodoc.config',
+        'xojodoc.watcher',
+        'xojodoc.daemon',
+        'xojodoc.http_server',
+        'xojodoc.cache',
+        'xojodoc.completion',
     ],
     hookspath=[],
     hooksconfig={},
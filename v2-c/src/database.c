@@ -26,9 +26,18 @@ void db_close(sqlite3 *db) {
     }
 }
 
+/* Databases indexed by older versions have no is_deprecated column */
+static int has_deprecated_flag(sqlite3 *db) {
+    sqlite3_stmt *stmt;
+    int rc = sqlite3_prepare_v2(db, "SELECT is_deprecated FROM classes LIMIT 0", -1, &stmt, NULL);
+    sqlite3_finalize(stmt);
+    return rc == SQLITE_OK;
+}
+
 SearchResult* db_search(sqlite3 *db, const char *query, int max_results, int include_deprecated) {
     sqlite3_stmt *stmt;
     int rc;
+    int flag = include_deprecated ? 0 : has_deprecated_flag(db);
     
     // If max_results is 0, fetch all results
     int use_limit = (max_results > 0);
@@ -36,7 +45,8 @@ SearchResult* db_search(sqlite3 *db, const char *query, int max_results, int inc
     // Special case: * means list all (no FTS search)
     if (strcmp(query, "*") == 0) {
         char sql[512];
-        const char *where = include_deprecated ? "" : "WHERE module != 'deprecated' AND module NOT LIKE 'deprecated_%' ";
+        const char *where = include_deprecated ? "" :
+            flag ? "WHERE is_deprecated = 0 " : "WHERE module NOT LIKE 'deprecated%' ";
         
         if (use_limit) {
             snprintf(sql, sizeof(sql),
@@ -62,7 +72,8 @@ SearchResult* db_search(sqlite3 *db, const char *query, int max_results, int inc
     } else {
         // Normal FTS search with prefix matching
         char sql[768];
-        const char *and_clause = include_deprecated ? "" : "AND c.module != 'deprecated' AND c.module NOT LIKE 'deprecated_%' ";
+        const char *and_clause = include_deprecated ? "" :
+            flag ? "AND c.is_deprecated = 0 " : "AND c.module NOT LIKE 'deprecated%' ";
         
         if (use_limit) {
             snprintf(sql, sizeof(sql),